@@ -0,0 +1,68 @@
+"""
+Benchmark of the GT planning: full priority rebuild per iteration vs. incremental ready queue.
+
+    python -m benchmarks.benchmark_planning --operations 1000 10000 100000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import logging
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.data_processing import ProductionGenerator
+from modules.plan.GifflerThompson import GifflerThompson
+from models.implementations.basic import BasicModel
+from modules.logger import Logger
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark GT planning.")
+    parser.add_argument("--operations", type=int, nargs="+", default=[1000, 10000, 100000], help="Number of operations to plan.")
+    parser.add_argument("--priority_rule", type=str, default="dynamic", choices=["dynamic", "fcfs"], help="Priority rule to use.")
+    parser.add_argument("--max_baseline_operations", type=int, default=10000, help="Skip the full rebuild above this size (quadratic).")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the data generation.")
+    return parser.parse_args()
+
+
+def plan(operations_count, rule_name, incremental, seed):
+    # Static data: 2 operations per instance
+    operations, machines = ProductionGenerator().generate_data_static(num_instances=operations_count // 2, seed=seed)
+    model = BasicModel()
+    model.initialize()
+    start = time.perf_counter()
+    schedule = GifflerThompson(rule_name, model.inference, incremental=incremental).create_schedule(operations, machines)
+    return time.perf_counter() - start, max(operation.plan_end for operation in schedule)
+
+
+def main():
+    args = parse_arguments()
+    Logger.set_log_level(category="Model", level=logging.ERROR)
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        # GT and the logger write relative to the working directory
+        cwd = os.getcwd()
+        os.chdir(folder)
+        os.makedirs("data")
+        os.makedirs(os.path.join("output", "logs"))
+        try:
+            for operations_count in args.operations:
+                incremental_time, incremental_makespan = plan(operations_count, args.priority_rule, True, args.seed)
+                if operations_count <= args.max_baseline_operations:
+                    baseline_time, baseline_makespan = plan(operations_count, args.priority_rule, False, args.seed)
+                    speedup = f"{baseline_time / incremental_time:.1f}x"
+                else:
+                    baseline_time, baseline_makespan, speedup = None, None, "-"
+                rows.append([operations_count, baseline_time, incremental_time, speedup, baseline_makespan, incremental_makespan])
+                print(f"{operations_count:>8} ops  rebuild: {'skipped' if baseline_time is None else f'{baseline_time:.3f}s':>10}"
+                      f"  incremental: {incremental_time:.3f}s  speedup: {speedup}"
+                      f"  makespan: {baseline_makespan} / {incremental_makespan}")
+        finally:
+            os.chdir(cwd)
+    return rows
+
+
+if __name__ == "__main__":
+    main()
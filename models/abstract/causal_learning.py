@@ -0,0 +1,271 @@
+import os
+import pandas as pd
+import networkx as nx
+from pgmpy.models import DiscreteBayesianNetwork
+from pgmpy.estimators import BayesianEstimator
+from models.abstract.pgmpy import PGMPYModel
+from models.cache import cached_learning
+from models.utils import compare_structures
+from models.implementations.utils.BicCGScore import BicCGScore
+from models.sufficient_statistics import CPDCounts, GroupMoments, DISTRIBUTION_PARAMETERS, fit_distributions
+from models.structure_learning import PORTFOLIO, StructureLearningPortfolio, encode_data, learn_edges
+
+
+class CausalLearningModel(PGMPYModel):
+    """
+    Base class for the causal models that learn their structure from observed data.
+
+    The observed data is encoded once per initialize() (see encode_data), all libraries learn from that encoding
+    through the adapters of models.structure_learning. structure_learning_lib selects the
+    <lib>_structure_learning method ('gcastle', 'pgmpy' or 'portfolio'), the learned model is cached by
+    cached_learning.
+
+    update() keeps the model current with new observed data (e.g. the chunks of a running Simulator, see its
+    feedback argument): the CPDs and the tracked continuous distributions are updated from their sufficient
+    statistics, the structure is only searched again if the log-likelihood of the new data drops by more than
+    drift_threshold (per observation) below the one of the data counted so far (under the current CPDs). Only the
+    last data_window observations are kept in self.data for a new structure search and the distribution fits.
+    """
+    # Continuous variables of the observed data, all other variables are discrete
+    continuous_variables = ()
+    # Score of the pgmpy searches, None for 'bic-d' on discrete and the conditional Gaussian BIC on mixed data
+    scoring_method = None
+    # Family of the continuous distributions fitted from their moments (see DISTRIBUTION_PARAMETERS), only 'gaussian'
+    # and 'truncnorm' are also updated online, None for none
+    distribution_family = None
+    # Drop of the mean log-likelihood per observation that triggers a new structure search in update()
+    drift_threshold = 0.5
+    # Number of most recent observations kept in self.data by update(), None keeps all
+    data_window = 100000
+
+    def __init__(self, csv_file, truth_model=None, structure_learning_lib='pgmpy', structure_learning_method='HillClimbSearch', estimator='BDeu', **kwargs):
+        super().__init__()
+        self.csv_file = csv_file
+        self.truth_model = truth_model
+        self.edges = []
+        self.structure_learning_lib = structure_learning_lib
+        self.structure_learning_method = structure_learning_method  # Can be 'PC', 'GES', or a custom function
+        self.estimator = estimator  # Bayesian Estimation method
+        self.model = None
+        self.kwargs = kwargs  # Additional arguments for learning algorithms
+        self.data = None
+        self.encoded_data = None
+        self.discrete_vars = None
+        self.learning_score = None
+        self.cpd_counts = None
+        self.baseline_log_likelihood = None
+        self.distribution_moments = None
+
+    def learn_model(self):
+        """
+        Reads the observed data and learns the model from it (see learn_structure).
+        """
+        self.data = self.read_from_csv(self.csv_file)
+        self.learn_structure()
+
+    def learn_structure(self):
+        """
+        Encodes the observed data and learns the model. With a truth model the learned model is only
+        used if it matches the truth model, otherwise the truth model is used.
+        """
+        self.encoded_data = encode_data(self.data)
+        self.discrete_vars = [column for column in self.encoded_data.columns if column not in self.continuous_variables]
+
+        if self.truth_model:
+            successful_models = self.learn_truth_causal_model()
+            self.logger.debug(f"Number of successful learned models: {len(successful_models)}")
+            self.model = successful_models[0] if successful_models else self.truth_model.model
+        else:
+            self.model = self.learn_causal_model()
+        # Die gemerkten lokalen Scores werden nach dem Lernen nicht mehr gebraucht
+        self.learning_score = None
+        self.start_online_learning()
+
+    def start_online_learning(self):
+        """
+        Counts the observed data per CPD cell of the learned model as start of the online updates. The truth model
+        (fallback) keeps its CPDs, as do estimators without a count prior (only BDeu and K2 are supported).
+        """
+        self.cpd_counts = None
+        self.baseline_log_likelihood = None
+        if not isinstance(self.model, DiscreteBayesianNetwork) or (self.truth_model and self.model is self.truth_model.model):
+            return
+        try:
+            self.cpd_counts = CPDCounts(self.model, self.discrete_vars, prior_type=self.estimator)
+        except ValueError as e:
+            self.logger.debug(f"No online updates of the CPDs: {e}")
+            return
+        self.cpd_counts.update(self.data)
+        self.baseline_log_likelihood = self.cpd_counts.counted_log_likelihood()
+
+    def learn_parameters(self):
+        """
+        Learns the parameters besides the CPDs (e.g. the continuous distributions) for the current model.
+        """
+        pass
+
+    def track_distributions(self, edges, target='relative_processing_time_deviation'):
+        """
+        Running moments of the target per configuration of its parents in edges, for the online updates of
+        self.distributions.
+        """
+        self.distribution_moments = GroupMoments(target, [edge[0] for edge in edges if edge[1] == target])
+        self.distribution_moments.update(self.data)
+
+    def distribution_key(self, target, parents, configuration) -> tuple:
+        """Key in self.distributions of a parent configuration (values in the order of the parents)."""
+        return (target, tuple(zip(parents, configuration)))
+
+    def fit_distributions(self, edges, target='relative_processing_time_deviation'):
+        """
+        Fits the distributions of the target per configuration of its parents in edges from the grouped moments
+        of the observed data (see models.sufficient_statistics.fit_distributions).
+        """
+        parents = [edge[0] for edge in edges if edge[1] == target]
+        for configuration, parameters in fit_distributions(self.data, target, parents, self.distribution_family).items():
+            self.distributions[self.distribution_key(target, parents, configuration)] = parameters
+
+    def update_distributions(self, observations):
+        """
+        Updates the moments with the observations and refits the distributions of the changed configurations,
+        their pre-drawn variates are dropped.
+        """
+        if self.distribution_moments is None or self.distribution_family not in ('gaussian', 'truncnorm'):
+            return
+        parameters = DISTRIBUTION_PARAMETERS[self.distribution_family]
+        moments = self.distribution_moments
+        for configuration in moments.update(observations):
+            key = self.distribution_key(moments.target, moments.parents, configuration)
+            self.distributions[key] = parameters(moments.get(configuration))
+            if self.variate_pool is not None:
+                self.variate_pool.discard(key)
+
+    def update(self, observations) -> bool:
+        """
+        Adds new observed data (DataFrame with the columns of the observed data) to the model without learning from
+        scratch. Returns True if the structure was learned again because of a drift of the data.
+        """
+        observations = observations.reindex(columns=self.data.columns).dropna()
+        if observations.empty:
+            return False
+        self.data = pd.concat([self.data, observations.astype(self.data.dtypes.to_dict())], ignore_index=True)
+        if self.data_window is not None and len(self.data) > self.data_window:
+            self.data = self.data.iloc[-self.data_window:].reset_index(drop=True)
+
+        if self.cpd_counts is not None:
+            drift = self.baseline_log_likelihood - self.cpd_counts.log_likelihood(observations)
+            if drift > self.drift_threshold:
+                self.logger.debug(f"Log-likelihood drift of {drift:.3f}, learning the structure again.")
+                self.learn_structure()
+                self.learn_parameters()
+                if self.variate_pool is not None:
+                    for key in list(self.variate_pool.blocks):
+                        self.variate_pool.discard(key)
+                self.compile_inference()
+                return True
+            self.cpd_counts.update(observations)
+            self.baseline_log_likelihood = self.cpd_counts.counted_log_likelihood()
+            self.replace_cpds(*self.cpd_counts.cpds())
+
+        self.update_distributions(observations)
+        return False
+
+    def read_from_csv(self, file):
+        """ Read dataset from CSV, handling errors gracefully. """
+        if not file or not os.path.exists(file):
+            raise FileExistsError(f"File not found: {file}.")
+
+        try:
+            data = pd.read_csv(file)
+            data.drop(columns=data.columns[0], axis=1, inplace=True)
+            return data
+        except Exception as e:
+            raise ImportError(f"Error reading file {file}: {e}")
+
+    def structure_score(self):
+        """
+        Conditional Gaussian BIC of the encoded data for the pgmpy searches that need it (mixed data, GES). It is
+        created once per data, so its memoized local scores are shared by all searches of the model.
+        """
+        if self.learning_score is None:
+            self.learning_score = BicCGScore(self.encoded_data, discrete_vars=self.discrete_vars)
+        return self.learning_score
+
+    def gcastle_structure_learning(self, method='PC', **kwargs):
+        """ Wrapper for gCastle's structure learning algorithms. """
+        return learn_edges(self.encoded_data, 'gcastle', method, self.discrete_vars, **kwargs)
+
+    def pgmpy_structure_learning(self, method='HillClimbSearch', **kwargs):
+        """ Wrapper for pgmpy's structure learning algorithms. """
+        return learn_edges(self.encoded_data, 'pgmpy', method, self.discrete_vars,
+                           scoring_method=self.scoring_method, cg_score=self.structure_score(), **kwargs)
+
+    def portfolio_structure_learning(self, method=None, **kwargs):
+        """
+        Structure learning with several algorithms at once (structure_learning_lib='portfolio'): method is the list
+        of (library, method) algorithms, any other value runs the default PORTFOLIO, kwargs are the options of
+        StructureLearningPortfolio (target_shd, time_budget, workers). The SHD is measured against
+        the truth model if the model has one. Returns the edges of the best algorithm, the per-algorithm report
+        is kept in structure_learning_report.
+        """
+        algorithms = method if isinstance(method, (list, tuple)) else PORTFOLIO
+        portfolio = StructureLearningPortfolio(algorithms, **{'discrete_vars': self.discrete_vars, **kwargs})
+        best, self.structure_learning_report = portfolio.learn(self.encoded_data, self.truth_model.model if self.truth_model else None)
+        if best is None:
+            raise ValueError("No structure learning algorithm of the portfolio finished.")
+        self.logger.debug(f"Best structure learning algorithm: {best['algorithm']}")
+        return list(best['edges'])
+
+    @cached_learning(attributes=('edges',))
+    def learn_causal_model(self):
+        """ Learn a causal model dynamically based on the chosen method. """
+        method_name = f"{self.structure_learning_lib}_structure_learning"
+
+        if not hasattr(self, method_name):
+            raise ValueError(f"Unsupported structure learning library: {self.structure_learning_lib}")
+
+        # Dynamically call the method
+        structure_learning_function = getattr(self, method_name)
+        learned_structure = structure_learning_function(self.structure_learning_method, **self.kwargs)
+
+        # Check if learned_structure is a list, a pandas DataFrame, or a NetworkX graph
+        if isinstance(learned_structure, list):
+            # If it's a list of edges, use it directly
+            self.edges = learned_structure
+        elif isinstance(learned_structure, pd.DataFrame):
+            # If it's a DataFrame (adjacency matrix), convert it to an edge list
+            graph = nx.from_pandas_adjacency(learned_structure, create_using=nx.DiGraph)
+            self.edges = list(graph.edges())
+        elif isinstance(learned_structure, nx.DiGraph):
+            # If it's already a DiGraph, get the edges directly
+            self.edges = list(learned_structure.edges())
+        else:
+            raise ValueError("Unsupported learned structure format")
+
+        # Now create the Bayesian Network with the edge list
+        model = DiscreteBayesianNetwork()
+        model.add_edges_from(self.edges)
+        model.fit(self.data, estimator=BayesianEstimator, prior_type=self.estimator)
+
+        if not model.check_model():
+            raise ValueError("Invalid learned model.")
+
+        return model
+
+    def learn_truth_causal_model(self):
+        """ Test various algorithms and retain the best one. """
+        successful_models = []
+
+        try:
+            learned_model = self.learn_causal_model()
+            metrics = compare_structures(truth_model=self.truth_model.model, learned_model=learned_model)
+            if metrics['SHD'] == 0:
+                successful_models.append(learned_model)
+                self.logger.debug(f"Model successfully matched the truth model.")
+            else:
+                self.logger.debug("Failed to match the truth model.")
+
+        except Exception as e:
+            self.logger.debug(f"Error learning model: {e}")
+
+        return successful_models
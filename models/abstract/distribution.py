@@ -1,13 +1,17 @@
 import pandas as pd
 import os
 from models.abstract.model import Model
+from models.variate_pool import VARIATE_POOL_SIZE
 from modules.factory.Operation import Operation
 import numpy as np
 
 class DistributionModel(Model):
     """
     Base class for all distribution inference models.
+    The values are drawn in blocks per (product_type, operation_id) from a VariatePool.
     """
+    variate_pool_size = VARIATE_POOL_SIZE
+
     def __init__(self, csv_file, seed=None):
         super().__init__(seed=seed)
         self.csv_file = csv_file
@@ -57,7 +61,19 @@ class DistributionModel(Model):
         """
         raise NotImplementedError("This method must be implemented in derived classes.")
 
-    def inference(self, operation: Operation, current_tool, do_calculus) -> tuple[int, list[tuple]]:
+    def sample_batch(self, params, size, random_state=None) -> np.ndarray:
+        """
+        Draws size values from a fitted distribution, subclasses override it with vectorized sampling
+        from random_state (None: global generator).
+        """
+        return np.array([self.sample(params) for _ in range(size)], dtype=float)
+
+    def sample_variates(self, params, size, random_state=None):
+        if size is None:
+            return self.sample(params) if random_state is None else self.sample_batch(params, None, random_state)
+        return self.sample_batch(params, size, random_state)
+
+    def inference(self, operation: Operation, current_tool, do_calculus, random_state=None) -> tuple[int, list[tuple]]:
         """
         Perform inference by sampling from the fitted distribution.
         """
@@ -65,6 +81,28 @@ class DistributionModel(Model):
 
         if key in self.distribution_dict and self.distribution_dict[key] is not None:
             params = self.distribution_dict[key]
-            return max(1, round(self.sample(params)), 0), key  # Call sample method to draw from distribution
+            return max(1, round(self.draw_variate(key, params, random_state)), 0), key  # Draw from the fitted distribution
         else:
             return np.float64(operation.duration), key  # No data available for inference
+
+    def inference_batch(self, operations: list[Operation], current_tools, do_calculus, random_states=None) -> tuple[np.ndarray, dict]:
+        """
+        Vectorized inference, one sample_batch() call per (product_type, operation_id).
+        """
+        keys = [(operation.product_type, operation.operation_id) for operation in operations]
+        durations = np.array([operation.duration for operation in operations], dtype=float)
+
+        rows = {}
+        for i, key in enumerate(keys):
+            rows.setdefault(key, []).append(i)
+        for key, indices in rows.items():
+            params = self.distribution_dict.get(key)
+            if params is not None:
+                key_random_states = None if random_states is None else [random_states[i] for i in indices]
+                durations[indices] = np.maximum(1, np.round(self.draw_variates(key, params, len(indices), key_random_states), 0))
+
+        inferenced_variables = {
+            'product_type': self.to_array([key[0] for key in keys]),
+            'operation_id': self.to_array([key[1] for key in keys])
+        }
+        return durations, inferenced_variables
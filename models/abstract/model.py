@@ -5,13 +5,18 @@ from modules.logger import Logger
 import random
 import numpy as np
 import logging
+from models.variate_pool import VariatePool
 
 class Model(ABC):
     """
     Base class for all inference models.
     """
+    # Block size of the VariatePool for draw_variate(), 0 draws every value on its own
+    variate_pool_size = 0
+
     def __init__(self, seed=None):
         self.seed = seed
+        self.variate_pool = None
         self.logger = Logger.get_global_logger(category="Model", level=logging.DEBUG, log_to_file=True, log_filename="output/logs/app.log")
 
     
@@ -20,16 +25,112 @@ class Model(ABC):
         """
         Create the model if required
         """
-        if self.seed is not None:  # Only set the seed if provided
-            random.seed(self.seed )
-            np.random.seed(self.seed)
-        
+        self.seed_random(self.seed)
+
+    def seed_random(self, seed):
+        """
+        Sets the seed of the model and seeds the global random generators, e.g. for a shared pre-initialized model
+        """
+        self.seed = seed
+        if seed is not None:  # Only set the seed if provided
+            random.seed(seed)
+            np.random.seed(seed)
+        if getattr(self, 'variate_pool', None) is not None:
+            self.variate_pool.reset(seed)
+
+    def sample_variates(self, params, size, random_state=None):
+        """
+        Draws size values (a scalar for size None) from the distribution params with random_state
+        (None: global generator), models with continuous distributions implement it for draw_variate().
+        """
+        raise NotImplementedError("This method must be implemented in derived classes.")
+
+    def get_variate_pool(self) -> VariatePool:
+        """
+        The VariatePool of the model, None if the model draws every value on its own.
+        """
+        if not self.variate_pool_size:
+            return None
+        if getattr(self, 'variate_pool', None) is None:
+            self.variate_pool = VariatePool(self.sample_variates, self.variate_pool_size, self.seed)
+        return self.variate_pool
+
+    def draw_variate(self, key, params, random_state=None):
+        """
+        One value of the distribution params stored under key, taken from the variate pool if the model has one.
+        With random_state (np.random.Generator, e.g. common random numbers per operation) the value is drawn
+        from it and the pool is bypassed.
+        """
+        pool = self.get_variate_pool()
+        if random_state is not None or pool is None:
+            return self.sample_variates(params, None, random_state)
+        return pool.draw(key, params)
+
+    def draw_variates(self, key, params, size, random_states=None) -> np.ndarray:
+        """
+        size values of the distribution params stored under key, same values as size draw_variate() calls.
+        random_states: optional list of size generators, value i is drawn from random_states[i].
+        """
+        if random_states is not None:
+            return np.array([self.sample_variates(params, None, random_state) for random_state in random_states], dtype=float)
+        pool = self.get_variate_pool()
+        if pool is None:
+            return np.asarray(self.sample_variates(params, size), dtype=float)
+        return pool.draw_many(key, params, size)
+
     @abstractmethod
-    def inference(self, operation: Operation, current_tool, do_calculus) -> tuple[int, list[tuple]]:
+    def inference(self, operation: Operation, current_tool, do_calculus, random_state=None) -> tuple[int, list[tuple]]:
         """
-        Inference method for planning
+        Inference method for planning, random_state: optional np.random.Generator to draw from instead of the
+        global generators (and the variate pool)
         
         Parameter 1: the new duration based on the delay
         Parameter 2: the influencing variables, important to build the observed data
         """
-        pass
\ No newline at end of file
+        pass
+
+    def inference_batch(self, operations: list[Operation], current_tools, do_calculus, random_states=None) -> tuple[np.ndarray, dict]:
+        """
+        Inference for many operations at once, operations[i] runs with current_tools[i] (and random_states[i]).
+
+        Parameter 1: array with the new durations
+        Parameter 2: the influencing variables as columns (name -> array with one entry per operation)
+
+        The default implementation calls inference() per operation, models override it
+        with vectorized sampling. With random_states the values equal the inference() calls with the same generators.
+        """
+        durations = np.empty(len(operations), dtype=float)
+        rows = []
+        for i, (operation, current_tool) in enumerate(zip(operations, current_tools)):
+            random_state = None if random_states is None else random_states[i]
+            durations[i], inferenced_variables = self.inference(operation, current_tool, do_calculus, random_state=random_state)
+            rows.append(inferenced_variables)
+        return durations, self.to_columns(rows)
+
+    @staticmethod
+    def to_columns(rows) -> dict:
+        """
+        Converts a list of inferenced variable dicts to columns, missing entries are None.
+        """
+        columns = {}
+        for i, row in enumerate(rows):
+            if row is None:
+                continue
+            if not isinstance(row, dict):
+                row = {'value': row}
+            for name, value in row.items():
+                if name not in columns:
+                    columns[name] = [None] * len(rows)
+                columns[name][i] = value
+        return {name: Model.to_array(values) for name, values in columns.items()}
+
+    @staticmethod
+    def to_array(values) -> np.ndarray:
+        """
+        Typed array for plain values, object array if the values contain None or tuples.
+        """
+        if any(value is None or isinstance(value, tuple) for value in values):
+            array = np.empty(len(values), dtype=object)
+            array[:] = values
+            return array
+        return np.asarray(values)
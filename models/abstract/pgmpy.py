@@ -1,22 +1,223 @@
 # inference.py
+from itertools import product
+import numpy as np
 from models.abstract.model import Model
+from models.ancestral_sampler import AncestralSampler
+from models.query_planner import QueryPlanner
 from pgmpy.inference import VariableElimination, CausalInference, BeliefPropagation
 
+class CompiledPosterior:
+    """
+    Posterior marginals of all query variables for every assignment of one
+    evidence/do signature, stored as dense NumPy tables.
+
+    tables[variable] has the shape (*cardinalities of evidence and do variables, cardinality of variable),
+    so the posterior for an assignment is a plain index lookup.
+    """
+    def __init__(self, evidence_variables, do_variables, state_names):
+        self.evidence_variables = tuple(evidence_variables)
+        self.do_variables = tuple(do_variables)
+        self.variables = self.evidence_variables + self.do_variables
+        self.state_names = [list(state_names[variable]) for variable in self.variables]
+        self.state_index = [{state: i for i, state in enumerate(states)} for states in self.state_names]
+        self.shape = tuple(len(states) for states in self.state_names)
+        self.tables = {}
+        self.factors = {}
+
+    def index(self, evidence, do) -> tuple:
+        """
+        Maps an evidence/do assignment to the table index. Raises KeyError for unknown states.
+        """
+        assignment = {**evidence, **do}
+        return tuple(self.state_index[i][assignment[variable]] for i, variable in enumerate(self.variables))
+
+    def lookup(self, evidence, do) -> dict:
+        """
+        Returns copies of the posterior factors for one assignment, the cached factors stay unchanged.
+        """
+        return {variable: factor.copy() for variable, factor in self.factors[self.index(evidence, do)].items()}
+
+    def probabilities(self, variable, assignments: dict) -> np.ndarray:
+        """
+        Vectorized lookup: assignments maps every evidence/do variable to an array of states,
+        the result has one row of posterior probabilities per assignment.
+        """
+        indices = tuple(
+            np.fromiter((self.state_index[i][state] for state in assignments[name]), dtype=np.intp)
+            for i, name in enumerate(self.variables)
+        )
+        return self.tables[variable][indices]
+
+
+class InterventionPolicy:
+    """
+    Compiled do-calculus decision: for every assignment of the evidence variables the do assignment
+    (one of do_options) with the smallest score and the interventional posteriors of that choice.
+
+    The score of an option is sum(P(target = state i | evidence, do) * weights[i]), e.g. the expected value
+    of the target for weights = state values, or -P(target = state i) to maximize a probability.
+    Ties keep the earlier option.
+    """
+    def __init__(self, spec, evidence_variables, do_variables, do_options, state_names):
+        self.spec = spec
+        self.evidence_variables = tuple(evidence_variables)
+        self.do_variables = tuple(do_variables)
+        self.do_options = do_options
+        self.state_names = [list(state_names[variable]) for variable in self.evidence_variables]
+        self.state_index = [{state: i for i, state in enumerate(states)} for states in self.state_names]
+        self.shape = tuple(len(states) for states in self.state_names)
+        self.decisions = np.zeros(self.shape, dtype=np.intp)
+        self.scores = np.zeros(self.shape + (len(do_options),))
+        self.factors = {}
+        self.tables = {}
+
+    def index(self, evidence) -> tuple:
+        return tuple(self.state_index[i][evidence[variable]] for i, variable in enumerate(self.evidence_variables))
+
+    def decide(self, evidence) -> tuple[dict, dict]:
+        """
+        Returns the chosen do assignment and the posterior factors under it.
+        """
+        index = self.index(evidence)
+        option = self.decisions[index]
+        return dict(self.do_options[option]), {variable: factor.copy() for variable, factor in self.factors[index].items()}
+
+    def decide_batch(self, evidence: dict) -> tuple[np.ndarray, dict]:
+        """
+        Vectorized decide(): evidence maps the evidence variables to arrays of states. Returns the index of the
+        chosen option per entry and per query variable one row of posterior probabilities per entry.
+        """
+        indices = tuple(
+            np.fromiter((self.state_index[i][state] for state in evidence[name]), dtype=np.intp)
+            for i, name in enumerate(self.evidence_variables)
+        )
+        return self.decisions[indices], {variable: table[indices] for variable, table in self.tables.items()}
+
+
 class PGMPYModel(Model):
     """
     Base class for all inference models.
     """
+    # Evidence/do signatures that are compiled in initialize(), all other
+    # signatures are compiled on their first use in sample().
+    compiled_signatures = [(('last_tool_change',), ())]
+    # Intervention policies (see intervention_policy) that are compiled in initialize()
+    compiled_policies = []
+
     def __init__(self, seed = None):
         super().__init__(seed=seed)
+        self.compiled_posteriors = {}
+        self.intervention_policies = {}
         
     def initialize(self):
+        self.compile_inference()
+        return super().initialize()
+
+    def compile_inference(self):
+        """
+        Builds the inference objects and the compiled policies for the current model, e.g. after a new structure
+        or new CPDs (see replace_cpds). The compiled tables are not checked against the CPDs on lookup.
+        This is the only place that compiles the policies of compiled_policies, all other policies are dropped
+        and compiled again on their next use.
+        """
+        self.intervention_policies = {}
+        self.build_inference()
+        for spec in self.compiled_policies:
+            if set(spec[0]) | set(spec[1]) | {spec[2]} <= set(self.model.nodes()):
+                self.intervention_policy(*spec)
+
+    def build_inference(self):
+        """
+        Creates the inference objects and the compiled posteriors for the current CPDs.
+        """
         # Inference-Objekte für reguläre Inferenz
         self.variable_elemination = VariableElimination(self.model)
         self.belief_propagation = BeliefPropagation(self.model)
 
         # CausalInference-Objekt für kausale Abfragen (do-Operator)
         self.causal_inference = CausalInference(self.model)
-        return super().initialize()
+        self.query_planner = QueryPlanner(self.model)
+        self.ancestral_sampler = AncestralSampler(self.model)
+
+        # Posterioren für alle Evidenz-Kombinationen einmalig vorberechnen
+        self.compiled_posteriors = {}
+        for evidence_variables, do_variables in self.compiled_signatures:
+            if set(evidence_variables) | set(do_variables) <= set(self.model.nodes()):
+                self.compile_posteriors(evidence_variables, do_variables)
+
+    def replace_cpds(self, *cpds):
+        """
+        Replaces the CPDs of their variables and compiles the inference again. CPDs changed in any other way
+        need a compile_inference() before the next lookup.
+        """
+        self.model.remove_cpds(*[cpd.variable for cpd in cpds if self.model.get_cpds(cpd.variable) is not None])
+        self.model.add_cpds(*cpds)
+        self.compile_inference()
+
+    def intervention_policy(self, evidence_variables, do_variables, target_variable, weights, variables=None) -> InterventionPolicy:
+        """
+        Returns the compiled InterventionPolicy, it is built on its first use.
+
+        evidence_variables, do_variables: tuples of variable names, all state combinations of the do variables are options
+        weights: tuple of (state position, weight) of the target variable for the score
+        variables: variables whose interventional posteriors are kept, None for all (as in sample())
+        """
+        spec = (tuple(evidence_variables), tuple(do_variables), target_variable, tuple(weights), None if variables is None else tuple(variables))
+        policy = self.intervention_policies.get(spec)
+        if policy is None:
+            policy = self.compile_intervention_policy(spec)
+            self.intervention_policies[spec] = policy
+        return policy
+
+    def decide_intervention(self, evidence, do_variables, target_variable, weights, variables=None) -> tuple[dict, dict]:
+        """
+        Returns the best do assignment for the evidence and the posterior factors under it,
+        looked up in the compiled policy. Evidence states outside the model are evaluated directly.
+        """
+        policy = self.intervention_policy(tuple(evidence), do_variables, target_variable, weights, variables)
+        try:
+            return policy.decide(evidence)
+        except KeyError:
+            option, factors, _ = self.evaluate_interventions(policy.spec, policy.do_options, evidence)
+            return policy.do_options[option], factors
+
+    def evaluate_interventions(self, spec, do_options, evidence) -> tuple[int, dict, list]:
+        """
+        Queries the target under every do option for one evidence assignment.
+        Returns the index of the option with the smallest score, its factors and all scores.
+        """
+        _, _, target_variable, weights, variables = spec
+        best, best_factors, scores = 0, None, []
+        for option, do in enumerate(do_options):
+            if variables is None:
+                factors = self.sample(evidence=evidence, do=do)
+            else:
+                factors = {variable: self.causal_inference.query(variables=[variable], evidence=evidence, do=do, show_progress=False)
+                           for variable in variables}
+            values = factors[target_variable].values
+            scores.append(sum(values[i] * weight for i, weight in weights))
+            # Bei Gleichstand bleibt die frühere Option
+            if best_factors is None or scores[-1] < scores[best]:
+                best, best_factors = option, factors
+        return best, best_factors, scores
+
+    def compile_intervention_policy(self, spec) -> InterventionPolicy:
+        evidence_variables, do_variables = spec[0], spec[1]
+        state_names = {variable: self.model.get_cpds(variable).state_names[variable] for variable in evidence_variables + do_variables}
+        do_options = [dict(zip(do_variables, states)) for states in product(*(state_names[variable] for variable in do_variables))]
+        policy = InterventionPolicy(spec, evidence_variables, do_variables, do_options, state_names)
+
+        for index in np.ndindex(*policy.shape):
+            evidence = {variable: policy.state_names[i][state] for i, (variable, state) in enumerate(zip(evidence_variables, index))}
+            option, factors, scores = self.evaluate_interventions(spec, do_options, evidence)
+            policy.decisions[index] = option
+            policy.scores[index] = scores
+            policy.factors[index] = factors
+            for variable, factor in factors.items():
+                if variable not in policy.tables:
+                    policy.tables[variable] = np.empty(policy.shape + (len(factor.values),))
+                policy.tables[variable][index] = factor.values / factor.values.sum()
+        return policy
 
     def inference(self) -> tuple[int, list[tuple]]:
         raise NotImplementedError("This method must be implemented in derived classes.")
@@ -52,10 +253,123 @@ class PGMPYModel(Model):
                     result[variable] = do_result
 
         return result
+
+    def compile_posteriors(self, evidence_variables=(), do_variables=()) -> CompiledPosterior:
+        """
+        Enumerates all states of the given evidence and do variables once and stores
+        the posteriors of the remaining variables in a CompiledPosterior.
+        """
+        signature = (tuple(sorted(evidence_variables)), tuple(sorted(do_variables)))
+        evidence_variables, do_variables = signature
+        state_names = {variable: self.model.get_cpds(variable).state_names[variable]
+                       for variable in evidence_variables + do_variables}
+        compiled = CompiledPosterior(evidence_variables, do_variables, state_names)
+
+        for index in np.ndindex(*compiled.shape):
+            states = [compiled.state_names[i][state] for i, state in enumerate(index)]
+            evidence = dict(zip(evidence_variables, states[:len(evidence_variables)]))
+            do = dict(zip(do_variables, states[len(evidence_variables):]))
+            result = self.query_posteriors(evidence=evidence, do=do)
+            compiled.factors[index] = result
+            for variable, factor in result.items():
+                if variable not in compiled.tables:
+                    compiled.tables[variable] = np.empty(compiled.shape + (len(factor.values),))
+                compiled.tables[variable][index] = factor.values / factor.values.sum()
+
+        self.compiled_posteriors[signature] = compiled
+        return compiled
     
     def sample(self, variable={}, evidence={}, do={}) -> list:
         """
         Führt eine Inferenz auf dem gelernten Modell durch.
+        Uses the compiled posterior tables, a signature is compiled on its first use.
+        """
+        if not self.model:
+            raise ValueError("No model for inference.")
+
+        signature = (tuple(sorted(evidence)), tuple(sorted(do)))
+        compiled = self.compiled_posteriors.get(signature)
+        if compiled is None:
+            try:
+                compiled = self.compile_posteriors(*signature)
+            except (KeyError, ValueError):
+                # Signature can not be enumerated (e.g. states outside the model)
+                return self.query_posteriors(evidence=evidence, do=do)
+
+        try:
+            return compiled.lookup(evidence, do)
+        except KeyError:
+            # Unknown state, let the query engine handle it
+            return self.query_posteriors(evidence=evidence, do=do)
+
+    def forward_sample(self, size, evidence={}, do={}, random_states=None) -> dict:
+        """
+        Draws size joint samples (state names per variable) with the compiled ancestral sampler,
+        evidence/do values are scalars or one state per sample. Sample i draws its uniforms from
+        random_states[i] if given.
+        """
+        if not self.model:
+            raise ValueError("No model for inference.")
+        random = None if random_states is None else lambda size: self.uniforms(random_states)
+        return self.ancestral_sampler.sample(size, evidence=evidence, do=do, random=random)
+
+    def forward_sample_indices(self, size, evidence={}, do={}, random_states=None) -> dict:
+        """
+        Same as forward_sample(), but returns the state indices per variable (in the order of
+        ancestral_sampler.state_names), e.g. to look up a value per state.
+        """
+        if not self.model:
+            raise ValueError("No model for inference.")
+        random = None if random_states is None else lambda size: self.uniforms(random_states)
+        return self.ancestral_sampler.sample_indices(size, evidence=evidence, do=do, random=random)
+
+    def posterior_batch(self, evidence: dict, do: dict = {}) -> dict:
+        """
+        Vectorized version of sample(): evidence and do map variable names to arrays of states,
+        the result maps every query variable to an array with one row of probabilities per entry.
+        """
+        signature = (tuple(sorted(evidence)), tuple(sorted(do)))
+        compiled = self.compiled_posteriors.get(signature) or self.compile_posteriors(*signature)
+        assignments = {**evidence, **do}
+        return {variable: compiled.probabilities(variable, assignments) for variable in compiled.tables}
+
+    @staticmethod
+    def uniforms(random_states) -> np.ndarray:
+        """One uniform from every generator."""
+        return np.array([random_state.random() for random_state in random_states])
+
+    @staticmethod
+    def sample_categorical(probabilities: np.ndarray, states, random_states=None) -> np.ndarray:
+        """
+        Draws one state per row of probabilities by inverse-CDF lookup (same as np.random.choice per row,
+        or random_states[i].choice for row i).
+        """
+        cdf = np.cumsum(probabilities, axis=1)
+        cdf /= cdf[:, -1:]
+        uniforms = np.random.random(len(probabilities)) if random_states is None else PGMPYModel.uniforms(random_states)
+        indices = (cdf <= uniforms[:, None]).sum(axis=1)
+        return np.asarray(states)[np.minimum(indices, cdf.shape[1] - 1)]
+
+    def sample_by_key(self, keys, random_states=None) -> np.ndarray:
+        """
+        Draws from self.distributions for every key with draw_variates(), one call per distinct key
+        (entry i from random_states[i] if given). Entries without a distribution stay NaN.
+        """
+        values = np.full(len(keys), np.nan)
+        rows = {}
+        for i, key in enumerate(keys):
+            rows.setdefault(key, []).append(i)
+        for key, indices in rows.items():
+            if key in self.distributions:
+                key_random_states = None if random_states is None else [random_states[i] for i in indices]
+                values[indices] = self.draw_variates(key, self.distributions[key], len(indices), key_random_states)
+            else:
+                self.logger.error(f"No distribution found for parent values: {key[1]}. Using default mean and variance.")
+        return values
+
+    def query_posteriors(self, evidence={}, do={}) -> dict:
+        """
+        Runs the query engine for every variable that is neither evidence nor intervened on.
         """
         if not self.model:
             raise ValueError("No model for inference.")
@@ -65,39 +379,29 @@ class PGMPYModel(Model):
         #else:
             #all_model_variables = variable
 
-        result = {}
-        
         # Get all variables in the model
         all_model_variables = set(self.model.nodes())
 
         # Remove any variables that are in `evidence` or `do`
         query_variables = list(all_model_variables - set(evidence) - set(do))
-        
-        # Inference (No do-intervention)
-        if not any(do):
-            for variable in query_variables:
-                
-                query_result = self.causal_inference.query(
-                    variables=[variable], 
-                    evidence=evidence, 
-                    joint=True, 
-                    show_progress=False
-                )
-                result[variable] = query_result
-
-        # Causal Inference (do-Intervention)
-        else:
-            for variable in query_variables:
-                do_result = self.causal_inference.query(
-                    variables=[variable], 
-                    evidence=evidence, 
-                    adjustment_set=set(do), 
-                    do=do, 
-                    joint=True, 
-                    inference_algo="ve", 
-                    show_progress=False
-                )
-                result[variable] = do_result
 
-        return result
+        # One joint query per signature with cached pruned graph, adjustment set and elimination order.
+        # Causal Inference (do-Intervention) adjusts for the do variables as before.
+        adjustment_set = set(do) if any(do) else None
+        try:
+            return self.query_planner.query(query_variables, evidence, do if any(do) else {}, adjustment_set)
+        except ValueError:
+            # Signature not supported by the planner, query every variable separately
+            pass
 
+        result = {}
+        for variable in query_variables:
+            result[variable] = self.causal_inference.query(
+                variables=[variable],
+                evidence=evidence,
+                adjustment_set=adjustment_set,
+                do=do if any(do) else None,
+                inference_algo="ve",
+                show_progress=False
+            )
+        return result
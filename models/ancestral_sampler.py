@@ -0,0 +1,68 @@
+import networkx as nx
+import numpy as np
+
+
+class AncestralSampler:
+    """
+    Forward (ancestral) sampling of a discrete Bayesian network: the variables are drawn in topological order,
+    every variable from its CPD given the already drawn states of its parents, so the samples follow the joint
+    distribution. The CPDs are compiled once to cumulative tables of shape (*parent cardinalities, cardinality),
+    a draw is one uniform per sample and an inverse-CDF lookup.
+    """
+    def __init__(self, model):
+        self.order = list(nx.lexicographical_topological_sort(model))
+        self.parents = {}
+        self.cdfs = {}
+        self.state_names = {}
+        self.state_index = {}
+        for variable in self.order:
+            cpd = model.get_cpds(variable)
+            parents = list(cpd.variables[1:])
+            cdf = np.cumsum(np.moveaxis(cpd.values, 0, -1), axis=-1)
+            self.cdfs[variable] = cdf / cdf[..., -1:]
+            self.parents[variable] = parents
+            self.state_names[variable] = list(cpd.state_names[variable])
+            self.state_index[variable] = {state: i for i, state in enumerate(self.state_names[variable])}
+        self.ancestors = {variable: nx.ancestors(model, variable) for variable in self.order}
+
+    def state_indices(self, variable, states, size) -> np.ndarray:
+        """
+        Maps given states (scalar or one per sample) to state indices. Raises KeyError for unknown states.
+        """
+        index = self.state_index[variable]
+        if np.ndim(states) == 0:
+            return np.full(size, index[states], dtype=np.intp)
+        return np.fromiter((index[state] for state in states), dtype=np.intp, count=len(states))
+
+    def sample_indices(self, size, evidence={}, do={}, random=None) -> dict:
+        """
+        Draws size joint samples as state indices per variable.
+
+        evidence: observed variables (scalar state or one state per sample), all their ancestors must be observed
+        too, otherwise clamping them is not conditioning and a ValueError is raised
+        do: intervened variables, clamped without conditions
+        random: function returning size uniforms (default np.random.random, e.g. Generator.random)
+        """
+        fixed = {**evidence, **do}
+        for variable in evidence:
+            if not self.ancestors[variable] <= set(fixed):
+                raise ValueError(f"Evidence on {variable} needs evidence on all its ancestors for ancestral sampling.")
+        random = random or np.random.random
+        samples = {}
+        for variable in self.order:
+            if variable in fixed:
+                samples[variable] = self.state_indices(variable, fixed[variable], size)
+                continue
+            cdf = self.cdfs[variable][tuple(samples[parent] for parent in self.parents[variable])]
+            if cdf.ndim == 1:
+                cdf = np.broadcast_to(cdf, (size, len(cdf)))
+            uniforms = random(size)
+            samples[variable] = np.minimum((cdf <= uniforms[:, None]).sum(axis=1), cdf.shape[1] - 1)
+        return samples
+
+    def sample(self, size, evidence={}, do={}, random=None) -> dict:
+        """
+        Same as sample_indices(), but returns arrays of state names.
+        """
+        samples = self.sample_indices(size, evidence, do, random)
+        return {variable: np.asarray(self.state_names[variable])[indices] for variable, indices in samples.items()}
@@ -0,0 +1,199 @@
+import os
+import pickle
+import hashlib
+import functools
+import inspect
+import logging
+import tempfile
+from importlib import metadata
+import pandas as pd
+from modules.logger import Logger
+
+# Cache settings, can be overwritten with environment variables
+CACHE_ENABLED = os.environ.get("PLANCAUSAL_CACHE", "1") not in ("0", "false", "off")
+CACHE_DIR = os.environ.get("PLANCAUSAL_CACHE_DIR", "./output/cache")
+CACHE_MAX_MB = float(os.environ.get("PLANCAUSAL_CACHE_MAX_MB", "512"))
+# Part of every key, increase it when learning code outside the cached methods changes its results
+CACHE_VERSION = 2
+# Libraries whose version is part of every key
+LEARNING_LIBRARIES = ('pgmpy', 'gcastle')
+
+
+class LearningCache:
+    """
+    Content addressed on-disk cache for learned structures, CPDs and distribution parameters.
+    Every entry is one pickle file named by the hash of its key, the least recently used entries
+    are evicted when the directory grows beyond max_size_mb.
+    """
+    def __init__(self, directory=CACHE_DIR, max_size_mb=CACHE_MAX_MB, enabled=CACHE_ENABLED):
+        self.directory = directory
+        self.max_size = max_size_mb * 1024 * 1024
+        self.enabled = enabled
+        self.logger = Logger.get_global_logger(category="Model", level=logging.DEBUG, log_to_file=True, log_filename="output/logs/app.log")
+
+    @staticmethod
+    def key(*parts) -> str:
+        """
+        Hash of the key parts, edge views and dicts are normalized so equal content gives equal keys.
+        """
+        return hashlib.sha256(repr(tuple(normalize(part) for part in parts)).encode()).hexdigest()
+
+    def path(self, key) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key) -> tuple[bool, object]:
+        """
+        Returns (True, value) for a hit, (False, None) otherwise.
+        """
+        path = self.path(key)
+        if not self.enabled or not os.path.exists(path):
+            return False, None
+        try:
+            with open(path, "rb") as file:
+                value = pickle.load(file)
+        except Exception as e:
+            self.logger.error(f"Removing unreadable cache entry {path}: {e}")
+            self.remove(path)
+            return False, None
+        # Zugriffszeit für die LRU-Verdrängung aktualisieren
+        os.utime(path)
+        return True, value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        # Atomar schreiben, parallele Experimente können denselben Eintrag erzeugen
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(handle, "wb") as file:
+            pickle.dump(value, file)
+        os.replace(temp_path, self.path(key))
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits into max_size.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".pkl"):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            self.remove(path)
+            size -= entry_size
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(".pkl"):
+                    self.remove(os.path.join(self.directory, name))
+
+
+_cache = None
+
+def get_cache() -> LearningCache:
+    global _cache
+    if _cache is None:
+        _cache = LearningCache()
+    return _cache
+
+def set_cache(cache: LearningCache):
+    global _cache
+    _cache = cache
+
+
+def normalize(value):
+    if isinstance(value, pd.DataFrame):
+        return data_hash(value)
+    if isinstance(value, dict):
+        return tuple(sorted((repr(key), normalize(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)) or type(value).__name__.endswith("EdgeView"):
+        items = [normalize(item) for item in value]
+        # Kanten sind ungeordnet
+        return tuple(sorted(items, key=repr)) if type(value).__name__.endswith("EdgeView") else tuple(items)
+    return value
+
+def data_hash(data: pd.DataFrame) -> str:
+    """
+    Hash of the content of a DataFrame including column names and dtypes.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr([(str(column), str(dtype)) for column, dtype in data.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def library_versions() -> tuple:
+    """Installed versions of the LEARNING_LIBRARIES, None for a missing library."""
+    versions = []
+    for library in LEARNING_LIBRARIES:
+        try:
+            versions.append((library, metadata.version(library)))
+        except metadata.PackageNotFoundError:
+            versions.append((library, None))
+    return tuple(versions)
+
+def source_hash(function) -> str:
+    """Hash of the source code of a function (of its bytecode if the source is not available)."""
+    try:
+        source = inspect.getsource(function).encode()
+    except (OSError, TypeError):
+        source = function.__code__.co_code
+    return hashlib.sha256(source).hexdigest()
+
+
+def truth_edges(model):
+    """
+    Sorted edges of the truth model if the learned result depends on it (the portfolio stops at and picks by the
+    SHD against it), None otherwise.
+    """
+    truth_model = getattr(model, 'truth_model', None)
+    if truth_model is None or model.structure_learning_lib != 'portfolio':
+        return None
+    return sorted(truth_model.model.edges())
+
+
+def cached_learning(attributes=()):
+    """
+    Decorator for the learning methods of the causal models. The result and the given attributes of the model
+    are cached by the observed data, the structure learning settings and the arguments of the method.
+    The keys also contain CACHE_VERSION, the source of the method and the versions of the learning libraries,
+    so entries of changed code or libraries are not used, and the truth model where it changes the result (see truth_edges).
+    """
+    def decorator(function):
+        function_hash = source_hash(function)
+
+        @functools.wraps(function)
+        def wrapper(self, *args):
+            cache = get_cache()
+            if not cache.enabled:
+                return function(self, *args)
+            key = cache.key(CACHE_VERSION, function_hash, library_versions(), type(self).__name__, function.__name__, self.data,
+                            self.structure_learning_lib, self.structure_learning_method, self.estimator, self.kwargs,
+                            truth_edges(self), args)
+            hit, value = cache.get(key)
+            if hit:
+                self.logger.debug(f"Using cached {function.__name__} of {type(self).__name__}.")
+                for name, attribute in value['attributes'].items():
+                    setattr(self, name, attribute)
+                return value['result']
+            result = function(self, *args)
+            cache.put(key, {'result': result, 'attributes': {name: getattr(self, name) for name in attributes}})
+            return result
+        return wrapper
+    return decorator
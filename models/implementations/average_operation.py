@@ -33,7 +33,7 @@ class AverageOperationModel(Model):
             #return None  # No data available for inference        
         return round(avg_operation_deviation, 0)
 
-    def inference(self, operation: Operation, current_tool, do_calculus) -> tuple[int, list[tuple]]:      
+    def inference(self, operation: Operation, current_tool, do_calculus, random_state=None) -> tuple[int, list[tuple]]:      
         new_duration = self.get_new_duration(operation)
         if new_duration is None:
             raise ValueError(f"Operation {new_duration} not found in the operation dictionary.")
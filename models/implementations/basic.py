@@ -19,6 +19,10 @@ class BasicModel(Model):
     def sample(self, model) -> list:
         pass
 
-    def inference(self, operation: Operation, current_tool, do_calculus) -> tuple[int, list[tuple]]:
+    def inference(self, operation: Operation, current_tool, do_calculus, random_state=None) -> tuple[int, list[tuple]]:
         return self.get_new_duration(operation), None
 
+    def inference_batch(self, operations: list[Operation], current_tools, do_calculus, random_states=None) -> tuple[np.ndarray, dict]:
+        # inference() infers no variables (None), as columns that is an empty dict
+        return np.array([operation.duration for operation in operations], dtype=np.float64), {}
+
@@ -1,172 +1,39 @@
-import pandas as pd
-import os
 import numpy as np
-import networkx as nx
-from pgmpy.models import BayesianNetwork
-from pgmpy.estimators import BayesianEstimator
-from castle.algorithms import PC, GES, CORL, DAG_GNN, Notears
-from pgmpy.estimators import HillClimbSearch, ExhaustiveSearch
-from models.abstract.pgmpy import PGMPYModel
-from models.utils import compare_structures
+from models.abstract.causal_learning import CausalLearningModel
+from models.variate_pool import VARIATE_POOL_SIZE
+from models.cache import cached_learning
 from modules.simulation import Operation
-from sklearn.mixture import GaussianMixture
 
-class CausalContinousModel(PGMPYModel):    
+class CausalContinousModel(CausalLearningModel):    
+    # Continuous draws per parent configuration come from a VariatePool
+    variate_pool_size = VARIATE_POOL_SIZE
+    continuous_variables = ('relative_processing_time_deviation',)
+    # Distributions per parent configuration, fitted from their moments and updated online
+    distribution_family = 'gaussian'
+
     def __init__(self, csv_file, truth_model=None, structure_learning_lib = 'pgmpy', structure_learning_method='HillClimbSearch', estimator='BDeu', **kwargs):        
-        super().__init__()
-        self.csv_file = csv_file
-        self.truth_model = truth_model
-        self.edges = []
-        self.structure_learning_lib = structure_learning_lib
-        self.structure_learning_method = structure_learning_method  # Can be 'PC', 'GES', or a custom function
-        self.estimator = estimator  # Bayesian Estimation method
+        super().__init__(csv_file, truth_model, structure_learning_lib, structure_learning_method, estimator, **kwargs)
         self.distributions = {}
-        self.model = None
-        self.kwargs = kwargs  # Additional arguments for learning algorithms
-        
-         #TODO Use Feedback data and merge with oberseved data
 
     def initialize(self):
-        self.data = self.read_from_csv(self.csv_file)
-        
-        if self.truth_model:
-            successful_models = self.learn_truth_causal_model()
-            self.logger.debug(f"Number of successful learned models: {len(successful_models)}")
-            self.model = successful_models[0] if successful_models else self.truth_model.model
-        else:
-            self.model = self.learn_causal_model()
+        self.learn_model()
         
-        self.learn_distributions(self.truth_model.model.edges)
+        self.learn_parameters()
         #self.logger.debug(f"Learned distributions: {self.distributions}")
         
         super().initialize()
     
-    def learn_distributions(self, edges):
-        # Filter data to only include the target variable and its parent variables
-        target_variable = 'relative_processing_time_deviation'
-        parent_variables = [edge[0] for edge in edges if edge[1] == target_variable]
-        relevant_columns = parent_variables + [target_variable]
-        filtered_data = self.data[relevant_columns].dropna()
-
-        # Iterate over all unique combinations of parent variable values
-        parent_combinations = filtered_data[parent_variables].drop_duplicates()
-        for _, combination in parent_combinations.iterrows():
-            # Filter data for the current combination of parent variable values
-            condition = (filtered_data[parent_variables] == combination.values).all(axis=1)
-            subset = filtered_data[condition][[target_variable]]
-
-            # Fit a Gaussian Mixture Model to estimate the distribution
-            gmm = GaussianMixture(n_components=1, random_state=42)
-            gmm.fit(subset)
-
-            # Extract the mean and variance of the Gaussian distribution
-            mean = gmm.means_.flatten()[0]
-            variance = gmm.covariances_.flatten()[0]
+    def learn_parameters(self):
+        self.learn_distributions(self.truth_model.model.edges)
+        self.track_distributions(self.truth_model.model.edges)
 
-            # Store the distribution parameters with variable names and parent values
-            self.distributions[(target_variable, tuple(combination.items()))] = {'mean': mean, 'variance': variance}
+    @cached_learning(attributes=('distributions',))
+    def learn_distributions(self, edges):
+        # Moments of all parent configurations in one groupby pass
+        self.fit_distributions(edges)
             
-    def read_from_csv(self, file): 
-        """ Read dataset from CSV, handling errors gracefully. """
-        if not file or not os.path.exists(file):
-            raise FileExistsError(f"File not found: {file}.")
-
-        try:
-            data = pd.read_csv(file)
-            data.drop(columns=data.columns[0], axis=1, inplace=True)
-            return data
-        except Exception as e:
-            raise ImportError(f"Error reading file {file}: {e}")
-        
-    def gcastle_structure_learning(self, method='PC', **kwargs):
-        """ Wrapper for gCastle's structure learning algorithms. """
-        colum_names = self.data.columns.tolist()
-        data_array = np.array(self.data, dtype=float)
-
-        algorithms = {
-            'PC': PC,
-            'GES': GES,
-            'CORL': lambda **kw: CORL(device_type="gpu", iteration=1000, **kw),
-            'DAG_GNN': lambda **kw: DAG_GNN(device_type="gpu", **kw),
-            'Notears': Notears
-        }
-
-        if method not in algorithms:
-            raise ValueError(f"Unsupported method: {method}")
-
-        model = algorithms[method](**kwargs)
-        model.learn(data_array)
-
-        return [(colum_names[i], colum_names[j]) 
-                for i in range(len(colum_names)) 
-                for j in range(len(colum_names)) if model.causal_matrix[i, j] != 0]
-    
-    def pgmpy_structure_learning(self, method='HillClimbSearch', **kwargs):
-        """ Wrapper for gCastle's structure learning algorithms. """
-        if method == 'HillClimbSearch':
-            est = HillClimbSearch(self.data)
-            edges = list(est.estimate(scoring_method='bicscore').edges())
-        elif method == 'ExhaustiveSearch':
-            est = ExhaustiveSearch(self.data)
-            edges = list(est.estimate().edges())
-        else:
-            raise ValueError(f"Unsupported method: {method}")
-        
-        return edges
-
-    def learn_causal_model(self):
-        """ Learn a causal model dynamically based on the chosen method. """
-        method_name = f"{self.structure_learning_lib}_structure_learning"
-
-        if not hasattr(self, method_name):
-            raise ValueError(f"Unsupported structure learning library: {self.structure_learning_lib}")
-
-        # Dynamically call the method
-        structure_learning_function = getattr(self, method_name)
-        learned_structure = structure_learning_function(self.structure_learning_method, **self.kwargs)
-
-        # Check if learned_structure is a list, a pandas DataFrame, or a NetworkX graph
-        if isinstance(learned_structure, list):
-            # If it's a list of edges, use it directly
-            self.edges = learned_structure
-        elif isinstance(learned_structure, pd.DataFrame):
-            # If it's a DataFrame (adjacency matrix), convert it to an edge list
-            graph = nx.from_pandas_adjacency(learned_structure, create_using=nx.DiGraph)
-            self.edges = graph.edges()  # Get the edges as a list of tuples
-        elif isinstance(learned_structure, nx.DiGraph):
-            # If it's already a DiGraph, get the edges directly
-            self.edges = learned_structure.edges()
-        else:
-            raise ValueError("Unsupported learned structure format")
-
-        # Now create the Bayesian Network with the edge list
-        model = BayesianNetwork(self.edges)
-        model.fit(self.data, estimator=BayesianEstimator, prior_type=self.estimator)
-
-        if not model.check_model():
-            raise ValueError("Invalid learned model.")
-
-        return model
-
-    def learn_truth_causal_model(self):
-        """ Test various algorithms and retain the best one. """
-        successful_models = []
-
-        try:
-            learned_model = self.learn_causal_model()
-            metrics = compare_structures(truth_model=self.truth_model.model, learned_model=learned_model)
-            if metrics['SHD'] == 0:
-                successful_models.append(learned_model)
-                self.logger.debug(f"Model successfully matched the truth model.")
-            else:
-                self.logger.debug("Failed to match the truth model.")
-
-        except Exception as e:
-            self.logger.debug(f"Error learning model: {e}")
-
-        return successful_models
-    
-    def inference(self, operation: Operation, current_tool, do_calculus) -> tuple[int, list[tuple]]:
+    def inference(self, operation: Operation, current_tool, do_calculus, random_state=None) -> tuple[int, list[tuple]]:
+        random_state = np.random if random_state is None else random_state
         last_tool_change = operation.tool != current_tool
             
         evidence = {
@@ -186,13 +53,13 @@ class CausalContinousModel(PGMPYModel):
         if 'machine_state' in result:
             machine_state_values = result['machine_state'].values
             machine_state_probabilities = machine_state_values / machine_state_values.sum()  # Normalize
-            machine_state = np.random.choice([0, 1], p=machine_state_probabilities)
+            machine_state = random_state.choice([0, 1], p=machine_state_probabilities)
 
         # Sampling for the cleaning variable (discrete)
         if 'cleaning' in result:
             cleaning_values = result['cleaning'].values
             cleaning_probabilities = cleaning_values / cleaning_values.sum()  # Normalize
-            cleaning = np.random.choice([0, 1], p=cleaning_probabilities)
+            cleaning = random_state.choice([0, 1], p=cleaning_probabilities)
             
         # Use the learned distributions for sampling
         # Extract the parent variable values from the evidence
@@ -202,13 +69,8 @@ class CausalContinousModel(PGMPYModel):
         # Check if the parent combination exists in the learned distributions
         key = ('relative_processing_time_deviation', parent_values)
         if key in self.distributions:
-            params = self.distributions[key]
-            mean = params['mean']
-            variance = params['variance']
-            std_dev = np.sqrt(variance)
-            
-            # Sample from the Gaussian distribution
-            relative_processing_time_deviation = np.random.normal(mean, std_dev)
+            # Sample from the Gaussian distribution (pre-drawn per parent combination)
+            relative_processing_time_deviation = self.draw_variate(key, self.distributions[key], random_state)
             if relative_processing_time_deviation <= 0.2:
                 relative_processing_time_deviation = 1.0
         else:
@@ -222,3 +84,33 @@ class CausalContinousModel(PGMPYModel):
         }
             
         return round(operation.duration * inferenced_variables['relative_processing_time_deviation'], 0), inferenced_variables
+
+    def sample_variates(self, params, size, random_state=None):
+        # Gaussian distribution of relative_processing_time_deviation
+        random_state = np.random if random_state is None else random_state
+        return random_state.normal(params['mean'], np.sqrt(params['variance']), size)
+
+    def inference_batch(self, operations: list[Operation], current_tools, do_calculus, random_states=None) -> tuple[np.ndarray, dict]:
+        if not {'machine_state', 'cleaning'} <= set(self.model.nodes()):
+            return super().inference_batch(operations, current_tools, do_calculus, random_states)
+
+        last_tool_change = np.array([operation.tool != current_tool for operation, current_tool in zip(operations, current_tools)])
+        result = self.posterior_batch(evidence={'last_tool_change': last_tool_change})
+
+        # Sampling for the machine_state and cleaning variables (discrete)
+        machine_state = self.sample_categorical(result['machine_state'], [0, 1], random_states)
+        cleaning = self.sample_categorical(result['cleaning'], [0, 1], random_states)
+
+        # Gaussian distribution per parent combination of machine_state and cleaning
+        keys = [('relative_processing_time_deviation', (('machine_state', m), ('cleaning', c))) for m, c in zip(machine_state, cleaning)]
+        relative_processing_time_deviation = self.sample_by_key(keys, random_states)
+        relative_processing_time_deviation[relative_processing_time_deviation <= 0.2] = 1.0
+
+        durations = np.array([operation.duration for operation in operations], dtype=float)
+        inferenced_variables = {
+            'last_tool_change': last_tool_change,
+            'relative_processing_time_deviation': relative_processing_time_deviation,
+            'machine_status': machine_state,
+            'cleaning': cleaning
+        }
+        return np.round(durations * relative_processing_time_deviation, 0), inferenced_variables
@@ -19,3 +19,8 @@ class ExponentialDistributionModel(DistributionModel):
         """
         lambda_ = params[0]
         return np.random.exponential(1 / lambda_)
+
+    def sample_batch(self, params, size, random_state=None):
+        lambda_ = params[0]
+        random_state = np.random if random_state is None else random_state
+        return random_state.exponential(1 / lambda_, size)
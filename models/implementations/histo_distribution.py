@@ -29,4 +29,7 @@ class HistoDistributionModel(DistributionModel):
         """
         sample = empirical_dist.rvs()
         
-        return sample
\ No newline at end of file
+        return sample
+
+    def sample_batch(self, empirical_dist, size, random_state=None):
+        return empirical_dist.rvs(size=size, random_state=random_state)
@@ -35,6 +35,11 @@ class LogNormalDistributionModel(DistributionModel):
         mu, sigma = params
         return np.random.lognormal(mu, sigma)
 
+    def sample_batch(self, params, size, random_state=None):
+        mu, sigma = params
+        random_state = np.random if random_state is None else random_state
+        return random_state.lognormal(mu, sigma, size)
+
     def check_log_normality(self, data):
         log_data = np.log(data)
 
@@ -18,3 +18,8 @@ class NormalDistributionModel(DistributionModel):
         """
         mu, sigma = params
         return np.random.normal(mu, sigma)
+
+    def sample_batch(self, params, size, random_state=None):
+        mu, sigma = params
+        random_state = np.random if random_state is None else random_state
+        return random_state.normal(mu, sigma, size)
@@ -151,7 +151,7 @@ class TruthModel(PGMPYModel):
         
         return model
     
-    def inference(self, operation: Operation, current_tool, do_calculus) -> tuple[int, list[tuple]]:      
+    def inference(self, operation: Operation, current_tool, do_calculus, random_state=None) -> tuple[int, list[tuple]]:      
         
         last_tool_change =  operation.tool != current_tool
         
@@ -160,32 +160,14 @@ class TruthModel(PGMPYModel):
             # Weitere Evidenzen können hier hinzugefügt werden, falls nötig
         }
                      
-        result = self.sample(evidence=evidence)
+        # Gemeinsame Stichprobe in topologischer Reihenfolge, jede Variable bedingt auf die gezogenen Eltern
+        indices = self.forward_sample_indices(1, evidence=evidence, random_states=None if random_state is None else [random_state])
+        state_names = self.ancestral_sampler.state_names
+        machine_state = state_names['machine_state'][indices['machine_state'][0]]
+        cleaning = state_names['cleaning'][indices['cleaning'][0]]
 
-        # Variablen für relative_processing_time_deviation, machine_state und cleaning initialisieren
-        machine_state = None
-        cleaning = None
-        
-
-        # Sampling for the relative_processing_time_deviation variable
-        if 'relative_processing_time_deviation' in result:
-            relative_processing_time_deviation_values = result['relative_processing_time_deviation'].values
-            relative_processing_time_deviation_probabilities = relative_processing_time_deviation_values / relative_processing_time_deviation_values.sum()  # Normalize
-
-            # Three possible states: 0.9, 1.0, 1.2
-            relative_processing_time_deviation = np.random.choice([0.9, 1.0, 1.2], p=relative_processing_time_deviation_probabilities)
-        
-        # Sampling für die machine_state-Variable
-        if 'machine_state' in result:
-            machine_state_values = result['machine_state'].values
-            machine_state_probabilities = machine_state_values / machine_state_values.sum()  # Normalisieren
-            machine_state = np.random.choice([0, 1], p=machine_state_probabilities)
-        
-        # Sampling für die cleaning-Variable
-        if 'cleaning' in result:
-            cleaning_values = result['cleaning'].values
-            cleaning_probabilities = cleaning_values / cleaning_values.sum()  # Normalisieren
-            cleaning = np.random.choice([0, 1], p=cleaning_probabilities)
+        # Three possible states: 0.9, 1.0, 1.2 (by state index)
+        relative_processing_time_deviation = [0.9, 1.0, 1.2][indices['relative_processing_time_deviation'][0]]
         
 
         inferenced_variables = {
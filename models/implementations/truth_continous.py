@@ -166,19 +166,21 @@ class TruthContinousModel(PGMPYModel):
 
         return sampled_results
     
-    def get_new_duration(self, operation: Operation, inferenced_variables) -> int:
+    def get_new_duration(self, operation: Operation, inferenced_variables, random_state=None) -> int:
+        random_state = np.random if random_state is None else random_state
         base_duration = operation.duration * inferenced_variables['relative_processing_time_deviation']
 
         # Generate log-normal noise around base duration
         if self.lognormal_shape_modifier:
-            log_normal_factor = np.random.lognormal(mean=0, sigma=0.08)  # Small deviation
+            log_normal_factor = random_state.lognormal(mean=0, sigma=0.08)  # Small deviation
             new_duration = base_duration * log_normal_factor  # Introduce log-normal variation
         else: 
             new_duration = base_duration
         
         return round(new_duration, 0)
     
-    def inference(self, operation: Operation, current_tool, do_calculus) -> tuple[int, list[tuple]]:      
+    def inference(self, operation: Operation, current_tool, do_calculus, random_state=None) -> tuple[int, list[tuple]]:      
+        random_state = np.random if random_state is None else random_state
         
         last_tool_change =  operation.tool != current_tool
         
@@ -187,32 +189,14 @@ class TruthContinousModel(PGMPYModel):
             # Weitere Evidenzen können hier hinzugefügt werden, falls nötig
         }
                      
-        result = self.sample(evidence=evidence)
+        # Gemeinsame Stichprobe in topologischer Reihenfolge, jede Variable bedingt auf die gezogenen Eltern
+        indices = self.forward_sample_indices(1, evidence=evidence, random_states=[random_state])
+        state_names = self.ancestral_sampler.state_names
+        machine_state = state_names['machine_state'][indices['machine_state'][0]]
+        cleaning = state_names['cleaning'][indices['cleaning'][0]]
 
-        # Variablen für relative_processing_time_deviation, machine_state und cleaning initialisieren
-        machine_state = None
-        cleaning = None
-
-        # Sampling für die machine_state-Variable
-        if 'machine_state' in result:
-            machine_state_values = result['machine_state'].values
-            machine_state_probabilities = machine_state_values / machine_state_values.sum()  # Normalisieren
-            machine_state = np.random.choice([0, 1], p=machine_state_probabilities)
-        
-        # Sampling für die cleaning-Variable
-        if 'cleaning' in result:
-            cleaning_values = result['cleaning'].values
-            cleaning_probabilities = cleaning_values / cleaning_values.sum()  # Normalisieren
-            cleaning = np.random.choice([0, 1], p=cleaning_probabilities)
-        
-        
-        # Sampling for the relative_processing_time_deviation variable
-        if 'relative_processing_time_deviation' in result:
-            relative_processing_time_deviation_values = result['relative_processing_time_deviation'].values
-            relative_processing_time_deviation_probabilities = relative_processing_time_deviation_values / relative_processing_time_deviation_values.sum()  # Normalize
-
-            # Three possible states: 0.9, 1.0, 1.2
-            relative_processing_time_deviation = np.random.choice([0.9, 1.0, 1.2], p=relative_processing_time_deviation_probabilities)
+        # Three possible states: 0.9, 1.0, 1.2 (by state index)
+        relative_processing_time_deviation = [0.9, 1.0, 1.2][indices['relative_processing_time_deviation'][0]]
         
         # Create parent_values using machine_state and cleaning variables
         parent_values = (('machine_state', machine_state), ('cleaning', cleaning))
@@ -225,7 +209,7 @@ class TruthContinousModel(PGMPYModel):
             std_dev = np.sqrt(variance)
             
             # Sample from the Gaussian distribution
-            relative_processing_time_deviation = np.random.normal(mean, std_dev)
+            relative_processing_time_deviation = random_state.normal(mean, std_dev)
             if relative_processing_time_deviation <= 0.2:
                 relative_processing_time_deviation = 1.0
         else:
@@ -240,5 +224,40 @@ class TruthContinousModel(PGMPYModel):
             'cleaning': cleaning
         }
             
-        return self.get_new_duration(operation=operation, inferenced_variables=inferenced_variables), inferenced_variables
+        return self.get_new_duration(operation=operation, inferenced_variables=inferenced_variables, random_state=random_state), inferenced_variables
+
+    def sample_variates(self, params, size, random_state=None):
+        # Gaussian distribution of relative_processing_time_deviation
+        random_state = np.random if random_state is None else random_state
+        return random_state.normal(params['mean'], np.sqrt(params['variance']), size)
+
+    def inference_batch(self, operations: list[Operation], current_tools, do_calculus, random_states=None) -> tuple[np.ndarray, dict]:
+        last_tool_change = np.array([operation.tool != current_tool for operation, current_tool in zip(operations, current_tools)])
+
+        # Gemeinsame Stichproben für machine_state, cleaning und relative_processing_time_deviation
+        indices = self.forward_sample_indices(len(operations), evidence={'last_tool_change': last_tool_change}, random_states=random_states)
+        state_names = self.ancestral_sampler.state_names
+        machine_state = np.asarray(state_names['machine_state'])[indices['machine_state']]
+        cleaning = np.asarray(state_names['cleaning'])[indices['cleaning']]
+        relative_processing_time_deviation = np.array([0.9, 1.0, 1.2])[indices['relative_processing_time_deviation']]
+
+        # Gaussian distribution per parent combination of machine_state and cleaning
+        keys = [('relative_processing_time_deviation', (('machine_state', m), ('cleaning', c))) for m, c in zip(machine_state, cleaning)]
+        continuous = self.sample_by_key(keys, random_states)
+        continuous[continuous <= 0.2] = 1.0
+        relative_processing_time_deviation = np.where(np.isnan(continuous), relative_processing_time_deviation, continuous)
 
+        base_duration = np.array([operation.duration for operation in operations], dtype=float) * relative_processing_time_deviation
+        if self.lognormal_shape_modifier:
+            if random_states is None:
+                base_duration = base_duration * np.random.lognormal(mean=0, sigma=0.08, size=len(operations))
+            else:
+                base_duration = base_duration * np.array([random_state.lognormal(mean=0, sigma=0.08) for random_state in random_states])
+
+        inferenced_variables = {
+            'last_tool_change': last_tool_change,
+            'relative_processing_time_deviation': relative_processing_time_deviation,
+            'machine_state': machine_state,
+            'cleaning': cleaning
+        }
+        return np.round(base_duration, 0), inferenced_variables
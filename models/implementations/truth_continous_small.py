@@ -80,7 +80,8 @@ class TruthContinousSmallModel(PGMPYModel):
         
         return model
     
-    def inference(self, operation: Operation, current_tool, do_calculus) -> tuple[int, list[tuple]]:      
+    def inference(self, operation: Operation, current_tool, do_calculus, random_state=None) -> tuple[int, list[tuple]]:      
+        random_state = np.random if random_state is None else random_state
         
         last_tool_change =  operation.tool != current_tool
         
@@ -98,7 +99,7 @@ class TruthContinousSmallModel(PGMPYModel):
             relative_processing_time_deviation_probabilities = relative_processing_time_deviation_values / relative_processing_time_deviation_values.sum()  # Normalize
 
             # Three possible states: 0.9, 1.0, 1.2
-            relative_processing_time_deviation = np.random.choice([0.9, 1.0, 1.2], p=relative_processing_time_deviation_probabilities)
+            relative_processing_time_deviation = random_state.choice([0.9, 1.0, 1.2], p=relative_processing_time_deviation_probabilities)
         
         # Create parent_values using machine_state and cleaning variables
         parent_values = last_tool_change
@@ -111,7 +112,7 @@ class TruthContinousSmallModel(PGMPYModel):
             std_dev = np.sqrt(variance)
             
             # Sample from the Gaussian distribution
-            relative_processing_time_deviation = np.random.normal(mean, std_dev)
+            relative_processing_time_deviation = random_state.normal(mean, std_dev)
             if relative_processing_time_deviation <= 0.2:
                 relative_processing_time_deviation = 1.0
         else:
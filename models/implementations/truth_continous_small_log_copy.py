@@ -81,7 +81,8 @@ class TruthContinousSmallLogCopyModel(PGMPYModel):
         return model
 
     
-    def inference(self, operation: Operation, current_tool, do_calculus) -> tuple[int, list[tuple]]:      
+    def inference(self, operation: Operation, current_tool, do_calculus, random_state=None) -> tuple[int, list[tuple]]:      
+        random_state = np.random if random_state is None else random_state
         
         last_tool_change =  operation.tool != current_tool
         
@@ -99,7 +100,7 @@ class TruthContinousSmallLogCopyModel(PGMPYModel):
             relative_processing_time_deviation_probabilities = relative_processing_time_deviation_values / relative_processing_time_deviation_values.sum()  # Normalize
 
             # Three possible states: 0.9, 1.0, 1.2
-            relative_processing_time_deviation = np.random.choice([0.9, 1.0, 1.2], p=relative_processing_time_deviation_probabilities)
+            relative_processing_time_deviation = random_state.choice([0.9, 1.0, 1.2], p=relative_processing_time_deviation_probabilities)
         
         # Create parent_values using machine_state and cleaning variables
         parent_values = last_tool_change
@@ -116,7 +117,7 @@ class TruthContinousSmallLogCopyModel(PGMPYModel):
             mu = np.log(mean) - (sigma_squared / 2)
 
             # Sample from lognormal distribution
-            relative_processing_time_deviation = np.random.lognormal(mean=mu, sigma=sigma)
+            relative_processing_time_deviation = random_state.lognormal(mean=mu, sigma=sigma)
         else:
             self.logger.error(f"No distribution found for parent values: {parent_values}. Using default mean and variance.")
 
@@ -129,3 +130,28 @@ class TruthContinousSmallLogCopyModel(PGMPYModel):
             
         return max(1, round(operation.duration * inferenced_variables['relative_processing_time_deviation'], 0)), inferenced_variables
 
+    def sample_variates(self, params, size, random_state=None):
+        # Convert lognormal mean/variance to mu/sigma for underlying normal
+        random_state = np.random if random_state is None else random_state
+        sigma_squared = np.log(1 + (params['variance'] / (params['mean'] ** 2)))
+        return random_state.lognormal(np.log(params['mean']) - (sigma_squared / 2), np.sqrt(sigma_squared), size)
+
+    def inference_batch(self, operations: list[Operation], current_tools, do_calculus, random_states=None) -> tuple[np.ndarray, dict]:
+        last_tool_change = np.array([operation.tool != current_tool for operation, current_tool in zip(operations, current_tools)])
+        result = self.posterior_batch(evidence={'last_tool_change': last_tool_change})
+
+        # Sampling for the relative_processing_time_deviation variable
+        relative_processing_time_deviation = self.sample_categorical(result['relative_processing_time_deviation'], [0.9, 1.0, 1.2], random_states)
+
+        # Lognormal distribution per value of last_tool_change
+        keys = [('relative_processing_time_deviation', parent_values) for parent_values in last_tool_change]
+        continuous = self.sample_by_key(keys, random_states)
+        relative_processing_time_deviation = np.where(np.isnan(continuous), relative_processing_time_deviation, continuous)
+
+        durations = np.array([operation.duration for operation in operations], dtype=float)
+        inferenced_variables = {
+            'last_tool_change': last_tool_change,
+            'relative_processing_time_deviation': relative_processing_time_deviation
+        }
+        return np.maximum(1, np.round(durations * relative_processing_time_deviation, 0)), inferenced_variables
+
@@ -80,7 +80,8 @@ class TruthContinousSmallLogLearnModel(PGMPYModel):
         
         return model
     
-    def inference(self, operation: Operation, current_tool, do_calculus) -> tuple[int, list[tuple]]:      
+    def inference(self, operation: Operation, current_tool, do_calculus, random_state=None) -> tuple[int, list[tuple]]:      
+        random_state = np.random if random_state is None else random_state
         
         last_tool_change =  operation.tool != current_tool
         
@@ -97,7 +98,7 @@ class TruthContinousSmallLogLearnModel(PGMPYModel):
             relative_processing_time_deviation_probabilities = relative_processing_time_deviation_values / relative_processing_time_deviation_values.sum()  # Normalize
 
             # Three possible states: 0.9, 1.0, 1.2
-            relative_processing_time_deviation = np.random.choice([0.9, 1.0, 1.2], p=relative_processing_time_deviation_probabilities)
+            relative_processing_time_deviation = random_state.choice([0.9, 1.0, 1.2], p=relative_processing_time_deviation_probabilities)
         
         # Create parent_values using machine_state and cleaning variables
         parent_values = last_tool_change
@@ -108,7 +109,7 @@ class TruthContinousSmallLogLearnModel(PGMPYModel):
             mu = params['mu']
             sigma = params['sigma']
 
-            relative_processing_time_deviation = np.random.lognormal(mean=mu, sigma=sigma)
+            relative_processing_time_deviation = random_state.lognormal(mean=mu, sigma=sigma)
         else:
             self.logger.error(f"No distribution found for parent values: {parent_values}. Using default mean and variance.")
 
@@ -81,7 +81,8 @@ class TruthContinousSmallTruncNormalLearnModel(PGMPYModel):
         
         return model
     
-    def inference(self, operation: Operation, current_tool, do_calculus) -> tuple[int, list[tuple]]:      
+    def inference(self, operation: Operation, current_tool, do_calculus, random_state=None) -> tuple[int, list[tuple]]:      
+        random_state = np.random if random_state is None else random_state
         
         last_tool_change =  operation.tool != current_tool
         
@@ -98,7 +99,7 @@ class TruthContinousSmallTruncNormalLearnModel(PGMPYModel):
             relative_processing_time_deviation_probabilities = relative_processing_time_deviation_values / relative_processing_time_deviation_values.sum()  # Normalize
 
             # Three possible states: 0.9, 1.0, 1.2
-            relative_processing_time_deviation = np.random.choice([0.9, 1.0, 1.2], p=relative_processing_time_deviation_probabilities)
+            relative_processing_time_deviation = random_state.choice([0.9, 1.0, 1.2], p=relative_processing_time_deviation_probabilities)
         
         # Create parent_values using machine_state and cleaning variables
         parent_values = last_tool_change
@@ -106,7 +107,7 @@ class TruthContinousSmallTruncNormalLearnModel(PGMPYModel):
         key = ('relative_processing_time_deviation', parent_values)
         if key in self.distributions:
             params = self.distributions[key]
-            relative_processing_time_deviation = truncnorm.rvs(params['a'], params['b'], loc=params['loc'], scale=params['scale'])
+            relative_processing_time_deviation = truncnorm.rvs(params['a'], params['b'], loc=params['loc'], scale=params['scale'], random_state=random_state)
 
         else:
             self.logger.error(f"No distribution found for parent values: {parent_values}. Using default mean and variance.")
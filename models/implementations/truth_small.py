@@ -118,19 +118,20 @@ class TruthSmallModel(PGMPYModel):
 
         return sampled_results
     
-    def get_new_duration(self, operation: Operation, inferenced_variables) -> int:
+    def get_new_duration(self, operation: Operation, inferenced_variables, random_state=None) -> int:
+        random_state = np.random if random_state is None else random_state
         base_duration = operation.duration * inferenced_variables['relative_processing_time_deviation']
 
         # Generate log-normal noise around base duration
         if self.lognormal_shape_modifier:
-            log_normal_factor = np.random.lognormal(mean=0, sigma=0.08)  # Small deviation
+            log_normal_factor = random_state.lognormal(mean=0, sigma=0.08)  # Small deviation
             new_duration = base_duration * log_normal_factor  # Introduce log-normal variation
         else: 
             new_duration = base_duration
         
         return round(new_duration, 0)
     
-    def inference(self, operation: Operation, current_tool, do_calculus) -> tuple[int, list[tuple]]:      
+    def inference(self, operation: Operation, current_tool, do_calculus, random_state=None) -> tuple[int, list[tuple]]:      
         
         last_tool_change =  operation.tool != current_tool
         
@@ -139,31 +140,14 @@ class TruthSmallModel(PGMPYModel):
             # Weitere Evidenzen können hier hinzugefügt werden, falls nötig
         }
                      
-        result = self.sample(evidence=evidence)
-
-        # Variablen für relative_processing_time_deviation, machine_state und cleaning initialisieren
-        machine_state = None
-        cleaning = None
-
-        # Sampling for the relative_processing_time_deviation variable
-        if 'relative_processing_time_deviation' in result:
-            relative_processing_time_deviation_values = result['relative_processing_time_deviation'].values
-            relative_processing_time_deviation_probabilities = relative_processing_time_deviation_values / relative_processing_time_deviation_values.sum()  # Normalize
-
-            # Three possible states: 0.9, 1.0, 1.2
-            relative_processing_time_deviation = np.random.choice([0.9, 1.0, 1.2], p=relative_processing_time_deviation_probabilities)
-        
-        # Sampling für die machine_state-Variable
-        if 'machine_state' in result:
-            machine_state_values = result['machine_state'].values
-            machine_state_probabilities = machine_state_values / machine_state_values.sum()  # Normalisieren
-            machine_state = np.random.choice([0, 1], p=machine_state_probabilities)
-        
-        # Sampling für die cleaning-Variable
-        if 'cleaning' in result:
-            cleaning_values = result['cleaning'].values
-            cleaning_probabilities = cleaning_values / cleaning_values.sum()  # Normalisieren
-            cleaning = np.random.choice([0, 1], p=cleaning_probabilities)
+        # Gemeinsame Stichprobe in topologischer Reihenfolge, jede Variable bedingt auf die gezogenen Eltern
+        indices = self.forward_sample_indices(1, evidence=evidence, random_states=None if random_state is None else [random_state])
+        state_names = self.ancestral_sampler.state_names
+        machine_state = state_names['machine_state'][indices['machine_state'][0]]
+        cleaning = state_names['cleaning'][indices['cleaning'][0]]
+
+        # Three possible states: 0.9, 1.0, 1.2 (by state index)
+        relative_processing_time_deviation = [0.9, 1.0, 1.2][indices['relative_processing_time_deviation'][0]]
         
 
         inferenced_variables = {
@@ -173,5 +157,5 @@ class TruthSmallModel(PGMPYModel):
             'cleaning': cleaning
         }
             
-        return self.get_new_duration(operation=operation, inferenced_variables=inferenced_variables), inferenced_variables
+        return self.get_new_duration(operation=operation, inferenced_variables=inferenced_variables, random_state=random_state), inferenced_variables
 
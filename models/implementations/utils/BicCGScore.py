@@ -1,49 +1,96 @@
-from pgmpy.estimators import DecomposableScore
+from collections import OrderedDict
+from pgmpy.estimators import StructureScore
 import numpy as np
-import pandas as pd
-from itertools import product
 
-class BicCGScore(DecomposableScore):
+class BicCGScore(StructureScore):
     """
     BIC Score for Conditional Gaussian Bayesian Networks (discrete + continuous variables).
     Assumes continuous child + discrete parents.
+
+    The columns are encoded once as integer codes (discrete) or float arrays (continuous), the local scores
+    are computed from counts (np.bincount) and per cell least squares, and memoized per
+    (variable, frozenset(parents)) in an LRU cache with cache_size entries.
     """
 
-    def __init__(self, data, discrete_vars=None, **kwargs):
+    def __init__(self, data, discrete_vars=None, cache_size=10000, **kwargs):
         super().__init__(data, **kwargs)
         self.discrete_vars = set(discrete_vars or [])
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.codes = {}
+        self.values = {}
+        for variable in self.discrete_vars:
+            self.encode(variable)
+
+    def encode(self, variable) -> tuple[np.ndarray, int]:
+        """
+        Integer codes (0..cardinality-1 over the observed values) and the cardinality of a column.
+        """
+        if variable not in self.codes:
+            uniques, codes = np.unique(self.data[variable].to_numpy(), return_inverse=True)
+            self.codes[variable] = (codes.astype(np.int64).ravel(), len(uniques))
+        return self.codes[variable]
+
+    def column(self, variable) -> np.ndarray:
+        if variable not in self.values:
+            self.values[variable] = self.data[variable].to_numpy(dtype=float)
+        return self.values[variable]
+
+    def configurations(self, parents) -> tuple[np.ndarray, int]:
+        """
+        Code of the observed parent configuration per row (0..number of observed configurations-1).
+        """
+        if not parents:
+            return np.zeros(len(self.data), dtype=np.int64), 1
+        index, size = self.encode(parents[0])
+        for parent in parents[1:]:
+            codes, cardinality = self.encode(parent)
+            index = index * cardinality + codes
+            size *= cardinality
+            if size > 2 ** 40:
+                # Nur beobachtete Kombinationen behalten, damit der Index nicht überläuft
+                uniques, index = np.unique(index, return_inverse=True)
+                size = len(uniques)
+        uniques, index = np.unique(index, return_inverse=True)
+        return index.ravel(), len(uniques)
 
     def local_score(self, variable, parents):
+        key = (variable, frozenset(parents))
+        score = self.cache.get(key)
+        if score is not None:
+            self.cache.move_to_end(key)
+            return score
+
         var_type = 'discrete' if variable in self.discrete_vars else 'continuous'
         parent_types = ['discrete' if p in self.discrete_vars else 'continuous' for p in parents]
 
         if var_type == 'discrete':
-            return self._score_discrete(variable, parents)
+            score = self._score_discrete(variable, parents)
         else:
-            return self._score_continuous(variable, parents, parent_types)
+            score = self._score_continuous(variable, parents, parent_types)
+
+        self.cache[key] = score
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return score
 
     def _score_discrete(self, var, parents):
         """
         Standard BIC score for discrete variable.
         """
-        data = self.data
-        N = len(data)
-        value_counts = data.groupby([*parents, var]).size()
-        parent_counts = data.groupby(parents).size()
-        log_likelihood = 0
-        k = 0
-
-        for parent_cfg in parent_counts.index:
-            parent_cfg = parent_cfg if isinstance(parent_cfg, tuple) else (parent_cfg,)
-            parent_count = parent_counts[parent_cfg]
-
-            for val in data[var].unique():
-                count = value_counts.get(parent_cfg + (val,), 0)
-                if count > 0:
-                    log_likelihood += count * np.log(count / parent_count)
+        N = len(self.data)
+        codes, cardinality = self.encode(var)
+        configurations, num_configurations = self.configurations(list(parents))
 
-            k += len(data[var].unique()) - 1
+        # Counts per (parent configuration, value) and per parent configuration
+        value_counts = np.bincount(configurations * cardinality + codes, minlength=num_configurations * cardinality)
+        parent_counts = np.bincount(configurations, minlength=num_configurations)
+        value_counts = value_counts.reshape(num_configurations, cardinality)
+        observed = value_counts > 0
+        with np.errstate(divide='ignore'):
+            log_likelihood = np.sum(value_counts[observed] * np.log(value_counts / parent_counts[:, None])[observed])
 
+        k = num_configurations * (cardinality - 1)
         bic = log_likelihood - (k / 2) * np.log(N)
         return bic
 
@@ -51,47 +98,55 @@ class BicCGScore(DecomposableScore):
         """
         BIC score for continuous variable with possibly discrete parents.
         """
-        data = self.data
-        N = len(data)
+        N = len(self.data)
 
         # Separate discrete and continuous parents
         discrete_parents = [p for p, t in zip(parents, parent_types) if t == 'discrete']
         continuous_parents = [p for p, t in zip(parents, parent_types) if t == 'continuous']
 
+        y = self.column(var)
+        X = np.column_stack([self.column(p) for p in continuous_parents]) if continuous_parents else np.zeros((N, 0))
+        k = (len(continuous_parents) or 1) + 1  # parameters = weights + variance
+
         if not discrete_parents:
             # Just a linear regression
-            X = data[continuous_parents] if continuous_parents else np.ones((N, 1))
-            y = data[var]
-            return self._bic_linear(y, X)
+            return self._bic_linear(np.zeros(N, dtype=np.int64), 1, y, X).sum()
         else:
-            # Conditional on discrete parent configs
-            group = data.groupby(discrete_parents)
-            log_likelihood = 0
-            k_total = 0
-            for _, subdata in group:
-                if len(subdata) < 2:
-                    continue
-                X = subdata[continuous_parents] if continuous_parents else np.ones((len(subdata), 1))
-                y = subdata[var]
-                ll, k = self._bic_linear(y, X, return_k=True)
-                log_likelihood += ll
-                k_total += k
-            bic = log_likelihood - (k_total / 2) * np.log(N)
+            # Conditional on discrete parent configs, cells with less than 2 rows are skipped
+            cells, num_cells = self.configurations(discrete_parents)
+            log_likelihood = self._bic_linear(cells, num_cells, y, X)
+            fitted = np.bincount(cells, minlength=num_cells) >= 2
+            bic = log_likelihood[fitted].sum() - (fitted.sum() * k / 2) * np.log(N)
             return bic
 
-    def _bic_linear(self, y, X, return_k=False):
+    @staticmethod
+    def _bic_linear(cells, num_cells, y, X) -> np.ndarray:
         """
-        BIC log-likelihood for linear regression.
+        BIC log-likelihood of a linear regression with intercept (least squares) per cell, all cells at once:
+        the data is centered per cell, the normal equations of the centered data are solved per cell.
         """
-        from sklearn.linear_model import LinearRegression
-
-        reg = LinearRegression().fit(X, y)
-        y_pred = reg.predict(X)
-        resid = y - y_pred
-        sse = np.sum(resid**2)
-        n = len(y)
-        sigma2 = sse / n
-        log_likelihood = -0.5 * n * (np.log(2 * np.pi) + np.log(sigma2) + 1)
-        k = X.shape[1] + 1  # parameters = weights + variance
-        bic = log_likelihood
-        return (bic, k) if return_k else bic
+        n = np.bincount(cells, minlength=num_cells).astype(float)
+        safe_n = np.maximum(n, 1)
+        y_centered = y - (np.bincount(cells, weights=y, minlength=num_cells) / safe_n)[cells]
+        syy = np.bincount(cells, weights=y_centered ** 2, minlength=num_cells)
+
+        p = X.shape[1]
+        if p:
+            means = np.stack([np.bincount(cells, weights=X[:, j], minlength=num_cells) for j in range(p)], axis=1) / safe_n[:, None]
+            X_centered = X - means[cells]
+            sxx = np.empty((num_cells, p, p))
+            sxy = np.empty((num_cells, p))
+            for i in range(p):
+                sxy[:, i] = np.bincount(cells, weights=X_centered[:, i] * y_centered, minlength=num_cells)
+                for j in range(i, p):
+                    sxx[:, i, j] = sxx[:, j, i] = np.bincount(cells, weights=X_centered[:, i] * X_centered[:, j], minlength=num_cells)
+            # Minimum-norm Lösung wie lstsq, auch für singuläre Zellen
+            beta = np.einsum('cij,cj->ci', np.linalg.pinv(sxx), sxy)
+            sse = syy - np.einsum('ci,ci->c', sxy, beta)
+        else:
+            sse = syy
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sigma2 = np.maximum(sse, 0) / safe_n
+            log_likelihood = -0.5 * n * (np.log(2 * np.pi) + np.log(sigma2) + 1)
+        return np.where(n >= 2, log_likelihood, 0.0)
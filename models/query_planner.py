@@ -0,0 +1,124 @@
+from itertools import product
+import numpy as np
+from pgmpy.factors.discrete import DiscreteFactor
+from pgmpy.inference import VariableElimination
+
+# Joint queries with more entries are split into one query per variable
+MAX_JOINT_SIZE = 2 ** 20
+
+
+class EliminationPlan:
+    """
+    P(variables | evidence) for one set of evidence variables, precomputed like VariableElimination.query:
+    the network is pruned to the d-connected ancestral graph once, the contraction order (einsum path)
+    is computed once. Only the evidence values change between calls.
+    """
+    def __init__(self, model, variables, evidence_variables):
+        self.variables = list(variables)
+        if set(self.variables) & set(evidence_variables):
+            raise ValueError("Can't have the same variables in both variables and evidence.")
+        inference = VariableElimination(model)
+        reduced, evidence = inference._prune_bayesian_model(self.variables, dict.fromkeys(evidence_variables))
+        self.evidence_variables = tuple(evidence)
+        indices = {variable: i for i, variable in enumerate(reduced.nodes())}
+
+        # Faktoren, die nur aus Evidenz bestehen, skalieren das Ergebnis nur und fallen durch die Normierung weg
+        self.factors = []
+        operands = []
+        for cpd in reduced.cpds:
+            if not set(cpd.variables) - set(self.evidence_variables):
+                continue
+            reduce = [(position, variable, cpd.name_to_no[variable]) for position, variable in enumerate(cpd.variables)
+                      if variable in self.evidence_variables]
+            subscripts = [indices[variable] for variable in cpd.variables if variable not in self.evidence_variables]
+            self.factors.append((cpd.values, reduce, subscripts))
+            operands += [np.empty([card for variable, card in zip(cpd.variables, cpd.cardinality) if variable not in self.evidence_variables]), subscripts]
+        self.output = [indices[variable] for variable in self.variables]
+        self.path = np.einsum_path(*operands, self.output, optimize='greedy')[0]
+        self.state_names = {variable: reduced.states[variable] for variable in self.variables}
+
+    def __call__(self, evidence) -> DiscreteFactor:
+        """
+        Normalized joint factor over the variables. Raises KeyError for unknown evidence states.
+        """
+        operands = []
+        for values, reduce, subscripts in self.factors:
+            indexer = [slice(None)] * values.ndim
+            for position, variable, states in reduce:
+                indexer[position] = states[evidence[variable]]
+            operands += [values[tuple(indexer)], subscripts]
+        values = np.einsum(*operands, self.output, optimize=self.path)
+        factor = DiscreteFactor(self.variables, values.shape, values, state_names=self.state_names)
+        return factor.normalize(inplace=False)
+
+
+class QueryPlan:
+    """
+    Cached plan of CausalInference.query(variables, evidence, do, adjustment_set, inference_algo="ve") for one
+    signature (query variables, evidence keys, do keys): the adjustment set, the states to sum over and the
+    elimination plans for p(z | evidence) and p(variables | do, z).
+    """
+    def __init__(self, model, variables, evidence_variables, do_variables, adjustment_set=None):
+        self.variables = list(variables)
+        self.do_variables = tuple(do_variables)
+        if adjustment_set is None:
+            adjustment_set = {parent for variable in do_variables for parent in model.predecessors(variable)}
+        # Reihenfolge wie in pgmpy (Iteration über das Set)
+        self.adjustment_set = set(adjustment_set)
+        self.adjustment = list(self.adjustment_set)
+        if self.adjustment_set & set(evidence_variables):
+            raise ValueError("Evidence variables in the adjustment set are not supported by the query planner.")
+
+        if not do_variables or not self.adjustment:
+            self.p_z = None
+            self.query = EliminationPlan(model, self.variables, tuple(evidence_variables) + self.do_variables)
+        else:
+            self.p_z = EliminationPlan(model, self.adjustment, evidence_variables)
+            self.query = EliminationPlan(model, self.variables, self.do_variables + tuple(self.adjustment))
+            self.adjustment_states = list(product(*(model.get_cpds(variable).state_names[variable] for variable in self.adjustment)))
+
+    def __call__(self, evidence, do) -> DiscreteFactor:
+        if self.p_z is None:
+            return self.query({**evidence, **do})
+        # sum_z p(variables | do, z) p(z | evidence)
+        p_z = self.p_z(evidence)
+        values = None
+        for states in self.adjustment_states:
+            adjustment = dict(zip(self.adjustment, states))
+            weighted = self.query({**do, **adjustment}).values * p_z.get_value(**adjustment)
+            values = weighted if values is None else values + weighted
+        return DiscreteFactor(self.variables, values.shape, values, state_names=self.query.state_names).normalize(inplace=False)
+
+
+class QueryPlanner:
+    """
+    Posterior queries for all query variables of a signature with one joint query, the plans are cached per
+    (query variables, evidence keys, do keys). Create a new planner when the CPDs change.
+    """
+    def __init__(self, model, max_joint_size=MAX_JOINT_SIZE):
+        self.model = model
+        self.max_joint_size = max_joint_size
+        self.plans = {}
+
+    def plan(self, variables, evidence_variables, do_variables, adjustment_set=None) -> list[QueryPlan]:
+        signature = (tuple(variables), tuple(evidence_variables), tuple(do_variables),
+                     None if adjustment_set is None else tuple(sorted(adjustment_set)))
+        plans = self.plans.get(signature)
+        if plans is None:
+            size = np.prod([self.model.get_cardinality(variable) for variable in variables], dtype=float)
+            groups = [list(variables)] if size <= self.max_joint_size else [[variable] for variable in variables]
+            plans = [QueryPlan(self.model, group, evidence_variables, do_variables, adjustment_set) for group in groups]
+            self.plans[signature] = plans
+        return plans
+
+    def query(self, variables, evidence={}, do={}, adjustment_set=None) -> dict:
+        """
+        Returns the posterior factor of every variable, same as one CausalInference.query per variable.
+        """
+        result = {}
+        for plan in self.plan(variables, tuple(evidence), tuple(do), adjustment_set):
+            joint = plan(evidence, do)
+            for variable in plan.variables:
+                others = [other for other in plan.variables if other != variable]
+                result[variable] = joint.marginalize(others, inplace=False) if others else joint
+        return {variable: result[variable] for variable in variables}
@@ -0,0 +1,221 @@
+import os
+import time
+import inspect
+import logging
+import multiprocessing
+import numpy as np
+import pandas as pd
+import networkx as nx
+from castle.algorithms import PC, GES, CORL, DAG_GNN, Notears
+from pgmpy.estimators import HillClimbSearch, ExhaustiveSearch
+from models.implementations.utils.BicCGScore import BicCGScore
+from models.utils import compare_structures
+from modules.logger import Logger
+
+# Algorithms of the default portfolio as (library, method)
+PORTFOLIO = (('gcastle', 'PC'), ('gcastle', 'GES'), ('gcastle', 'Notears'),
+             ('pgmpy', 'HillClimbSearch'), ('pgmpy', 'ExhaustiveSearch'))
+
+GCASTLE_ALGORITHMS = {
+    'PC': PC,
+    'GES': GES,
+    'CORL': lambda **kw: CORL(device_type="gpu", iteration=1000, **kw),
+    'DAG_GNN': lambda **kw: DAG_GNN(device_type="gpu", **kw),
+    'Notears': Notears
+}
+
+
+def encode_data(data) -> pd.DataFrame:
+    """Bools as integers, so gCastle (float array) and pgmpy (DataFrame) learn from the same values."""
+    data = data.copy()
+    for column in data.select_dtypes(include='bool').columns:
+        data[column] = data[column].astype(int)
+    return data
+
+
+def discrete_columns(data) -> list:
+    """Columns that are not floating point are treated as discrete."""
+    return [column for column in data.columns if not pd.api.types.is_float_dtype(data[column])]
+
+
+def structure_score(data, edges, discrete_vars, cg_score=None) -> float:
+    """
+    BIC (conditional Gaussian) of a structure, the sum of the local scores of all variables. cg_score: the
+    BicCGScore of the data to reuse (with its memoized local scores), a new one if None.
+    """
+    score = cg_score if cg_score is not None else BicCGScore(data, discrete_vars=discrete_vars)
+    graph = nx.DiGraph(list(edges))
+    graph.add_nodes_from(data.columns)
+    return float(sum(score.local_score(node, list(graph.predecessors(node))) for node in data.columns))
+
+
+def search_options(estimate, kwargs) -> dict:
+    """The kwargs that a pgmpy estimate() takes, without the score and progress set by learn_edges."""
+    parameters = inspect.signature(estimate).parameters
+    return {name: value for name, value in kwargs.items()
+            if name in parameters and name not in ('self', 'scoring_method', 'show_progress')}
+
+
+def learn_edges(data, library, method, discrete_vars, scoring_method=None, cg_score=None, **kwargs) -> list:
+    """
+    Learns the edges with one algorithm of gCastle or pgmpy on encoded data (see encode_data).
+
+    scoring_method: score of the pgmpy searches, a pgmpy score name or a StructureScore. Default: 'bic-d' for
+    purely discrete data, the conditional Gaussian BIC otherwise, ExhaustiveSearch keeps pgmpy's 'k2'.
+    pgmpy's 'GES' is a hill climbing search with the conditional Gaussian BIC.
+    cg_score: the BicCGScore of the data to reuse where the conditional Gaussian BIC is needed (shares its memoized
+    local scores between the searches), a new one if None.
+    kwargs: the options of the gCastle algorithm; pgmpy only gets the options its estimate() takes (e.g. max_indegree
+    or tabu_length of HillClimbSearch), the others are ignored.
+    """
+    columns = data.columns.tolist()
+    if library == 'gcastle':
+        if method not in GCASTLE_ALGORITHMS:
+            raise ValueError(f"Unsupported method at gcastle: {method}")
+        model = GCASTLE_ALGORITHMS[method](**kwargs)
+        model.learn(data.to_numpy(dtype=float))
+        return [(columns[i], columns[j])
+                for i in range(len(columns))
+                for j in range(len(columns)) if model.causal_matrix[i, j] != 0]
+    if library == 'pgmpy':
+        # Rein diskrete Daten mit dem Standard-BIC, gemischte (und GES) mit dem CG-BIC
+        mixed = len(discrete_vars) != len(columns)
+        if method == 'ExhaustiveSearch' and scoring_method is None:
+            scoring_method = 'k2'
+        if (method == 'GES' and not isinstance(scoring_method, BicCGScore)) or (scoring_method is None and mixed):
+            scoring_method = cg_score if cg_score is not None else BicCGScore(data, discrete_vars=discrete_vars)
+        elif scoring_method is None:
+            scoring_method = 'bic-d'
+        if method in ('HillClimbSearch', 'GES'):
+            options = search_options(HillClimbSearch.estimate, kwargs)
+            return list(HillClimbSearch(data).estimate(scoring_method=scoring_method, show_progress=False, **options).edges())
+        if method == 'ExhaustiveSearch':
+            options = search_options(ExhaustiveSearch.estimate, kwargs)
+            return list(ExhaustiveSearch(data, scoring_method=scoring_method).estimate(**options).edges())
+        raise ValueError(f"Unsupported method at pgmpy: {method}")
+    raise ValueError(f"Unsupported structure learning library: {library}")
+
+
+_worker_data = None
+
+
+def _init_worker(data, discrete_vars):
+    """Keeps the data of the worker with one conditional Gaussian BIC, shared by all its searches and results."""
+    global _worker_data
+    _worker_data = (data, discrete_vars, BicCGScore(data, discrete_vars=discrete_vars))
+
+
+def _learn(task) -> dict:
+    """
+    Worker: learns and scores one algorithm on the data of the worker, errors are part of the result.
+    """
+    library, method, kwargs = task
+    data, discrete_vars, cg_score = _worker_data
+    start = time.perf_counter()
+    try:
+        edges = learn_edges(data, library, method, discrete_vars, cg_score=cg_score, **kwargs)
+        score = structure_score(data, edges, discrete_vars, cg_score)
+        error = None
+    except Exception as e:
+        edges, score, error = None, np.nan, f"{type(e).__name__}: {e}"
+    return {'algorithm': f"{library}:{method}", 'edges': edges, 'score': score,
+            'runtime': time.perf_counter() - start, 'error': error}
+
+
+class StructureLearningPortfolio:
+    """
+    Runs several structure learning algorithms concurrently on a pool of worker processes, on the same encoded
+    data (sent once per worker). The results are streamed back in order of completion, the remaining algorithms
+    are cancelled as soon as one reaches target_shd against the truth model or the time budget (seconds) is used up.
+
+    algorithms: (library, method) or (library, method, kwargs) tuples, default PORTFOLIO
+    """
+    def __init__(self, algorithms=PORTFOLIO, target_shd=0, time_budget=None, workers=None, discrete_vars=None):
+        self.algorithms = [(algorithm[0], algorithm[1], dict(algorithm[2]) if len(algorithm) > 2 else {})
+                           for algorithm in algorithms]
+        if not self.algorithms:
+            raise ValueError("The portfolio needs at least one algorithm.")
+        self.target_shd = target_shd
+        self.time_budget = time_budget
+        self.workers = min(workers or os.cpu_count() or 1, len(self.algorithms))
+        self.discrete_vars = discrete_vars
+        self.logger = Logger.get_global_logger(category="Model", level=logging.DEBUG, log_to_file=True, log_filename="output/logs/app.log")
+
+    def evaluate(self, result, truth_model) -> dict:
+        """Adds SHD, precision, recall and F1-score against the truth model to a result."""
+        metrics = {'SHD': np.nan, 'Precision': np.nan, 'Recall': np.nan, 'F1-Score': np.nan}
+        if truth_model is not None and result['edges'] is not None:
+            learned_model = nx.DiGraph(result['edges'])
+            learned_model.add_nodes_from(truth_model.nodes())
+            metrics = compare_structures(truth_model=truth_model, learned_model=learned_model)
+        return {**result, **metrics}
+
+    def reached_target(self, result) -> bool:
+        return result['error'] is None and result['SHD'] <= self.target_shd
+
+    def run(self, data, truth_model=None):
+        """
+        Generator of the results (algorithm, edges, score, runtime, error, SHD, Precision, Recall, F1-Score)
+        in order of completion. Algorithms that did not finish are reported at the end with error 'cancelled'.
+        """
+        data = encode_data(data)
+        discrete_vars = self.discrete_vars if self.discrete_vars is not None else discrete_columns(data)
+        deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+        pending = {f"{library}:{method}" for library, method, _ in self.algorithms}
+
+        if self.workers == 1:
+            _init_worker(data, discrete_vars)
+            for task in self.algorithms:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                result = self.evaluate(_learn(task), truth_model)
+                pending.discard(result['algorithm'])
+                yield result
+                if self.reached_target(result):
+                    break
+        else:
+            pool = multiprocessing.Pool(self.workers, initializer=_init_worker, initargs=(data, discrete_vars))
+            try:
+                results = pool.imap_unordered(_learn, self.algorithms)
+                while pending:
+                    timeout = None if deadline is None else max(deadline - time.perf_counter(), 0)
+                    try:
+                        result = self.evaluate(results.next(timeout), truth_model)
+                    except multiprocessing.TimeoutError:
+                        self.logger.debug(f"Structure learning time budget of {self.time_budget}s used up.")
+                        break
+                    pending.discard(result['algorithm'])
+                    yield result
+                    if self.reached_target(result):
+                        break
+            finally:
+                # Laufende Algorithmen abbrechen
+                pool.terminate()
+                pool.join()
+
+        for algorithm in sorted(pending):
+            yield {'algorithm': algorithm, 'edges': None, 'score': np.nan, 'runtime': np.nan, 'error': 'cancelled',
+                   'SHD': np.nan, 'Precision': np.nan, 'Recall': np.nan, 'F1-Score': np.nan}
+
+    @staticmethod
+    def best(results):
+        """
+        Best finished result: the smallest SHD (if known), then the highest score. None if no algorithm finished.
+        """
+        finished = [result for result in results if result['error'] is None]
+        if not finished:
+            return None
+        return min(finished, key=lambda result: (np.nan_to_num(result['SHD'], nan=np.inf), -np.nan_to_num(result['score'], nan=-np.inf)))
+
+    def learn(self, data, truth_model=None) -> tuple[dict, pd.DataFrame]:
+        """
+        Runs the portfolio, returns the best result and the report (one row per algorithm with runtime,
+        score, accuracy and error).
+        """
+        results = []
+        for result in self.run(data, truth_model):
+            self.logger.debug(f"Structure learning {result['algorithm']}: runtime {result['runtime']:.2f}s, "
+                              f"SHD {result['SHD']}, score {result['score']:.1f}, error {result['error']}")
+            results.append(result)
+        report = pd.DataFrame(results).drop(columns='edges')
+        return self.best(results), report
@@ -0,0 +1,224 @@
+"""
+Sufficient statistics of the causal models for online updates from observed data
+"""
+import numpy as np
+import pandas as pd
+from pgmpy.factors.discrete import TabularCPD
+from sklearn.mixture import GaussianMixture
+
+
+class CPDCounts:
+    """
+    Counts per CPD cell (state of the variable x parent configuration) of a fitted DiscreteBayesianNetwork.
+    The CPDs follow from the counts and the prior like in BayesianEstimator, so counting new observations with
+    update() gives the same CPDs as fitting the network on all data at once.
+
+    Only the CPDs whose variable and parents are all in variables are counted, the other CPDs (e.g. of continuous
+    variables) are kept. Observations with states that a CPD does not know are skipped for that CPD.
+    """
+    def __init__(self, model, variables, prior_type='BDeu', equivalent_sample_size=5):
+        prior_type = prior_type.lower()
+        if prior_type not in ('bdeu', 'k2'):
+            raise ValueError(f"Unsupported prior for online updates: {prior_type}")
+        self.prior_type = prior_type
+        self.equivalent_sample_size = equivalent_sample_size
+        self.scopes = {}
+        self.state_names = {}
+        self.counts = {}
+        for cpd in model.get_cpds():
+            if not set(cpd.variables) <= set(variables):
+                continue
+            self.scopes[cpd.variable] = list(cpd.variables)
+            for variable in cpd.variables:
+                self.state_names[variable] = list(cpd.state_names[variable])
+            self.counts[cpd.variable] = np.zeros(tuple(cpd.cardinality))
+
+    def indices(self, observations, variable) -> np.ndarray:
+        """State indices of a column, -1 for unknown or missing states."""
+        index = {state: i for i, state in enumerate(self.state_names[variable])}
+        return observations[variable].map(index).fillna(-1).to_numpy(dtype=np.int64)
+
+    def cells(self, observations, variable) -> tuple[np.ndarray, np.ndarray]:
+        """Flat CPD cell per observation and the mask of the observations with known states."""
+        scope = self.scopes[variable]
+        indices = [self.indices(observations, name) for name in scope]
+        known = np.all([index >= 0 for index in indices], axis=0)
+        cells = np.ravel_multi_index(tuple(index[known] for index in indices), self.counts[variable].shape)
+        return cells, known
+
+    def update(self, observations: pd.DataFrame):
+        for variable, counts in self.counts.items():
+            if not set(self.scopes[variable]) <= set(observations.columns):
+                continue
+            cells, _ = self.cells(observations, variable)
+            counts += np.bincount(cells, minlength=counts.size).reshape(counts.shape)
+
+    def probabilities(self, variable) -> np.ndarray:
+        """Posterior CPD values (counts plus pseudo counts, normalized per parent configuration)."""
+        counts = self.counts[variable]
+        if self.prior_type == 'k2':
+            pseudo_count = 1.0
+        else:
+            pseudo_count = self.equivalent_sample_size / counts.size
+        values = counts + pseudo_count
+        return values / values.sum(axis=0, keepdims=True)
+
+    def cpds(self) -> list[TabularCPD]:
+        cpds = []
+        for variable, scope in self.scopes.items():
+            values = self.probabilities(variable)
+            cpds.append(TabularCPD(variable, values.shape[0], values.reshape(values.shape[0], -1),
+                                   evidence=scope[1:] or None, evidence_card=values.shape[1:] or None,
+                                   state_names={name: self.state_names[name] for name in scope}))
+        return cpds
+
+    def log_likelihood(self, observations: pd.DataFrame) -> float:
+        """
+        Mean log-likelihood per observation under the current CPDs, summed over the counted CPDs
+        (each CPD averaged over the observations with known states). nan without observations.
+        """
+        total = 0.0
+        for variable in self.counts:
+            if not set(self.scopes[variable]) <= set(observations.columns):
+                continue
+            cells, _ = self.cells(observations, variable)
+            if len(cells) == 0:
+                continue
+            total += np.log(self.probabilities(variable).ravel()[cells]).mean()
+        return total if len(observations) else np.nan
+
+    def counted_log_likelihood(self) -> float:
+        """
+        log_likelihood() of all counted observations under the current CPDs, computed from the counts alone.
+        nan without counted observations.
+        """
+        counted = [variable for variable, counts in self.counts.items() if counts.sum() > 0]
+        if not counted:
+            return np.nan
+        return float(sum((self.counts[variable] * np.log(self.probabilities(variable))).sum() / self.counts[variable].sum()
+                         for variable in counted))
+
+
+def grouped_moments(data: pd.DataFrame, targets, parents) -> dict:
+    """
+    Moments of the targets per parent configuration, all targets in one groupby pass: count, mean, variance and
+    standard deviation (population), minimum, maximum and the same moments of the logarithm (log_mean, log_variance,
+    log_std over the positive values). Rows without a parent or target value are skipped.
+
+    Returns {target: {configuration: moments}}, the configurations are tuples of the parent values
+    (in the order of parents, () without parents).
+    """
+    targets, parents = list(targets), list(parents)
+    data = data[parents + targets].dropna()
+    values = data[targets].astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logs = np.log(values.where(values > 0))
+    frame = pd.concat({'value': values, 'log': logs}, axis=1)
+    keys = [data[parent] for parent in parents] if parents else np.zeros(len(data), dtype=np.int64)
+    grouped = frame.groupby(keys, sort=False)
+    statistics = grouped.agg(['count', 'mean', 'min', 'max'])
+    variances = grouped.var(ddof=0)
+
+    result = {}
+    for target in targets:
+        result[target] = {}
+        for key in statistics.index:
+            configuration = (key if isinstance(key, tuple) else (key,)) if parents else ()
+            variance, log_variance = variances.at[key, ('value', target)], variances.at[key, ('log', target)]
+            result[target][configuration] = {
+                'count': statistics.at[key, ('value', target, 'count')],
+                'mean': statistics.at[key, ('value', target, 'mean')],
+                'variance': variance,
+                'std': np.sqrt(variance),
+                'min': statistics.at[key, ('value', target, 'min')],
+                'max': statistics.at[key, ('value', target, 'max')],
+                'log_mean': statistics.at[key, ('log', target, 'mean')],
+                'log_variance': log_variance,
+                'log_std': np.sqrt(log_variance),
+            }
+    return result
+
+
+class GroupMoments:
+    """
+    Running count, mean, sum of squared deviations (M2), minimum and maximum of a continuous variable per parent
+    configuration. A batch is reduced per configuration with one groupby and merged with the running values
+    (parallel variance formula of Chan et al.), so the moments equal those of all observations at once.
+    """
+    def __init__(self, target, parents):
+        self.target = target
+        self.parents = list(parents)
+        self.moments = {}
+
+    def update(self, observations: pd.DataFrame) -> list:
+        """
+        Adds the observations (rows without target or parent values are skipped). Returns the updated configurations.
+        """
+        batch = grouped_moments(observations, [self.target], self.parents)[self.target]
+        for configuration, moments in batch.items():
+            count, mean, minimum, maximum = moments['count'], moments['mean'], moments['min'], moments['max']
+            m2 = moments['variance'] * count
+            if configuration not in self.moments:
+                self.moments[configuration] = (float(count), mean, m2, minimum, maximum)
+                continue
+            n, running_mean, running_m2, running_min, running_max = self.moments[configuration]
+            total = n + count
+            delta = mean - running_mean
+            self.moments[configuration] = (total, running_mean + delta * count / total,
+                                           running_m2 + m2 + delta ** 2 * n * count / total,
+                                           min(running_min, minimum), max(running_max, maximum))
+        return list(batch)
+
+    def get(self, configuration) -> dict:
+        """Count, mean, variance and standard deviation (population) and the range of a parent configuration."""
+        n, mean, m2, minimum, maximum = self.moments[configuration]
+        return {'count': n, 'mean': mean, 'variance': m2 / n, 'std': np.sqrt(m2 / n), 'min': minimum, 'max': maximum}
+
+
+def gaussian_parameters(moments) -> dict:
+    """Mean and variance like a GaussianMixture with one component (incl. its reg_covar of 1e-6)."""
+    return {'mean': moments['mean'], 'variance': moments['variance'] + 1e-6}
+
+
+def truncnorm_parameters(moments) -> dict:
+    """Normal distribution truncated to the observed range, in the parametrization of scipy.stats.truncnorm."""
+    loc, scale = moments['mean'], moments['std']
+    return {'a': (moments['min'] - loc) / scale, 'b': (moments['max'] - loc) / scale, 'loc': loc, 'scale': scale}
+
+
+def lognormal_parameters(moments) -> dict:
+    """Mean and standard deviation of the log-transformed values (mu and sigma of the lognormal distribution)."""
+    return {'mu': moments['log_mean'], 'sigma': moments['log_std']}
+
+
+# Parameters of self.distributions from the moments of a parent configuration, per distribution family
+DISTRIBUTION_PARAMETERS = {
+    'gaussian': gaussian_parameters,
+    'truncnorm': truncnorm_parameters,
+    'lognormal': lognormal_parameters,
+}
+
+
+def fit_distributions(data: pd.DataFrame, target, parents, family='gaussian', n_components=1) -> dict:
+    """
+    Parameters of the distribution of target per parent configuration (see grouped_moments), fitted from the
+    moments of one groupby pass. Only Gaussian mixtures with more than one component are fitted with a
+    GaussianMixture per configuration, with parameters weights, means and variances.
+    """
+    if family not in DISTRIBUTION_PARAMETERS:
+        raise ValueError(f"Unsupported distribution family: {family}")
+    parents = list(parents)
+    if n_components > 1:
+        if family != 'gaussian':
+            raise ValueError(f"Mixtures are only supported for the gaussian family, not {family}")
+        data = data[parents + [target]].dropna()
+        groups = data.groupby(parents, sort=False) if parents else [((), data)]
+        distributions = {}
+        for key, group in groups:
+            gmm = GaussianMixture(n_components=n_components, random_state=42).fit(group[[target]])
+            distributions[key if isinstance(key, tuple) else (key,)] = {
+                'weights': gmm.weights_, 'means': gmm.means_.ravel(), 'variances': gmm.covariances_.ravel()}
+        return distributions
+    parameters = DISTRIBUTION_PARAMETERS[family]
+    return {configuration: parameters(moments)
+            for configuration, moments in grouped_moments(data, [target], parents)[target].items()}
@@ -0,0 +1,80 @@
+import zlib
+import numpy as np
+
+# Number of variates drawn at once per key
+VARIATE_POOL_SIZE = 4096
+
+
+def key_seed(key) -> int:
+    """Stable integer for a distribution key, numpy scalars count as their Python values."""
+    def normalize(value):
+        if isinstance(value, tuple):
+            return tuple(normalize(part) for part in value)
+        return value.item() if isinstance(value, np.generic) else value
+    return zlib.crc32(repr(normalize(key)).encode())
+
+
+class VariatePool:
+    """
+    Pre-drawn variates per distribution key: sampler(params, size, random_state) fills a block of block_size
+    values at once, draw() pops the next value and refills the block when it is used up. The per-call overhead
+    of the samplers (e.g. scipy rvs) is paid once per block instead of once per value.
+
+    Every key has its own generator seeded from (seed, key), so the values of a key only depend on the seed and
+    on how many values of that key were drawn before, not on the other keys. Without seed the generators are
+    seeded randomly.
+    """
+    def __init__(self, sampler, block_size=VARIATE_POOL_SIZE, seed=None):
+        if block_size <= 0:
+            raise ValueError("block_size must be positive.")
+        self.sampler = sampler
+        self.block_size = block_size
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """Drops all drawn blocks and restarts the generators for the seed."""
+        self.seed = seed
+        self.blocks = {}
+        self.positions = {}
+        self.generators = {}
+
+    def discard(self, key):
+        """Drops the drawn block of key, the next draw fills a new block (e.g. with changed params)."""
+        self.blocks.pop(key, None)
+        self.positions.pop(key, None)
+
+    def generator(self, key) -> np.random.Generator:
+        generator = self.generators.get(key)
+        if generator is None:
+            entropy = None if self.seed is None else [int(self.seed), key_seed(key)]
+            generator = np.random.default_rng(np.random.SeedSequence(entropy))
+            self.generators[key] = generator
+        return generator
+
+    def refill(self, key, params):
+        self.blocks[key] = np.asarray(self.sampler(params, self.block_size, self.generator(key)), dtype=float)
+        self.positions[key] = 0
+
+    def draw(self, key, params) -> float:
+        """Next value for key, params are only used to fill a new block."""
+        position = self.positions.get(key, self.block_size)
+        if position >= self.block_size:
+            self.refill(key, params)
+            position = 0
+        self.positions[key] = position + 1
+        return self.blocks[key][position]
+
+    def draw_many(self, key, params, size) -> np.ndarray:
+        """The next size values for key, same values as size draw() calls."""
+        values = np.empty(size)
+        filled = 0
+        while filled < size:
+            position = self.positions.get(key, self.block_size)
+            if position >= self.block_size:
+                self.refill(key, params)
+                position = 0
+            count = min(size - filled, self.block_size - position)
+            values[filled:filled + count] = self.blocks[key][position:position + count]
+            self.positions[key] = position + count
+            filled += count
+        return values
@@ -1,4 +1,5 @@
 from modules.generators.jobs_data_generator import JobsDataGenerator
+from modules.generators.order_stream import OrderStream
 from modules.factory.Operation import Operation
 import os
 from typing import List
@@ -7,45 +8,63 @@ import random
 from tabulate import tabulate
 import pandas as pd
 
+# Beispielhafte Datenstruktur
+# Produkt, Arbeitsgang, Maschinengruppe, Tool, geplante Dauer, Nachfolger
+STATIC_TEMPLATE_JOBS_DATA = [
+    ['p1', 1, 'a1', 1, 20, 2],
+    ['p1', 2, 'a3', 1, 10, -1],
+    ['p2', 1, 'a2', 1, 20, 2],       
+    ['p2', 2, 'a3', 2, 10, -1],
+    ['p3', 1, 'a1', 2, 20, 2],
+    ['p3', 2, 'a3', 2, 10, -1],
+    ['p4', 1, 'a2', 2, 20, 2],       
+    ['p4', 2, 'a3', 1, 10, -1],
+]
+STATIC_RELATION = {'p1': 0.25, 'p2': 0.25 , 'p3': 0.25, 'p4': 0.25}  # Relation of each product type
+
 
 class ProductionGenerator:
     def __init__(self):
         self.template_jobs_data = []
         self.job_data = []
         
-    def generate_data_static(self, num_instances = 150, seed = 1):
+    def generate_data_static(self, num_instances = 150, seed = 1, as_table = False):
         """
         Generate data from a template.
+        as_table=True returns an OperationTable instead of Operation objects.
         """
         
         random.seed(seed)
         
-        # Beispielhafte Datenstruktur
-        # Produkt, Arbeitsgang, Maschinengruppe, Tool, geplante Dauer, Nachfolger
-        self.template_jobs_data = [
-            ['p1', 1, 'a1', 1, 20, 2],
-            ['p1', 2, 'a3', 1, 10, -1],
-            ['p2', 1, 'a2', 1, 20, 2],       
-            ['p2', 2, 'a3', 2, 10, -1],
-            ['p3', 1, 'a1', 2, 20, 2],
-            ['p3', 2, 'a3', 2, 10, -1],
-            ['p4', 1, 'a2', 2, 20, 2],       
-            ['p4', 2, 'a3', 1, 10, -1],
-        ]
+        self.template_jobs_data = [list(row) for row in STATIC_TEMPLATE_JOBS_DATA]
 
         generator = JobsDataGenerator(self.template_jobs_data)
-        relation = {'p1': 0.25, 'p2': 0.25 , 'p3': 0.25, 'p4': 0.25}  # Relation of each product type
+        relation = dict(STATIC_RELATION)
+        machines = self.static_machines()
 
-        self.job_data = generator.generate_jobs_data(num_instances, relation)
+        if as_table:
+            return generator.generate_jobs_table(num_instances, relation), machines
 
-        machines = [
-            [f'a{i}', 1, list(range(1, 2 + 1))]
-            for i in range(1, 3 + 1)
-        ]
-        
+        self.job_data = generator.generate_jobs_data(num_instances, relation)
         operations = self.prepare_data()
         return operations, machines
     
+    def static_machines(self):
+        return [
+            [f'a{i}', 1, list(range(1, 2 + 1))]
+            for i in range(1, 3 + 1)
+        ]
+
+    def generate_order_stream(self, arrival = 'poisson', rate = 1 / 20, takt = None, num_orders = None, horizon = None, seed = 1):
+        """
+        Lazy order stream with the template of generate_data_static, orders arrive as Poisson process
+        (rate orders per time unit) or with a fixed takt. Returns the stream and the machines.
+        """
+        self.template_jobs_data = [list(row) for row in STATIC_TEMPLATE_JOBS_DATA]
+        stream = OrderStream(self.template_jobs_data, dict(STATIC_RELATION), arrival=arrival, rate=rate, takt=takt,
+                             num_orders=num_orders, horizon=horizon, seed=seed)
+        return stream, self.static_machines()
+
     def generate_data_dynamic(self,
         amount_products = 10,
         product_types_relation = None,
@@ -57,10 +76,12 @@ class ProductionGenerator:
         num_instances=150, 
         distribution='normal',
         seed=1,
+        as_table=False,
     ):
        
         """
         Generate data dynamically based on input parameters.
+        as_table=True returns an OperationTable instead of Operation objects.
         """
         # Generate product types relation based on the specified distribution
         # If product_types_relation is None, generate it based on the distribution 
@@ -106,15 +127,18 @@ class ProductionGenerator:
                 successor = max(op + 1 , min(num_operations, int(random.gauss(num_operations, num_operations * 0.1))) ) if op < num_operations else -1
                 self.template_jobs_data.append([product, op, machine_group, tool, duration, successor])
 
-        # Generate jobs data using the dynamic template
-        self.job_data = JobsDataGenerator(self.template_jobs_data).generate_jobs_data(num_instances, product_types_relation)
-
         # Define machine pools dynamically
         # Create multiple machines per machine group
         machines = []
         for i in range(1, machine_groups + 1):
             machines.append([f'a{i}', machine_instances, list(range(1, tools_per_machine + 1))])
 
+        # Generate jobs data using the dynamic template
+        generator = JobsDataGenerator(self.template_jobs_data)
+        if as_table:
+            return generator.generate_jobs_table(num_instances, product_types_relation), machines
+        self.job_data = generator.generate_jobs_data(num_instances, product_types_relation)
+
         operations = self.prepare_data()
         return operations, machines
 
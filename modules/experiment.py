@@ -0,0 +1,115 @@
+import os
+import time
+import pickle
+import logging
+import concurrent.futures
+from contextlib import contextmanager
+import pandas as pd
+from tabulate import tabulate
+from modules.logger import Logger
+
+logger = Logger.get_global_logger(category="General", level=logging.DEBUG, log_to_file=True, log_filename="output/logs/app.log")
+
+# Artifacts of the worker process, set once by the pool initializer
+_artifacts = None
+
+
+class ModelArtifacts:
+    """
+    Initialized models which do not depend on the seed (e.g. truth networks with their compiled posteriors
+    and distributions). They are built and pickled once and shared read-only with all runs,
+    load() returns a fresh copy so runs can not influence each other.
+    """
+    def __init__(self):
+        self.blobs = {}
+        self.timings = {}
+
+    def add(self, name, model):
+        start = time.perf_counter()
+        model.initialize()
+        self.blobs[name] = pickle.dumps(model)
+        self.timings[name] = time.perf_counter() - start
+        return model
+
+    def load(self, name, seed=None):
+        """Fresh copy of the model, seeded like an initialize() with seed (including its variate pool)."""
+        model = pickle.loads(self.blobs[name])
+        model.seed_random(seed)
+        return model
+
+    def __contains__(self, name):
+        return name in self.blobs
+
+
+@contextmanager
+def stage_timer(timings, stage):
+    """Adds the wall-clock time of the block to timings[stage], does nothing if timings is None."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def _init_worker(artifacts):
+    global _artifacts
+    _artifacts = artifacts
+
+
+def _run_seed(run, seed, args):
+    timings = {}
+    with stage_timer(timings, 'total'):
+        results = run(seed, args, artifacts=_artifacts, timings=timings, write_results=False)
+    return seed, results, timings
+
+
+def run_experiments(run, seeds, args, artifacts=None, workers=None, result_path=None):
+    """
+    Runs run(seed, args, artifacts, timings, write_results) for all seeds on a pool of worker processes.
+    The artifacts are sent once per worker, the results are written by this process only.
+    Returns the results of all seeds and the per-stage timings (one row per seed).
+    """
+    seeds = list(seeds)
+    start = time.perf_counter()
+    results = []
+    timings = []
+    header = result_path is None or not os.path.exists(result_path)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(artifacts,)) as executor:
+        futures = [executor.submit(_run_seed, run, seed, args) for seed in seeds]
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                seed, run_results, run_timings = future.result()
+            except Exception as e:
+                logger.error(f"Experiment failed: {e}")
+                continue
+            timings.append({'seed': seed, **run_timings})
+            if run_results is None:
+                continue
+            results.append(run_results)
+            if result_path is not None:
+                run_results.to_csv(result_path, mode='a', header=header, index=False)
+                header = False
+            logger.debug(f"Experiment completed for seed: {seed}")
+
+    wall_clock = time.perf_counter() - start
+    results = pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+    timings = pd.DataFrame(timings)
+    if result_path is not None and not timings.empty:
+        timings.to_csv(os.path.splitext(result_path)[0] + "_timings.csv", index=False)
+    report_timings(timings, wall_clock, len(seeds), workers, artifacts)
+    return results, timings
+
+
+def report_timings(timings, wall_clock, seeds, workers, artifacts=None):
+    """Logs the wall-clock time and the per-stage timings summed over all seeds."""
+    rows = []
+    if artifacts is not None:
+        rows += [[f"artifact {name}", value, value, value] for name, value in artifacts.timings.items()]
+    if not timings.empty:
+        stages = timings.drop(columns='seed')
+        rows += [[stage, stages[stage].sum(), stages[stage].mean(), stages[stage].max()] for stage in stages.columns]
+    table = tabulate(rows, headers=['stage', 'sum [s]', 'mean [s]', 'max [s]'], tablefmt='rounded_outline', floatfmt='.3f')
+    logger.info(f"Experiment timings:\n{table}")
+    logger.info(f"{seeds} seeds on {workers or os.cpu_count()} workers: wall-clock {wall_clock:.2f}s, {seeds / wall_clock:.2f} seeds/s")
@@ -1,8 +1,33 @@
 from modules.factory.MachineState import State
 import simpy
 
+class PutQueue(list):
+    """Request queue of a machine which reports every change of its length"""
+    def __init__(self):
+        super().__init__()
+        self.on_change = None
+
+    def append(self, item):
+        super().append(item)
+        self.changed()
+
+    def pop(self, index=-1):
+        item = super().pop(index)
+        self.changed()
+        return item
+
+    def remove(self, item):
+        super().remove(item)
+        self.changed()
+
+    def changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
 class Machine(simpy.Resource):
     """Operation with job id, operation id, machine, duration, next operation"""
+    PutQueue = PutQueue
+
     def __init__(self, id, group, tools, env = None):
         self.id = id
         self.group = group
@@ -11,8 +36,16 @@ class Machine(simpy.Resource):
         self.current_tool = None
         self.state = State.FREE
         self.history = []
+        # Dispatcher der Maschinengruppe, wird über Änderungen der Warteschlange informiert
+        self.dispatcher = None
+        self.dispatch_index = None
         
         super().__init__(env, 1)
+        self.put_queue.on_change = self.queue_changed
+
+    def queue_changed(self):
+        if self.dispatcher is not None:
+            self.dispatcher.update(self.dispatch_index)
 
     def __repr__(self):
         return f"Machine(id='{self.id}', name={self.group}, tool={self.current_tool}, " \
@@ -1,5 +1,9 @@
 class Operation:
     """Operation with job id, operation id, machine, duration, next operation"""
+    __slots__ = ('job_id', 'product_type', 'operation_id', 'req_machine_group_id', 'tool', 'plan_machine_id', 'machine',
+                 'duration', 'successor', 'plan_start', 'plan_end', 'plan_duration', 'sim_start', 'sim_duration', 'sim_end',
+                 'successor_operation', 'predecessor_operations')
+
     def __init__(self, job_id, operation_id, machine_group_id, tool, duration, succ, product_type):
         self.job_id = job_id
         self.product_type = product_type
@@ -0,0 +1,227 @@
+import numpy as np
+import pandas as pd
+from modules.factory.Operation import Operation
+
+# Struct layout of one operation, string attributes are stored as integer codes
+OPERATION_DTYPE = np.dtype([
+    ('job', np.int32),
+    ('product_type', np.int32),
+    ('operation_id', np.int32),
+    ('machine_group', np.int32),
+    ('tool', np.int32),
+    ('duration', np.float64),
+    ('successor', np.int32),
+    ('successor_index', np.int64),
+    ('plan_machine', np.int32),
+    ('plan_start', np.float64),
+    ('plan_duration', np.float64),
+    ('plan_end', np.float64),
+    ('sim_start', np.float64),
+    ('sim_duration', np.float64),
+    ('sim_end', np.float64),
+])
+
+# Attribute name of Operation -> column with categorical codes
+CODED_ATTRIBUTES = {
+    'job_id': 'job',
+    'product_type': 'product_type',
+    'req_machine_group_id': 'machine_group',
+    'plan_machine_id': 'plan_machine',
+}
+FLOAT_ATTRIBUTES = ('duration', 'plan_start', 'plan_duration', 'plan_end', 'sim_start', 'sim_duration', 'sim_end')
+INT_ATTRIBUTES = ('operation_id', 'tool', 'successor')
+
+
+class OperationTable:
+    """
+    Columnar store of operations: one NumPy struct array, categorical codes for job, product type and machines,
+    the successor as row index and the predecessors as CSR arrays (pred_offsets, pred_indices).
+    Missing times are NaN, missing codes and links are -1.
+    """
+    def __init__(self, data, categories, pred_offsets, pred_indices):
+        self.data = data
+        self.categories = categories
+        self.pred_offsets = pred_offsets
+        self.pred_indices = pred_indices
+        self.codes = {column: {value: code for code, value in enumerate(values)} for column, values in categories.items()}
+
+    @classmethod
+    def from_operations(cls, operations: list[Operation]):
+        """
+        Builds the table from Operation objects (or views), the successor is resolved by (job_id, successor).
+        """
+        data = np.empty(len(operations), dtype=OPERATION_DTYPE)
+        categories = {column: [] for column in CODED_ATTRIBUTES.values()}
+        codes = {column: {} for column in CODED_ATTRIBUTES.values()}
+
+        for attribute, column in CODED_ATTRIBUTES.items():
+            values = [getattr(operation, attribute) for operation in operations]
+            lookup, names = codes[column], categories[column]
+            for value in values:
+                if value is not None and value not in lookup:
+                    lookup[value] = len(names)
+                    names.append(value)
+            data[column] = [lookup[value] if value is not None else -1 for value in values]
+        for attribute in INT_ATTRIBUTES:
+            data[attribute] = [getattr(operation, attribute) for operation in operations]
+        for attribute in FLOAT_ATTRIBUTES:
+            data[attribute] = [np.nan if getattr(operation, attribute) is None else getattr(operation, attribute) for operation in operations]
+
+        # Links über (job, operation_id) auflösen
+        index = {(job, operation_id): i for i, (job, operation_id) in enumerate(zip(data['job'].tolist(), data['operation_id'].tolist()))}
+        data['successor_index'] = [index.get((job, successor), -1) if successor != -1 else -1
+                                   for job, successor in zip(data['job'].tolist(), data['successor'].tolist())]
+        pred_offsets, pred_indices = cls.predecessors(data['successor_index'])
+        return cls(data, categories, pred_offsets, pred_indices)
+
+    @staticmethod
+    def predecessors(successor_index):
+        """
+        CSR arrays of the predecessors: the predecessors of row i are pred_indices[pred_offsets[i]:pred_offsets[i + 1]].
+        """
+        has_successor = np.flatnonzero(successor_index >= 0)
+        targets = successor_index[has_successor]
+        order = np.argsort(targets, kind='stable')
+        pred_indices = has_successor[order]
+        pred_offsets = np.zeros(len(successor_index) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(targets, minlength=len(successor_index)), out=pred_offsets[1:])
+        return pred_offsets, pred_indices
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, i):
+        return OperationView(self, i)
+
+    def __iter__(self):
+        return (OperationView(self, i) for i in range(len(self.data)))
+
+    def column(self, column, data=None) -> np.ndarray:
+        """
+        Values of a column (of data, default all rows), categorical codes are mapped back to their values (None for -1).
+        """
+        values = (self.data if data is None else data)[column]
+        if column in self.categories:
+            names = np.array(self.categories[column] + [None], dtype=object)
+            return names[values]
+        return values
+
+    def code(self, column, value) -> int:
+        """
+        Code of a categorical value, new values are added to the categories.
+        """
+        if value is None:
+            return -1
+        lookup = self.codes[column]
+        if value not in lookup:
+            lookup[value] = len(self.categories[column])
+            self.categories[column].append(value)
+        return lookup[value]
+
+    def predecessor_indices(self, i) -> np.ndarray:
+        return self.pred_indices[self.pred_offsets[i]:self.pred_offsets[i + 1]]
+
+    def update_from(self, operations):
+        """
+        Copies the plan and simulation results of Operation objects in table order back into the table.
+        """
+        self.data['plan_machine'] = [self.code('plan_machine', operation.plan_machine_id) for operation in operations]
+        for attribute in FLOAT_ATTRIBUTES:
+            self.data[attribute] = [np.nan if getattr(operation, attribute) is None else getattr(operation, attribute) for operation in operations]
+
+    def to_frame(self, sim=False, rows=None) -> pd.DataFrame:
+        """
+        Same columns as Operation.to_dict() (planned) or Operation.to_dict_sim() (simulated).
+        rows: row indices in the order of the frame (e.g. the planned or simulated order), default all in table order.
+        """
+        prefix = 'sim' if sim else 'plan'
+        data = self.data if rows is None else self.data[np.asarray(rows, dtype=np.int64)]
+        frame = pd.DataFrame({
+            'job_id': self.column('job', data),
+            'product_type': self.column('product_type', data),
+            'operation_id': data['operation_id'].astype(np.int64),
+            'machine': self.column('plan_machine', data),
+            'tool': data['tool'].astype(np.int64),
+            'start_time': data[f'{prefix}_start'],
+            'duration': data['sim_duration'] if sim else data['duration'],
+            'plan_duration': data['plan_duration'],
+            'end_time': data[f'{prefix}_end'],
+        })
+        return frame
+
+    def to_operations(self) -> list[Operation]:
+        """
+        Creates linked Operation objects for legacy code.
+        """
+        operations = [view.to_operation() for view in self]
+        for i, operation in enumerate(operations):
+            successor_index = self.data['successor_index'][i]
+            if successor_index >= 0:
+                operation.successor_operation = operations[successor_index]
+                operations[successor_index].predecessor_operations.append(operation)
+        return operations
+
+
+class OperationView:
+    """
+    Light view of one row of an OperationTable with the attribute names of Operation.
+    """
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        object.__setattr__(self, 'table', table)
+        object.__setattr__(self, 'index', index)
+
+    def __getattr__(self, name):
+        table, row = self.table, self.table.data[self.index]
+        if name in CODED_ATTRIBUTES:
+            code = row[CODED_ATTRIBUTES[name]]
+            return table.categories[CODED_ATTRIBUTES[name]][code] if code >= 0 else None
+        if name in FLOAT_ATTRIBUTES:
+            value = row[name]
+            return None if np.isnan(value) else float(value)
+        if name in INT_ATTRIBUTES:
+            return int(row[name])
+        if name == 'successor_operation':
+            successor_index = row['successor_index']
+            return OperationView(table, int(successor_index)) if successor_index >= 0 else None
+        if name == 'predecessor_operations':
+            return [OperationView(table, int(i)) for i in table.predecessor_indices(self.index)]
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        data = self.table.data
+        if name in CODED_ATTRIBUTES:
+            data[CODED_ATTRIBUTES[name]][self.index] = self.table.code(CODED_ATTRIBUTES[name], value)
+        elif name in FLOAT_ATTRIBUTES:
+            data[name][self.index] = np.nan if value is None else value
+        elif name in INT_ATTRIBUTES:
+            data[name][self.index] = value
+        else:
+            raise AttributeError(f"{name} can not be set on an OperationView")
+
+    def __eq__(self, other):
+        return isinstance(other, OperationView) and other.table is self.table and other.index == self.index
+
+    def __hash__(self):
+        return hash((id(self.table), self.index))
+
+    def __repr__(self):
+        return f"OperationView(job_id='{self.job_id}', product_type='{self.product_type}', operation_id={self.operation_id}, " \
+               f"plan_machine_id='{self.plan_machine_id}', duration={self.duration}, successor={self.successor}, " \
+               f"plan_start={self.plan_start}, plan_end={self.plan_end})"
+
+    def to_operation(self) -> Operation:
+        operation = Operation(self.job_id, self.operation_id, self.req_machine_group_id, self.tool, self.duration, self.successor, self.product_type)
+        for attribute in FLOAT_ATTRIBUTES:
+            setattr(operation, attribute, getattr(self, attribute))
+        operation.plan_machine_id = self.plan_machine_id
+        return operation
+
+    def to_dict(self):
+        """ used to create gantt charts """
+        return self.to_operation().to_dict()
+
+    def to_dict_sim(self):
+        """ used to create gantt charts """
+        return self.to_operation().to_dict_sim()
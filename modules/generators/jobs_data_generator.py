@@ -1,34 +1,101 @@
+import numpy as np
 import pandas as pd
 import random
+from modules.factory.OperationTable import OperationTable, OPERATION_DTYPE
 
 class JobsDataGenerator:
     def __init__(self, jobs_data):
         self.jobs_data = pd.DataFrame(jobs_data, columns=['product', 'sequence', 'operation', 'tool', 'duration', 'next'])
-    
+        self.template = [list(row) for row in jobs_data]
+        # Zeilen des Templates je Produkt (in Template-Reihenfolge)
+        self.product_rows = {}
+        for r, row in enumerate(self.template):
+            self.product_rows.setdefault(row[0], []).append(r)
+
     def split_by_product(self):
         self.product_groups = self.jobs_data.groupby('product')
-    
+
+    def draw_product_types(self, num_instances, relation):
+        """
+        Draws the product type of every instance with one random.choices call
+        (same random numbers as one call per instance).
+        """
+        product_types = list(relation.keys())
+        return random.choices(product_types, weights=[relation[p] for p in product_types], k=num_instances)
+
+    def expand(self, product_types):
+        """
+        Repeats the template routings of the drawn product types with index arithmetic.
+        Returns the instance number, the template row and the first row of the job of every generated operation.
+        """
+        products = list(self.product_rows)
+        product_index = {product: i for i, product in enumerate(products)}
+        rows = np.concatenate([np.asarray(self.product_rows[product], dtype=np.int64) for product in products]) if products else np.empty(0, dtype=np.int64)
+        counts = np.array([len(self.product_rows[product]) for product in products], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1])) if products else counts
+
+        codes = np.array([product_index[product_type] for product_type in product_types], dtype=np.int64)
+        lengths = counts[codes]
+        total = int(lengths.sum())
+        instance = np.repeat(np.arange(len(codes), dtype=np.int64), lengths)
+        job_start = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        template_row = rows[np.repeat(offsets[codes], lengths) + np.arange(total, dtype=np.int64) - job_start]
+        return instance, template_row, job_start
+
     def generate_jobs_data(self, num_instances, relation):
         """
         Generate new jobs data based on the specified number of instances and relation.
-        
+
         Parameters:
         num_instances (int): The total number of new instances to generate.
         relation (dict): A dictionary defining the percentage of each product type to include.
                          For example: {'p1': 0.5, 'p2': 0.5}
         """
-        self.split_by_product()
-        
-        # Create new jobs_data
-        new_jobs_data = []
-        product_types = list(relation.keys())
-        
-        for i in range(3, 3 + num_instances):
-            product_type = random.choices(product_types, weights=[relation[p] for p in product_types])[0]
-            product_data = self.product_groups.get_group(product_type).copy()
-            product_data['product'] = f'job{i}'
-            product_data['product_type'] = product_type
-            new_jobs_data.append(product_data)
-        
-        new_jobs_data = pd.concat(new_jobs_data).reset_index(drop=True)
-        return new_jobs_data.values.tolist()
\ No newline at end of file
+        instance, template_row, _ = self.expand(self.draw_product_types(num_instances, relation))
+        job_names = [f'job{i}' for i in range(3, 3 + num_instances)]
+        # [job, sequence, operation, tool, duration, next, product_type]
+        tails = [row[1:] + [row[0]] for row in self.template]
+        return [[job_names[i], *tails[r]] for i, r in zip(instance.tolist(), template_row.tolist())]
+
+    def generate_jobs_table(self, num_instances, relation) -> OperationTable:
+        """
+        Same jobs as generate_jobs_data, directly as columnar OperationTable (without Operation objects).
+        """
+        instance, template_row, job_start = self.expand(self.draw_product_types(num_instances, relation))
+        template = self.template
+        data = np.empty(len(instance), dtype=OPERATION_DTYPE)
+        categories = {'job': [f'job{i}' for i in range(3, 3 + num_instances)], 'plan_machine': []}
+
+        def categorical(column):
+            # Kategorien in Reihenfolge des ersten Auftretens wie OperationTable.from_operations
+            values = list(dict.fromkeys(row[column] for row in template))
+            lookup = {value: code for code, value in enumerate(values)}
+            codes = np.array([lookup[row[column]] for row in template], dtype=np.int64)[template_row]
+            seen, first = np.unique(codes, return_index=True)
+            order = seen[np.argsort(first)]
+            rank = np.full(len(values), -1, dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            return [values[code] for code in order], rank[codes]
+
+        categories['product_type'], data['product_type'] = categorical(0)
+        categories['machine_group'], data['machine_group'] = categorical(2)
+        data['job'] = instance
+        data['operation_id'] = np.array([row[1] for row in template], dtype=np.int64)[template_row]
+        data['tool'] = np.array([row[3] for row in template], dtype=np.int64)[template_row]
+        data['duration'] = np.array([row[4] for row in template], dtype=np.float64)[template_row]
+        data['successor'] = np.array([row[5] for row in template], dtype=np.int64)[template_row]
+        data['plan_duration'] = data['duration']
+        data['plan_machine'] = -1
+        for column in ('plan_start', 'plan_end', 'sim_start', 'sim_duration', 'sim_end'):
+            data[column] = np.nan
+
+        # Nachfolger: Position des Nachfolgers innerhalb der Produktroute + Startzeile des Jobs
+        successor_position = np.full(len(template), -1, dtype=np.int64)
+        for rows in self.product_rows.values():
+            position = {template[r][1]: p for p, r in enumerate(rows)}
+            for r in rows:
+                successor_position[r] = position.get(template[r][5], -1) if template[r][5] != -1 else -1
+        successor = successor_position[template_row]
+        data['successor_index'] = np.where(successor >= 0, job_start + successor, -1)
+        pred_offsets, pred_indices = OperationTable.predecessors(data['successor_index'])
+        return OperationTable(data, categories, pred_offsets, pred_indices)
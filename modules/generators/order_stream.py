@@ -0,0 +1,97 @@
+import itertools
+import random
+from modules.factory.Operation import Operation
+
+class Order:
+    """Job released at release_time with its (linked) operations"""
+    __slots__ = ('job_id', 'product_type', 'release_time', 'operations')
+
+    def __init__(self, job_id, product_type, release_time, operations):
+        self.job_id = job_id
+        self.product_type = product_type
+        self.release_time = release_time
+        self.operations = operations
+
+    def __repr__(self):
+        return f"Order(job_id='{self.job_id}', product_type='{self.product_type}', release_time={self.release_time}, " \
+               f"operations={len(self.operations)})"
+
+class OrderStream:
+    """
+    Lazy stream of orders from a template (same rows as JobsDataGenerator): the product type is drawn with the
+    relation, the release times follow a Poisson process (rate orders per time unit) or a fixed takt.
+    Orders are only created when they are consumed, so memory depends on the orders in progress and not on
+    the horizon. The stream ends after num_orders orders or at the horizon (both None: endless).
+    """
+    def __init__(self, template_jobs_data, relation, arrival='poisson', rate=None, takt=None,
+                 num_orders=None, horizon=None, seed=1, first_job=3):
+        if arrival == 'poisson':
+            if rate is None or rate <= 0:
+                raise ValueError("Poisson arrivals need a positive rate.")
+        elif arrival == 'takt':
+            if takt is None or takt <= 0:
+                raise ValueError("Takt arrivals need a positive takt.")
+        else:
+            raise ValueError(f"Unknown arrival process: {arrival}")
+        self.routings = {}
+        for row in template_jobs_data:
+            self.routings.setdefault(row[0], []).append(list(row))
+        missing = [product for product in relation if product not in self.routings]
+        if missing:
+            raise ValueError(f"No template for product types: {missing}")
+        self.relation = relation
+        self.arrival = arrival
+        self.rate = rate
+        self.takt = takt
+        self.num_orders = num_orders
+        self.horizon = horizon
+        self.seed = seed
+        self.first_job = first_job
+
+    def arrival_times(self, rng):
+        time = 0.0
+        for k in itertools.count():
+            if self.arrival == 'poisson':
+                time += rng.expovariate(self.rate)
+            else:
+                time = k * self.takt
+            yield time
+
+    def __iter__(self):
+        # Eigener Generator: jeder Durchlauf liefert dieselben Aufträge
+        rng = random.Random(self.seed)
+        product_types = list(self.relation)
+        weights = [self.relation[p] for p in product_types]
+        count = itertools.count() if self.num_orders is None else range(self.num_orders)
+        for n, release_time in zip(count, self.arrival_times(rng)):
+            if self.horizon is not None and release_time > self.horizon:
+                return
+            product_type = rng.choices(product_types, weights=weights)[0]
+            yield self.create_order(f'job{self.first_job + n}', product_type, release_time)
+
+    def create_order(self, job_id, product_type, release_time):
+        operations = [Operation(job_id, row[1], row[2], row[3], row[4], row[5], product_type)
+                      for row in self.routings[product_type]]
+        operation_dict = {operation.operation_id: operation for operation in operations}
+        for operation in operations:
+            if operation.successor != -1:
+                operation.successor_operation = operation_dict[operation.successor]
+                operation.successor_operation.predecessor_operations.append(operation)
+        return Order(job_id, product_type, release_time, operations)
+
+def release_windows(orders, window):
+    """
+    Groups a stream of orders (sorted by release time) into lists per planning window [k * window, (k + 1) * window).
+    """
+    if window <= 0:
+        raise ValueError("window must be positive.")
+    batch, current = [], None
+    for order in orders:
+        index = int(order.release_time // window)
+        if batch and index != current:
+            yield batch
+            batch = []
+        batch.append(order)
+        current = index
+    if batch:
+        yield batch
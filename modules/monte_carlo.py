@@ -0,0 +1,174 @@
+"""
+Monte Carlo evaluation of a fixed plan: many replications of the execution of one schedule
+"""
+import os
+import pickle
+import random
+import concurrent.futures
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from scipy import stats
+from modules.factory.OperationTable import OperationTable
+from modules.random_streams import RandomStreams
+from modules.simulation import run_simulation
+
+METRICS = ('makespan', 'throughput')
+
+
+@contextmanager
+def preserved_random_state():
+    """Restores the global random generators after the block, so the replications do not change later runs."""
+    python_state, numpy_state = random.getstate(), np.random.get_state()
+    try:
+        yield
+    finally:
+        random.setstate(python_state)
+        np.random.set_state(numpy_state)
+
+
+def plan_sequence(schedule):
+    """
+    Operations in order of their planned start (ties in schedule order), the previous operation on the same
+    planned machine and the predecessors, as row indices of this order.
+    """
+    order = sorted(range(len(schedule)), key=lambda i: (schedule[i].plan_start if schedule[i].plan_start is not None else 0, i))
+    operations = [schedule[i] for i in order]
+    position = {id(operation): i for i, operation in enumerate(operations)}
+    previous = np.full(len(operations), -1, dtype=np.int64)
+    last = {}
+    for i, operation in enumerate(operations):
+        previous[i] = last.get(operation.plan_machine_id, -1)
+        last[operation.plan_machine_id] = i
+    predecessors = [[position[id(pred)] for pred in operation.predecessor_operations] for operation in operations]
+    return operations, previous, predecessors
+
+
+def job_metrics(starts, ends, job_index, jobs):
+    """
+    Makespan and average throughput time of the jobs per replication (rows of starts/ends),
+    like calculate_schedule and calculate_throughput without rounding.
+    """
+    job_start = np.full((jobs, starts.shape[0]), np.inf)
+    job_end = np.full((jobs, starts.shape[0]), -np.inf)
+    np.minimum.at(job_start, job_index, starts.T)
+    np.maximum.at(job_end, job_index, ends.T)
+    return {
+        'makespan': ends.max(axis=1) - starts.min(axis=1),
+        'throughput': (job_end - job_start).mean(axis=0),
+    }
+
+
+def replicate_vectorized(schedule, model, replications, seed=None):
+    """
+    Planned mode with all replications at once: the durations are sampled as (replications x operations) matrix
+    with one inference_batch call, the start times follow the plan rules (planned start, end of the predecessors,
+    end of the previous operation on the planned machine) vectorized over the replications.
+    The machine sequence of the plan is kept, so the tool of the previous planned operation is the current tool.
+    Every (replication, job, operation) draws from its own generator of RandomStreams(seed), so the model (seed,
+    variate pool) and the global generators are not touched and all models see the same random numbers.
+    """
+    operations, previous, predecessors = plan_sequence(schedule)
+    n = len(operations)
+    current_tools = [operations[p].tool if p >= 0 else None for p in previous]
+    streams = RandomStreams(seed)
+    random_states = [random_state for replication in range(replications)
+                     for random_state in streams.generators(operations, 'monte_carlo', replication)]
+    durations, _ = model.inference_batch(operations * replications, current_tools * replications, False, random_states)
+    durations = np.asarray(durations, dtype=float).reshape(replications, n)
+
+    plan_starts = np.array([operation.plan_start if operation.plan_start is not None else 0 for operation in operations], dtype=float)
+    starts = np.empty((replications, n))
+    ends = np.empty((replications, n))
+    for i in range(n):
+        start = np.full(replications, plan_starts[i])
+        if previous[i] >= 0:
+            np.maximum(start, ends[:, previous[i]], out=start)
+        for pred in predecessors[i]:
+            np.maximum(start, ends[:, pred], out=start)
+        starts[:, i] = start
+        ends[:, i] = start + durations[:, i]
+
+    job_codes = {}
+    job_index = np.array([job_codes.setdefault(operation.job_id, len(job_codes)) for operation in operations], dtype=np.int64)
+    return pd.DataFrame({'seed': np.arange(replications) + (seed or 0), **job_metrics(starts, ends, job_index, len(job_codes))})
+
+
+def _replicate_simulated(table, machines, model_blob, seeds, planned_mode, engine, crn):
+    """
+    Worker: one simulation per seed with a fresh copy of the schedule (and RandomStreams(seed) with crn).
+    """
+    model = pickle.loads(model_blob)
+    rows = []
+    for seed in seeds:
+        model.seed_random(seed)
+        result = run_simulation(machines, table.to_operations(), model, planned_mode, None, engine=engine, monitor=None,
+                                random_streams=RandomStreams(seed) if crn else None)
+        result_table = OperationTable.from_operations(result)
+        metrics = job_metrics(result_table.data['sim_start'][None, :], result_table.data['sim_end'][None, :],
+                              result_table.data['job'].astype(np.int64), len(result_table.categories['job']))
+        rows.append({'seed': seed, **{name: float(values[0]) for name, values in metrics.items()}})
+    return rows
+
+
+def replicate_simulated(schedule, machines, model, replications, seed=0, planned_mode=True, engine=None, workers=None, crn=False):
+    """
+    Replications with the simulator (exact FIFO behaviour of the machines, also for the dynamic mode),
+    spread over worker processes. The schedule is sent as OperationTable, the model as pickle, so the
+    model of the caller is not changed. crn: common random numbers per replication (see RandomStreams).
+    """
+    engine = engine or ('replay' if planned_mode else 'simpy')
+    table = OperationTable.from_operations(schedule)
+    model_blob = pickle.dumps(model)
+    seeds = [seed + r for r in range(replications)]
+    workers = min(workers or os.cpu_count() or 1, replications)
+    chunks = [seeds[w::workers] for w in range(workers)]
+    rows = []
+    if workers == 1:
+        rows = _replicate_simulated(table, machines, model_blob, seeds, planned_mode, engine, crn)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_replicate_simulated, table, machines, model_blob, chunk, planned_mode, engine, crn) for chunk in chunks]
+            for future in futures:
+                rows.extend(future.result())
+    return pd.DataFrame(rows).sort_values('seed', ignore_index=True)
+
+
+def summarize(samples, quantiles=(0.05, 0.5, 0.95), confidence=0.95):
+    """
+    Mean, standard deviation, quantiles and the confidence interval of the mean (t-distribution) per metric.
+    """
+    rows = []
+    for metric in METRICS:
+        values = samples[metric].to_numpy(dtype=float)
+        mean, std = values.mean(), values.std(ddof=1) if len(values) > 1 else 0.0
+        half_width = stats.t.ppf(0.5 + confidence / 2, len(values) - 1) * std / np.sqrt(len(values)) if len(values) > 1 else np.nan
+        row = {'metric': metric, 'replications': len(values), 'mean': mean, 'std': std,
+               'ci_low': mean - half_width, 'ci_high': mean + half_width}
+        row.update({f'q{quantile:g}': np.quantile(values, quantile) for quantile in quantiles})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def monte_carlo(schedule, machines, model, replications=100, seed=0, method='vectorized', planned_mode=True,
+                workers=None, quantiles=(0.05, 0.5, 0.95), confidence=0.95, crn=False):
+    """
+    Evaluates one planned schedule with replications of its execution under model.
+
+    method 'vectorized' samples all replications at once (planned mode, planned machine sequence) with common
+    random numbers, 'simulate' runs the simulator per replication on worker processes (common random numbers
+    with crn). The model and the global random generators are left unchanged.
+    Returns the summary (quantiles, confidence intervals) and the samples per replication.
+    """
+    if replications <= 0:
+        raise ValueError("replications must be positive.")
+    with preserved_random_state():
+        if method == 'vectorized':
+            if not planned_mode:
+                raise ValueError("The vectorized Monte Carlo method only supports the planned mode.")
+            samples = replicate_vectorized(schedule, model, replications, seed)
+        elif method == 'simulate':
+            samples = replicate_simulated(schedule, machines, model, replications, seed, planned_mode, workers=workers, crn=crn)
+        else:
+            raise ValueError(f"Unknown Monte Carlo method: {method}")
+    return summarize(samples, quantiles, confidence), samples
@@ -0,0 +1,130 @@
+"""
+Streaming sink for the observed variables of planning and simulation runs
+"""
+import os
+import pandas as pd
+
+FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+}
+
+def default_observed_data_path(name, folder='./data'):
+    """
+    Path for observed data of GifflerThompson, unique per process so parallel runs do not overwrite each other.
+    """
+    return os.path.join(folder, f'data_oberserve_{name}_{os.getpid()}.csv')
+
+class ObservedDataSink:
+    """
+    Collects the observed variables (one record per operation) in a bounded buffer and writes them in chunks
+    of chunk_size records while the run is going. The format follows the file extension: .csv (same layout
+    as DataFrame.to_csv, incl. the row index), .parquet or .arrow/.feather (Arrow IPC). The columns and their
+    types are fixed by the first chunk. Without path the records are only counted.
+
+    on_flush: called with each flushed chunk as DataFrame (also without path), e.g. CausalLearningModel.update
+    to keep a model current with the observed data of the run.
+    """
+    def __init__(self, path=None, chunk_size=10000, on_flush=None):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive.")
+        self.path = path
+        self.format = None
+        if path is not None:
+            extension = os.path.splitext(str(path))[1].lower()
+            if extension not in FORMATS:
+                raise ValueError(f"Unsupported observed data format: {path}")
+            self.format = FORMATS[extension]
+        self.chunk_size = chunk_size
+        self.on_flush = on_flush
+        self.buffer = []
+        self.written = 0
+        self.columns = None
+        self.schema = None
+        self.writer = None
+        self.closed = False
+
+    def append(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def __len__(self):
+        return self.written + len(self.buffer)
+
+    def flush(self):
+        """
+        Writes the buffered records and empties the buffer.
+        """
+        if not self.buffer:
+            return
+        if self.path is None and self.on_flush is None:
+            self.written += len(self.buffer)
+            self.buffer = []
+            return
+        frame = pd.DataFrame(self.buffer)
+        frame.index = range(self.written, self.written + len(frame))
+        if self.path is None:
+            self.on_flush(frame)
+            self.written += len(frame)
+            self.buffer = []
+            return
+        if self.columns is None:
+            self.columns = list(frame.columns)
+        elif not set(frame.columns) <= set(self.columns):
+            raise ValueError(f"Observed variables changed during the run: {list(frame.columns)} != {self.columns}")
+        else:
+            frame = frame.reindex(columns=self.columns)
+        getattr(self, f'write_{self.format}')(frame)
+        if self.on_flush is not None:
+            self.on_flush(frame)
+        self.written += len(frame)
+        self.buffer = []
+
+    def write_csv(self, frame):
+        first = self.written == 0
+        frame.to_csv(self.path, mode='w' if first else 'a', header=first)
+
+    def to_table(self, frame):
+        import pyarrow as pa
+        frame = frame.rename(columns=str)
+        if self.schema is None:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            self.schema = table.schema
+            return table
+        try:
+            return pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ValueError(f"Observed variables do not match the column types {self.schema}: {e}")
+
+    def write_parquet(self, frame):
+        import pyarrow.parquet as pq
+        table = self.to_table(frame)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(table)
+
+    def write_arrow(self, frame):
+        import pyarrow as pa
+        table = self.to_table(frame)
+        if self.writer is None:
+            self.writer = pa.ipc.new_file(self.path, self.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        """
+        Flushes the remaining records and closes the file. Returns the path.
+        """
+        if self.closed:
+            return self.path
+        self.flush()
+        if self.path is not None and self.written == 0 and self.format == 'csv':
+            # Leerer Lauf: gleiche Datei wie DataFrame([]).to_csv
+            pd.DataFrame([]).to_csv(self.path)
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        self.closed = True
+        return self.path
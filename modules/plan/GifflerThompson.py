@@ -1,46 +1,124 @@
 import heapq
-import pandas as pd
+import bisect
 import numpy as np
 from modules.factory.Operation import Operation
 from modules.plan.PriorityRules import get_priority
+from modules.plan.ReadyQueue import ReadyQueue
+from modules.observed_data import ObservedDataSink, default_observed_data_path
+from modules.generators.order_stream import release_windows
 
 class GifflerThompson:
     """GT with
     priority rule = func(args...) # implement required (spt, mdd, spr...)
     inference = func(task) # inference module to predict times default inference is = """
-    def __init__(self, rule_name, inference, do_calculus = False):
+    def __init__(self, rule_name, inference, do_calculus = False, inference_batch = None, incremental = True, observed_data_path = None, random_streams = None):
         self.rule_name = rule_name
+        # Optional RandomStreams: gemeinsame Zufallszahlen je Operation für den Vergleich von Modellen
+        self.random_streams = random_streams
+        self.incremental = incremental
         self.inference = inference
+        self.inference_batch = inference_batch if inference_batch is not None else self.get_inference_batch(inference)
         self.do_calculus = do_calculus
-        self.observed_data = []
+        # None: ./data/data_oberserve_<inference>_<pid>.csv, damit parallele Läufe sich nicht überschreiben
+        self.observed_data_path = observed_data_path if observed_data_path is not None else default_observed_data_path(self.get_inference_name(inference))
+        self.observed_data = None
         self.schedule = []
         self.qlength = []
+        # Sortierte plan_start Zeiten der geplanten Operationen je Maschinengruppe (insort ist O(n) durch das
+        # Verschieben der Liste, aber ohne Python-Schleife; count_planned_after ist O(log n))
+        self.planned_starts = {}
+
+    def get_inference_batch(self, inference):
+        """Uses the batch inference of the model if inference is a bound Model.inference, else loops over inference.
+        With random streams every operation is inferred with its generator of the 'priority' stream."""
+        model = getattr(inference, '__self__', None)
+        if model is not None and getattr(inference, '__name__', None) == 'inference' and hasattr(model, 'inference_batch'):
+            if self.random_streams is None:
+                return model.inference_batch
+            return lambda operations, current_tools, do_calculus: model.inference_batch(
+                operations, current_tools, do_calculus, random_states=self.random_streams.generators(operations, 'priority'))
+
+        def inference_loop(operations, current_tools, do_calculus):
+            results = [self.infer(operation, tool, do_calculus, stream='priority') for operation, tool in zip(operations, current_tools)]
+            return np.array([duration for duration, _ in results], dtype=float), [variables for _, variables in results]
+        return inference_loop
+
+    def infer(self, operation, current_tool, do_calculus, stream='planning'):
+        if self.random_streams is None:
+            return self.inference(operation, current_tool, do_calculus)
+        # Gemeinsame Zufallszahlen: inference muss random_state annehmen (siehe Model.inference)
+        random_state = self.random_streams.generator(operation.job_id, operation.operation_id, stream)
+        return self.inference(operation, current_tool, do_calculus, random_state=random_state)
+
+    @staticmethod
+    def get_inference_name(inference):
+        function = getattr(inference, '__func__', inference)
+        return getattr(function, '__qualname__', type(inference).__name__)
 
     def update_priorities(self, ready_operations, available_times):
-        temp_heap = []
-        while len(ready_operations) > 0:
-            _,_, operation = heapq.heappop(ready_operations)
+        operations = [operation for _, _, operation in ready_operations]
+        inference_tools = []
+        for operation in operations:
             selected_machine_idx = 0
             operation.plan_machine_id = str(operation.req_machine_group_id) + '_' + str(selected_machine_idx)
-            inference_tool = available_times[operation.req_machine_group_id][0][1]
-            inference_duration, inferenced_variables = self.inference(operation, inference_tool, self.do_calculus) 
+            inference_tools.append(available_times[operation.req_machine_group_id][0][1])
+        # Eine Inferenz für alle bereiten Operationen statt einer pro Operation
+        inference_durations, _ = self.inference_batch(operations, inference_tools, self.do_calculus)
+        temp_heap = []
+        for operation, inference_duration in zip(operations, inference_durations):
             new_priority = get_priority(operation=operation,rule_name=self.rule_name, infered_operation_duration=inference_duration)
-            #new_priority = get_priority(operation=operation,rule_name=self.rule_name)
-            heapq.heappush(temp_heap, (new_priority, (str(operation.job_id) + " _ " + str(operation.operation_id)), operation))
+            temp_heap.append((new_priority, (str(operation.job_id) + " _ " + str(operation.operation_id)), operation))
+        heapq.heapify(temp_heap)
         return temp_heap
 
     def create_schedule(self, operations, machine_pools):
+        self.observed_data = ObservedDataSink(self.observed_data_path)
+        self.schedule_operations(operations, machine_pools)
+        self.write_data()
+        return self.schedule
+
+    def plan_orders(self, orders, machine_pools, window):
+        """
+        Rolling horizon: plans the orders of an OrderStream per release window [k * window, (k + 1) * window)
+        and yields them planned. The machine availability is carried over from window to window, the operations
+        without predecessor start at the earliest at the release time of their order. Only the orders of the
+        current window are held by the planner.
+        """
+        self.observed_data = ObservedDataSink(self.observed_data_path)
+        machine_available_time = None
+        try:
+            for batch in release_windows(orders, window):
+                self.schedule, self.qlength, self.planned_starts = [], [], {}
+                operations = []
+                for order in batch:
+                    for operation in order.operations:
+                        if not operation.predecessor_operations:
+                            operation.plan_start = order.release_time
+                    operations.extend(order.operations)
+                machine_available_time = self.schedule_operations(operations, machine_pools, machine_available_time)
+                yield from batch
+        finally:
+            self.write_data()
+
+    def schedule_operations(self, operations, machine_pools, machine_available_time = None):
+        """
+        Plans the operations and appends them to self.schedule. Returns the machine availability
+        ([available time, setup] per machine) to continue planning with further operations.
+        """
         ready_operations = []
+        # Inkrementelle Prioritäten: nur neue Operationen und Gruppen mit geändertem Tool werden neu bewertet
+        ready_queue = ReadyQueue(self.rule_name, self.inference_batch, self.do_calculus) if self.incremental else None
         inserted_operations = set()
         # [available time, setup]
-        machine_available_time = {machine: [[0, None]] * qty for machine, qty, _ in machine_pools}
+        if machine_available_time is None:
+            machine_available_time = {machine: [[0, None]] * qty for machine, qty, _ in machine_pools}
 
         # Dictionary zur Verwaltung der Operation-Objekte über (job_id, operation_id)
         operation_dict = {(operation.job_id, operation.operation_id): operation for operation in operations}
 
-        # Setze die Referenzen zu Successor und Predecessor Operations
+        # Setze die Referenzen zu Successor und Predecessor Operations (bereits verknüpfte bleiben unverändert)
         for operation in operations:
-            if operation.successor != -1:
+            if operation.successor != -1 and operation.successor_operation is None:
                 next_operation = operation_dict[(operation.job_id, operation.successor)]
                 operation.successor_operation = next_operation
                 next_operation.predecessor_operations.append(operation)
@@ -48,14 +126,18 @@ class GifflerThompson:
                 #priority = get_priority(operation=operation,rule_name=self.rule_name, infered_operation_duration=operation.duration)
                 heapq.heappush(ready_operations, (0, (str(operation.job_id) + " _ " +  str(operation.operation_id)), operation))
                 inserted_operations.add(operation)
+        if ready_queue is not None:
+            ready_queue.push([operation for _, _, operation in ready_operations], machine_available_time)
+            ready_operations = ready_queue
         n = 0
         while len(ready_operations) > 0:
 
-            # Aktualisiere alle Prioritäten in der ready_operations Heap
-            ready_operations = self.update_priorities(ready_operations, machine_available_time)
-            # !Potentielle optimierung: kann bei Statischen Prioritäten übersprungen werden, 
-            # kann übersprungen werden wenn die Zeit nicht vorrangeschritten ist.
-            _, _, current_operation = heapq.heappop(ready_operations)
+            if ready_queue is not None:
+                _, _, current_operation = ready_queue.pop()
+            else:
+                # Aktualisiere alle Prioritäten in der ready_operations Heap
+                ready_operations = self.update_priorities(ready_operations, machine_available_time)
+                _, _, current_operation = heapq.heappop(ready_operations)
 
             # Überprüfe die Maschinenverfügbarkeit
             machine = current_operation.req_machine_group_id
@@ -69,12 +151,12 @@ class GifflerThompson:
                     selected_machine_idx = i
             #ready_count_req_machine = len([op for op in ready_operations if op[2].req_machine_group_id == current_operation.req_machine_group_id])
             if current_operation.successor != -1:
-                qleng = len([op for op in self.schedule if current_operation.successor_operation.req_machine_group_id == op.req_machine_group_id and earliest_start_time < op.plan_start])
+                qleng = self.count_planned_after(current_operation.successor_operation.req_machine_group_id, earliest_start_time)
                 self.qlength.append([n, current_operation.successor_operation.req_machine_group_id, qleng])
                 n = n + 1
             current_operation.plan_machine_id = str(current_operation.req_machine_group_id) + '_' + str(selected_machine_idx)
             current_tool = available_times[selected_machine_idx][1]
-            current_duration, inferenced_variables = self.inference(current_operation, current_tool, self.do_calculus)  
+            current_duration, inferenced_variables = self.infer(current_operation, current_tool, self.do_calculus)  
             self.observed_data.append(inferenced_variables)
             if current_duration is None or not isinstance(current_duration, (float, np.float64)) or current_duration <= 0:
                 print(f"Invalid duration {operation.duration} for operation {current_operation.job_id}_{current_operation.operation_id}: {current_duration}")
@@ -84,6 +166,8 @@ class GifflerThompson:
             current_operation.plan_start = earliest_start_time
             current_operation.plan_end = end_time
             available_times[selected_machine_idx] = [end_time, current_operation.tool]
+            if ready_queue is not None:
+                ready_queue.update(machine, machine_available_time)
 
             # Aktualisiere die geplante Startzeit für die Nachfolgeaufgaben
             if current_operation.successor_operation:
@@ -97,15 +181,22 @@ class GifflerThompson:
                     #inference_tool = available_times[selected_machine_idx][1]
                     #inference_duration, inferenced_variables = self.inference(successor, inference_tool, self.do_calculus) 
                     #priority = get_priority(operation=successor,rule_name=self.rule_name, infered_operation_duration=inference_duration)
-                    heapq.heappush(ready_operations, (0, (str(current_operation.job_id) + " _ " + str(current_operation.operation_id)), successor))
+                    if ready_queue is not None:
+                        ready_queue.push([successor], machine_available_time)
+                    else:
+                        heapq.heappush(ready_operations, (0, (str(current_operation.job_id) + " _ " + str(current_operation.operation_id)), successor))
                     inserted_operations.add(successor)
 
             # Füge die Aufgabe zur Zeitplanung hinzu
             self.schedule.append(current_operation)
+            bisect.insort(self.planned_starts.setdefault(machine, []), earliest_start_time)
 
-        self.write_data()
-        return self.schedule
+        return machine_available_time
     
+    def count_planned_after(self, machine_group_id, time):
+        """Number of planned operations on the machine group starting after time, O(log n)."""
+        starts = self.planned_starts.get(machine_group_id, [])
+        return len(starts) - bisect.bisect_right(starts, time)
+
     def write_data(self):
-        df_observed_data = pd.DataFrame(self.observed_data)
-        return df_observed_data.to_csv(f'./data/data_oberserve_{self.inference.__func__.__qualname__}.csv')
+        return self.observed_data.close()
@@ -31,6 +31,9 @@ priority_rules = {
     "fcfs": calculate_fcfs_priority
 }
 
+# Rules which do not depend on the infered duration or the planning state
+static_rules = {"fcfs"}
+
 def get_priority(operation, rule_name, infered_operation_duration):
     rule_function = priority_rules.get(rule_name)
     if rule_function is not None:
@@ -0,0 +1,100 @@
+import heapq
+from itertools import accumulate
+from modules.plan.PriorityRules import get_priority, static_rules
+
+class ReadyQueue:
+    """Ready operations of the GT algorithm with incrementally maintained priorities.
+    The priority of a ready operation only depends on the plan_start of its (already planned) predecessors
+    and on the tool of machine 0 of its group. Therefore one heap per (group, tool) is kept and an operation
+    is inferred at most once per tool; switching the tool back only infers the operations that became ready
+    in the meantime. Scheduled operations are removed lazily from the other heaps of their group and
+    from the arrivals once they make up half of them.
+    Static rules (fcfs) are computed once on insert without inference."""
+    def __init__(self, rule_name, inference_batch, do_calculus = False):
+        self.rule_name = rule_name
+        self.inference_batch = inference_batch
+        self.do_calculus = do_calculus
+        self.static = rule_name in static_rules
+        # group -> ready operations in arrival order and number of them not scheduled yet
+        self.arrivals = {}
+        self.waiting = {}
+        # (group, tool) -> heap and number of arrivals already in the heap
+        self.heaps = {}
+        self.synced = {}
+        # group -> current tool of machine 0
+        self.tools = {}
+        self.scheduled = set()
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def entries(self, operations, tool):
+        """Heap entries (priority, tie break, operation) for operations of one machine group."""
+        for operation in operations:
+            operation.plan_machine_id = str(operation.req_machine_group_id) + '_0'
+        if self.static:
+            durations = [operation.duration for operation in operations]
+        else:
+            durations, _ = self.inference_batch(operations, [tool] * len(operations), self.do_calculus)
+        return [(get_priority(operation=operation, rule_name=self.rule_name, infered_operation_duration=duration),
+                 (str(operation.job_id) + " _ " + str(operation.operation_id)), operation)
+                for operation, duration in zip(operations, durations)]
+
+    def push(self, operations, available_times):
+        """Adds newly ready operations."""
+        groups = {}
+        for operation in operations:
+            groups.setdefault(operation.req_machine_group_id, []).append(operation)
+        for group, group_operations in groups.items():
+            self.arrivals.setdefault(group, []).extend(group_operations)
+            self.waiting[group] = self.waiting.get(group, 0) + len(group_operations)
+            self.size += len(group_operations)
+            self.update(group, available_times)
+
+    def update(self, group, available_times):
+        """Activates the heap of the current tool of the group and infers the operations it does not contain yet."""
+        tool = None if self.static else available_times[group][0][1]
+        self.tools[group] = tool
+        key = (group, tool)
+        arrivals = self.arrivals.get(group, [])
+        start = self.synced.get(key, 0)
+        if start == len(arrivals):
+            return
+        heap = self.heaps.setdefault(key, [])
+        operations = [operation for operation in arrivals[start:] if operation not in self.scheduled]
+        for entry in self.entries(operations, tool):
+            heapq.heappush(heap, entry)
+        self.synced[key] = len(arrivals)
+
+    def pop(self):
+        """Pops the operation with the best priority over all machine groups."""
+        best = None
+        for group, tool in self.tools.items():
+            heap = self.heaps.get((group, tool))
+            while heap and heap[0][2] in self.scheduled:
+                heapq.heappop(heap)
+            if heap and (best is None or heap[0][:2] < best[0][:2]):
+                best = heap
+        if best is None:
+            raise IndexError("pop from an empty ReadyQueue")
+        entry = heapq.heappop(best)
+        self.scheduled.add(entry[2])
+        self.size -= 1
+        self.trim(entry[2].req_machine_group_id)
+        return entry
+
+    def trim(self, group):
+        """Drops the scheduled operations from the arrivals of the group once they are at least half of them
+        (amortized O(1) per pop), the synced positions of its heaps are moved accordingly."""
+        self.waiting[group] -= 1
+        arrivals = self.arrivals[group]
+        if 2 * self.waiting[group] > len(arrivals):
+            return
+        waiting = [operation not in self.scheduled for operation in arrivals]
+        # Anzahl wartender Operationen vor jeder Position
+        positions = [0, *accumulate(waiting)]
+        for key, start in self.synced.items():
+            if key[0] == group:
+                self.synced[key] = positions[start]
+        self.arrivals[group] = [operation for operation, keep in zip(arrivals, waiting) if keep]
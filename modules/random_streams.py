@@ -0,0 +1,36 @@
+"""
+Common random numbers: random generators keyed by seed, stream, job and operation
+"""
+import zlib
+import numpy as np
+
+
+class RandomStreams:
+    """
+    Random numbers that depend only on (seed, stream, job, operation) and not on the order in which
+    operations are processed or on the draws of other operations. If every model is run with the same
+    RandomStreams, all models see the same underlying uniforms for an operation (common random numbers)
+    and the differences between the models are not hidden by sampling noise.
+
+    generator() returns a np.random.Generator for the key, the models draw from it when it is passed as
+    random_state to inference() (or as random_states to inference_batch(), see generators()).
+    """
+    def __init__(self, seed=0):
+        self.seed = 0 if seed is None else int(seed)
+
+    @staticmethod
+    def key(value) -> int:
+        """Stable integer for ids (hash() of strings differs between processes)."""
+        if isinstance(value, (int, np.integer)) and value >= 0:
+            return int(value)
+        return zlib.crc32(str(value).encode())
+
+    def seed_sequence(self, job_id, operation_id, stream='simulation', replication=0) -> np.random.SeedSequence:
+        return np.random.SeedSequence([self.seed, self.key(stream), self.key(job_id), self.key(operation_id), int(replication)])
+
+    def generator(self, job_id, operation_id, stream='simulation', replication=0) -> np.random.Generator:
+        return np.random.Generator(np.random.PCG64(self.seed_sequence(job_id, operation_id, stream, replication)))
+
+    def generators(self, operations, stream='simulation', replication=0) -> list[np.random.Generator]:
+        """One generator per operation, e.g. the random_states of inference_batch()."""
+        return [self.generator(operation.job_id, operation.operation_id, stream, replication) for operation in operations]
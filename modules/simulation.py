@@ -1,27 +1,61 @@
 from modules.simulator.Simulator import Simulator
+from modules.simulator.ReplaySimulator import ReplaySimulator
 from modules.simulator.Monitoring.BasicMonitor import monitorResource
 from functools import partial
+from modules.simulator.Monitoring.ColumnarMonitor import ColumnarMonitor
 from modules.factory.Operation import Operation
 
-def run_simulation(machines, operations, model, planned_mode, oberserved_data_path = None) -> list[Operation]:
+def run_simulation(machines, operations, model, planned_mode, oberserved_data_path = None, engine = 'simpy', monitor = 'basic', orders = None, on_job_finished = None, random_streams = None, feedback = None) -> list[Operation]:
     """
     Execute a simulation using a given plan and operations.
+    engine 'replay' replays the plan without SimPy processes (planned mode only).
+    monitor: 'basic' (tuple list), a ColumnarMonitor which is attached to the machines, or None for no monitoring.
+    orders: optional order stream, its jobs are started at their release time (see Simulator).
+    random_streams: optional RandomStreams for common random numbers across models.
+    feedback: optional callback for the observed data in chunks, e.g. model.update to learn online during the run.
     """
+    if engine == 'replay':
+        if not planned_mode:
+            raise ValueError("The replay engine only supports the planned mode.")
+        if monitor not in (None, 'basic'):
+            raise ValueError("The replay engine does not support resource monitoring.")
+        if orders is not None:
+            raise ValueError("The replay engine does not support order streams.")
+        sim = ReplaySimulator(machines, operations, model, oberserved_data_path, random_streams, feedback)
+        sim.run(100000000)
+        sim.write_data() if oberserved_data_path is not None or feedback is not None else None
+        return sim.schedule
+    if engine != 'simpy':
+        raise ValueError(f"Unknown simulation engine: {engine}")
+
     # array to store monitored data
     data = []
 
     # resource monitor [pre , post] execution
-    monitor = [None, partial(monitorResource, data)]
+    if monitor == 'basic':
+        resource_monitor = [None, partial(monitorResource, data)]
+    elif isinstance(monitor, ColumnarMonitor):
+        resource_monitor = [None, monitor]
+    elif monitor is None:
+        resource_monitor = [None, None]
+    else:
+        raise ValueError(f"Unknown monitor: {monitor}")
 
     sim = Simulator(machines
                     , operations
-                    , monitor
+                    , resource_monitor
                     , model
                     , oberserved_data_path
-                    , planned_mode=planned_mode)
+                    , planned_mode=planned_mode
+                    , orders=orders
+                    , on_job_finished=on_job_finished
+                    , random_streams=random_streams
+                    , feedback=feedback)
+    if isinstance(monitor, ColumnarMonitor):
+        monitor.attach(sim.pools, operations)
 
     sim.env.run(100000000)
     
-    sim.write_data() if oberserved_data_path is not None else None
+    sim.write_data() if oberserved_data_path is not None or feedback is not None else None
     
     return sim.schedule 
\ No newline at end of file
@@ -0,0 +1,39 @@
+import heapq
+
+class GroupDispatcher:
+    """
+    Machines of one group ordered by (queue length, position in the group), which is the order of
+    min(machines, key=lambda m: len(m.queue)). The machines report every change of their queue,
+    the heap is invalidated lazily, so choosing a machine does not scan the group.
+    """
+    def __init__(self, machines):
+        self.machines = machines
+        self.lengths = [len(machine.queue) for machine in machines]
+        self.versions = [0] * len(machines)
+        self.heap = []
+        self.rebuild()
+        for index, machine in enumerate(machines):
+            machine.dispatcher = self
+            machine.dispatch_index = index
+
+    def rebuild(self):
+        self.heap = [(length, index, self.versions[index]) for index, length in enumerate(self.lengths)]
+        heapq.heapify(self.heap)
+
+    def update(self, index):
+        length = len(self.machines[index].queue)
+        if length == self.lengths[index]:
+            return
+        self.lengths[index] = length
+        self.versions[index] += 1
+        heapq.heappush(self.heap, (length, index, self.versions[index]))
+        # Veraltete Einträge begrenzen
+        if len(self.heap) > 4 * len(self.machines) + 16:
+            self.rebuild()
+
+    def next(self):
+        """Machine with the shortest queue, the first one of the group on ties."""
+        heap = self.heap
+        while heap[0][2] != self.versions[heap[0][1]]:
+            heapq.heappop(heap)
+        return self.machines[heap[0][1]]
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+# Fixed width record of one resource event
+COLUMNS = {
+    'machine': np.int32,
+    'time': np.float64,
+    'count': np.int16,
+    'queue': np.int32,
+    'operation': np.int64,
+}
+
+class ColumnarMonitor:
+    """
+    Resource monitor writing fixed width records (machine index, time, users, queue length, operation index)
+    into preallocated NumPy columns instead of tuples with live object references.
+
+    ring=True keeps only the last capacity records (ring buffer), ring=False stores all records in chunks
+    of capacity. sample_rate < 1 records every n-th call only (deterministic, the random generators of
+    the models are not touched).
+    """
+    def __init__(self, capacity=65536, sample_rate=1.0, ring=True):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive.")
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1].")
+        self.capacity = capacity
+        self.stride = max(1, int(round(1 / sample_rate)))
+        self.ring = ring
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.chunks = []
+        self.position = 0
+        self.written = 0
+        self.calls = 0
+        self.machine_ids = []
+        self.machine_index = {}
+        self.operation_index = {}
+
+    def attach(self, machines: dict, operations: list):
+        """
+        Assigns the indices of machines (id -> Machine) and operations used in the records.
+        """
+        self.machine_ids = list(machines)
+        self.machine_index = {id(machine): i for i, machine in enumerate(machines.values())}
+        self.operation_index = {id(operation): i for i, operation in enumerate(operations)}
+
+    def __call__(self, resource):
+        self.calls += 1
+        if self.stride > 1 and self.calls % self.stride:
+            return
+        if self.position == self.capacity:
+            if not self.ring:
+                self.chunks.append({name: column.copy() for name, column in self.columns.items()})
+            self.position = 0
+        i = self.position
+        columns = self.columns
+        columns['machine'][i] = self.machine_index.get(id(resource), -1)
+        columns['time'][i] = resource._env.now
+        columns['count'][i] = resource.count
+        columns['queue'][i] = len(resource.queue)
+        operation = resource.current_operation
+        columns['operation'][i] = -1 if operation is None else self.operation_index.get(id(operation), -1)
+        self.position += 1
+        self.written += 1
+
+    def __len__(self):
+        return min(self.written, self.capacity) if self.ring else self.written
+
+    def records(self) -> dict:
+        """
+        Recorded columns in the order of recording.
+        """
+        if self.ring:
+            if self.written > self.capacity:
+                order = np.r_[self.position:self.capacity, 0:self.position]
+                return {name: column[order] for name, column in self.columns.items()}
+            return {name: column[:self.position].copy() for name, column in self.columns.items()}
+        return {name: np.concatenate([chunk[name] for chunk in self.chunks] + [column[:self.position]])
+                for name, column in self.columns.items()}
+
+    def to_frame(self) -> pd.DataFrame:
+        frame = pd.DataFrame(self.records())
+        frame['machine_id'] = pd.Categorical.from_codes(frame['machine'], categories=self.machine_ids) if self.machine_ids else None
+        return frame
+
+    def to_npz(self, path):
+        np.savez_compressed(path, machine_ids=np.array(self.machine_ids, dtype=str), **self.records())
+        return path
+
+    def to_parquet(self, path):
+        pd.DataFrame(self.records()).to_parquet(path, index=False)
+        return path
+
+    def export(self, path):
+        """
+        Writes the records as .npz or .parquet depending on the file extension.
+        """
+        if path.endswith('.parquet'):
+            return self.to_parquet(path)
+        if path.endswith('.npz'):
+            return self.to_npz(path)
+        raise ValueError(f"Unsupported monitor export format: {path}")
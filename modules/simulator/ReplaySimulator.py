@@ -0,0 +1,143 @@
+"""
+Replay of a planned schedule without SimPy processes
+"""
+import heapq
+from collections import deque
+import logging
+import simpy
+from modules.factory.Machine import Machine
+from modules.simulator.Simulator import topological_order
+from models.abstract.model import Model
+from modules.observed_data import ObservedDataSink
+from modules.logger import Logger
+
+# Prioritäten und Ereignisarten wie in SimPy: Initialize ist URGENT, alle anderen NORMAL
+URGENT = 0
+NORMAL = 1
+INIT, CONDITION, DELAY, GRANT, DONE, RELEASE, PROCESS_END = range(7)
+
+class ReplaySimulator:
+    def __init__(self, machines, schedule, model: Model, oberserved_data_path, random_streams=None, feedback=None):
+        """
+        Discrete event replay of a plan (planned mode only) with a plain event heap and precedence counters:
+        every operation requests its plan_machine_id at max(plan_start, end of its predecessors), machines serve
+        requests FIFO and the duration is inferred when the operation starts. Produces the same sim_start/sim_end
+        as the SimPy Simulator in planned mode without generator processes and patched resources.
+
+        Args:
+            machines: Array of machine configurations
+            schedule: Array of planned operations
+            model: Model for inference
+            oberserved_data_path: Path for observed data output (.csv, .parquet or .arrow, written in chunks)
+            random_streams: Optional RandomStreams, the model draws common random numbers per operation
+            feedback: Optional callback for each chunk of observed data (DataFrame), e.g. CausalLearningModel.update
+        """
+        self.schedule = schedule
+        self.oberserved_data_path = oberserved_data_path
+        # Beobachtete Variablen werden während des Laufs in Blöcken geschrieben
+        self.observed_data = ObservedDataSink(oberserved_data_path, on_flush=feedback)
+        self.machines = machines
+        self.model = model
+        self.random_streams = random_streams
+        self.env = simpy.Environment()
+        self.pools = self.build_pools(machines)
+        self.logger = Logger.get_logger(category="Simulation", level=logging.DEBUG,
+                                      log_to_file=False, log_filename="output/logs/simulation.log")
+
+    def build_pools(self, pool_data):
+        """
+        builds a dict of machines from data (same ids as the Simulator)
+        """
+        pools = {}
+        for pool in pool_data:
+            for idx in range(0, pool[1]):
+                id = str(pool[0]) + '_' + str(idx)
+                pools[id] = Machine(id=id, group=str(pool[0]), tools=pool[2], env=self.env)
+        return pools
+
+    def run(self, until=100000000):
+        """
+        Replays the events the SimPy processes of the Simulator would create, in the same order
+        (time, priority, sequence), so the machines see the same request order and the model
+        is called in the same order as in the SimPy path.
+        """
+        self.events = []
+        self.sequence = 0
+        self.queues = {machine_id: deque() for machine_id in self.pools}
+        self.users = {machine_id: None for machine_id in self.pools}
+        waiting_preds = {}
+        # Reihenfolge der Prozesserzeugung im Simulator bestimmt die Reihenfolge der Initialize-Ereignisse
+        for operation in topological_order(self.schedule):
+            operation.machine = self.pools.get(operation.plan_machine_id)
+            waiting_preds[id(operation)] = len(operation.predecessor_operations)
+            self.schedule_event(0, URGENT, INIT, operation)
+
+        while self.events:
+            time, _, _, kind, operation = heapq.heappop(self.events)
+            if time >= until:
+                break
+            machine = operation.machine
+            if kind == INIT:
+                # all_of([]) ist sofort erfüllt
+                if not operation.predecessor_operations:
+                    self.schedule_event(time, NORMAL, CONDITION, operation)
+            elif kind == CONDITION:
+                plan_start = operation.plan_start if operation.plan_start is not None else 0
+                self.schedule_event(time + max(0, plan_start - time), NORMAL, DELAY, operation)
+            elif kind == DELAY:
+                self.logger.debug(f'{time}, job: {operation.job_id}, operation_id: {operation.operation_id}, getting resource')
+                self.queues[machine.id].append(operation)
+                self.trigger_put(machine, time)
+            elif kind == GRANT:
+                self.start(operation, machine, time)
+            elif kind == DONE:
+                # Release: Maschine freigeben, Warteschlange erst bei Verarbeitung des Release-Ereignisses bedienen
+                self.users[machine.id] = None
+                self.schedule_event(time, NORMAL, RELEASE, operation)
+                operation.sim_end = time
+                machine.current_operation = None
+                machine.history.append(operation)
+                self.logger.debug(f'{time}, job: {operation.job_id}, operation_id: {operation.operation_id}, finished operation')
+                self.schedule_event(time, NORMAL, PROCESS_END, operation)
+            elif kind == RELEASE:
+                self.trigger_put(machine, time)
+            elif kind == PROCESS_END:
+                successor = operation.successor_operation
+                if successor is not None:
+                    waiting_preds[id(successor)] -= 1
+                    if waiting_preds[id(successor)] == 0:
+                        self.schedule_event(time, NORMAL, CONDITION, successor)
+        return self.schedule
+
+    def schedule_event(self, time, priority, kind, operation):
+        heapq.heappush(self.events, (time, priority, self.sequence, kind, operation))
+        self.sequence += 1
+
+    def trigger_put(self, machine, time):
+        """
+        Grants a free machine to the oldest waiting request (FIFO).
+        """
+        queue = self.queues[machine.id]
+        if queue and self.users[machine.id] is None:
+            operation = queue.popleft()
+            self.users[machine.id] = operation
+            self.schedule_event(time, NORMAL, GRANT, operation)
+
+    def start(self, operation, machine, time):
+        operation.sim_start = time
+        machine.current_operation = operation
+        self.logger.debug(f'{time}, job: {operation.job_id}, operation_id: {operation.operation_id}, starting operation')
+        operation.sim_duration, influenced_variables = self.infer(operation, machine.current_tool)
+        self.observed_data.append(influenced_variables)
+        machine.current_tool = operation.tool
+        self.schedule_event(time + operation.sim_duration, NORMAL, DONE, operation)
+
+    def infer(self, operation, current_tool):
+        """Inference of the simulated duration, with random streams from the generator of the operation."""
+        if self.random_streams is None:
+            return self.model.inference(operation, current_tool, False)
+        random_state = self.random_streams.generator(operation.job_id, operation.operation_id)
+        return self.model.inference(operation, current_tool, False, random_state=random_state)
+
+    def write_data(self):
+        return self.observed_data.close()
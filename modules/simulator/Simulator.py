@@ -3,27 +3,33 @@ Simpy simulation for Causal Inferencing
 """
 from modules.factory.Machine import Machine
 from modules.simulator.Wrapper import patch_resource
+from modules.simulator.Dispatcher import GroupDispatcher
 from modules.simulator.Monitoring.BasicMonitor import monitorResource
 from models.abstract.model import Model
+from modules.observed_data import ObservedDataSink
 from modules.logger import Logger
 import logging
-import pandas as pd
 import simpy
 
 class Simulator:
-    def __init__(self, machines, schedule, monitor_data, model: Model, oberserved_data_path, planned_mode=True):
+    def __init__(self, machines, schedule, monitor_data, model: Model, oberserved_data_path, planned_mode=True, orders=None, on_job_finished=None, random_streams=None, feedback=None):
         """
         Args:
             machines: Array of machine configurations
             schedule: Array of operations
             monitor_data: Resource monitor data
             model: Model for inference
-            oberserved_data_path: Path for observed data output
+            oberserved_data_path: Path for observed data output (.csv, .parquet or .arrow, written in chunks)
             planned_mode: If True, uses planned starts and machines. If False, uses dynamic scheduling
+            orders: Optional stream of orders (OrderStream, GifflerThompson.plan_orders) released at their release time
+            on_job_finished: Callback for the operations of a finished order, else they are appended to schedule
+            random_streams: Optional RandomStreams, the model draws common random numbers per operation
+            feedback: Optional callback for each chunk of observed data (DataFrame), e.g. CausalLearningModel.update
         """
         self.schedule = schedule
         self.oberserved_data_path = oberserved_data_path
-        self.observed_data = []
+        # Beobachtete Variablen werden während des Laufs in Blöcken geschrieben
+        self.observed_data = ObservedDataSink(oberserved_data_path, on_flush=feedback)
         self.machines = machines
         self.model = model
         self.pre_resource_monitor = monitor_data[0]
@@ -32,7 +38,14 @@ class Simulator:
         self.pools = self.build_pools(machines)
         self.planned_mode = planned_mode
         self.machine_groups = self._group_machines_by_type()
+        self.dispatchers = {group: GroupDispatcher(machines) for group, machines in self.machine_groups.items()}
+        self.on_job_finished = on_job_finished
+        self.random_streams = random_streams
+        # Bei Auftragsströmen keine Historie, damit der Speicher nur mit den laufenden Aufträgen wächst
+        self.keep_history = orders is None
         self.build_jobs()
+        if orders is not None:
+            self.env.process(self.release_orders(orders))
         self.logger = Logger.get_logger(category="Simulation", level=logging.DEBUG, 
                                       log_to_file=False, log_filename="output/logs/simulation.log")
 
@@ -47,12 +60,11 @@ class Simulator:
 
     def get_next_available_machine(self, machine_group_id):
         """Find next available machine of required type"""
-        if machine_group_id not in self.machine_groups:
+        dispatcher = self.dispatchers.get(machine_group_id)
+        if dispatcher is None:
             return None
-        
-        machines = self.machine_groups[machine_group_id]
         # Return machine with shortest queue
-        return min(machines, key=lambda m: len(m.queue))
+        return dispatcher.next()
 
     def operation(self, operation, precedent_tasks):
         """Modified operation method to support both modes"""
@@ -82,7 +94,7 @@ class Simulator:
             operation.machine = machine  # Store the actually used machine
             self.logger.debug(f'{self.env.now}, job: {operation.job_id}, operation_id: {operation.operation_id}, starting operation')
             machine.current_operation = operation
-            operation.sim_duration, influenced_variables = self.model.inference(operation, machine.current_tool, False)
+            operation.sim_duration, influenced_variables = self.infer(operation, machine.current_tool)
             self.observed_data.append(influenced_variables)
             machine.current_tool = operation.tool
             
@@ -90,7 +102,8 @@ class Simulator:
             
         operation.sim_end = self.env.now
         operation.machine.current_operation = None
-        operation.machine.history.append(operation)
+        if self.keep_history:
+            operation.machine.history.append(operation)
         self.logger.debug(f'{self.env.now}, job: {operation.job_id}, operation_id: {operation.operation_id}, finished operation')
 
     def build_pools(self, pool_data):
@@ -106,51 +119,86 @@ class Simulator:
             for idx in range(0, pool[1]):
                 id = str(pool[0]) + '_' + str(idx)
                 pools[id] = Machine(id=id, group=str(pool[0]), tools=pool[2], env=self.env)
-                patch_resource(pools[id], post=self.post_resource_monitor)  # Patches (only) this resource instance
+                if self.pre_resource_monitor is not None or self.post_resource_monitor is not None:
+                    # Patches (only) this resource instance, without monitor no wrappers are installed
+                    patch_resource(pools[id], pre=self.pre_resource_monitor, post=self.post_resource_monitor)
         return pools
 
     def get_machine(self, plan_machine_id):
         """
         matches planed machine with simulation resource
         """
-        for m in self.pools:
-            if m == plan_machine_id:
-                return self.pools[m]
+        return self.pools.get(plan_machine_id)
 
-    def build_jobs(self):
+    def build_jobs(self, operations=None):
         """
-        creates operations for each end product 
+        creates exactly one process per operation in topological order,
+        the process event of an operation is used by all its successors
         """
-        operations_without_successor = [operation for operation in self.schedule if operation.successor == -1]
-        for op in operations_without_successor:
-            self.build_operations(op)
-
-    def build_operations(self, operation):
+        processes = {}
+        for operation in topological_order(self.schedule if operations is None else operations):
+            pred_operations = [processes[id(pred)] for pred in operation.predecessor_operations]
+            operation.machine = self.get_machine(operation.plan_machine_id)
+            processes[id(operation)] = self.env.process(self.operation(operation, pred_operations))
+        return processes
+
+    def release_orders(self, orders):
         """
-        recurse down the pressidents and work from the
-        leafs back creating operations, which are used as
-        pressident events for the parent node.
+        Pulls the orders lazily from the stream and starts their operations at the release time.
         """
+        for order in orders:
+            delay = order.release_time - self.env.now
+            if delay > 0:
+                yield self.env.timeout(delay)
+            processes = self.build_jobs(order.operations)
+            self.env.all_of(list(processes.values())).callbacks.append(
+                lambda _, operations=order.operations: self.finish_job(operations))
+
+    def finish_job(self, operations):
+        if self.on_job_finished is not None:
+            self.on_job_finished(operations)
+        else:
+            self.schedule.extend(operations)
 
-        pred_operations = []
-        # recurse the pressidents to get task processes that
-        # this node can use to wait on.
-        if len(operation.predecessor_operations) > 0:
-            for pred_node in operation.predecessor_operations:
-                pred_operations.append(self.build_operations(pred_node))
-
-        
-        operation.machine = self.get_machine(operation.plan_machine_id)
-
-        # create the task process
-        t = self.operation(operation, pred_operations)
-
-        # retrun the process to the parent, which the parent
-        # will wait on as a pressident
-        t = self.env.process(t)
-
-        return t
+    def infer(self, operation, current_tool):
+        """Inference of the simulated duration, with random streams from the generator of the operation."""
+        if self.random_streams is None:
+            return self.model.inference(operation, current_tool, False)
+        random_state = self.random_streams.generator(operation.job_id, operation.operation_id)
+        return self.model.inference(operation, current_tool, False, random_state=random_state)
 
     def write_data(self):
-        df_observed_data = pd.DataFrame(self.observed_data)
-        return df_observed_data.to_csv(self.oberserved_data_path)
+        return self.observed_data.close()
+
+
+def topological_order(schedule):
+    """
+    Iterative post-order walk from the operations without successor: predecessors before their successor,
+    each operation once. For trees this is the order of the former recursive build_operations.
+    Operations which are not reachable from an end product are appended in the same way.
+    """
+    order = []
+    done = set()
+    roots = [operation for operation in schedule if operation.successor == -1]
+    for root in roots + [operation for operation in schedule if operation.successor != -1]:
+        if id(root) in done:
+            continue
+        visiting = set()
+        stack = [(root, False)]
+        while stack:
+            operation, expanded = stack.pop()
+            if id(operation) in done:
+                continue
+            if expanded:
+                visiting.discard(id(operation))
+                done.add(id(operation))
+                order.append(operation)
+                continue
+            if id(operation) in visiting:
+                raise ValueError(f"Cyclic predecessors at operation {operation.job_id}_{operation.operation_id}")
+            visiting.add(id(operation))
+            stack.append((operation, True))
+            for pred in reversed(operation.predecessor_operations):
+                if id(pred) not in done:
+                    stack.append((pred, False))
+    return order
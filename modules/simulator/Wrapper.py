@@ -13,14 +13,14 @@ def patch_resource(resource, pre=None, post=None):
         def wrapper(*args, **kwargs):
             # This is the actual wrapper
             # Call "pre" callback
-            if pre:
+            if pre is not None:
                 pre(resource)
 
             # Perform actual operation
             ret = func(*args, **kwargs)
 
             # Call "post" callback
-            if post:
+            if post is not None:
                 post(resource)
 
             return ret
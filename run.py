@@ -1,9 +1,11 @@
 import os
 import random
-import concurrent.futures
 from tabulate import tabulate
 from modules.data_processing import ProductionGenerator
 from modules.simulation import run_simulation
+from modules.monte_carlo import monte_carlo
+from modules.random_streams import RandomStreams
+from modules.simulator.Monitoring.ColumnarMonitor import ColumnarMonitor
 from modules.metrics import calculate_schedule, calculate_throughput, compare_throughput, calculate_duration_deviation, print_comparison_table, extended_compare_all_schedules, extended_compare_schedules_pairwaise
 from models.implementations.truth_small import TruthSmallModel
 from models.implementations.causal_small import CausalSmallModel
@@ -31,6 +33,8 @@ from models.implementations.log_normal_distribution import LogNormalDistribution
 from modules.plan.GifflerThompson import GifflerThompson
 from modules.vizualisation import GanttSchedule
 from modules.logger import Logger
+from modules.experiment import ModelArtifacts, run_experiments, stage_timer
+from models.cache import get_cache
 import argparse
 import pandas as pd 
 import logging
@@ -61,16 +65,31 @@ def parse_arguments():
     parser.add_argument("--experiment_folder", type=str, default="./output/experiments", help="Path to experiment result data CSV.")
     parser.add_argument("--plots", type=str, default="./output/plots", help="Output path for Gantt plots.")
     parser.add_argument("--parallel", action="store_true", help="Uses parallel computing for experiments.")
+    parser.add_argument("--no_cache", action="store_true", help="Disable the on-disk cache for learned causal models.")
+    parser.add_argument("--monitor", type=str, default=None, help="Export resource monitor records to this folder (.npz per run); monitoring is disabled if not set.")
+    parser.add_argument("--replications", type=int, default=0, help="Monte Carlo replications of each plan (0: off), vectorized in planned mode.")
+    parser.add_argument("--crn", action="store_true", help="Common random numbers: all models draw the same random numbers per operation.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes for parallel experiments (default: CPU count).")
     return parser.parse_args()
 
 
-def run_experiment(seed, args):
+def build_artifacts(args):
+    """
+    Initializes the seed independent models once, they are shared by all experiment runs.
+    """
+    artifacts = ModelArtifacts()
+    artifacts.add('truth', TruthContinousSmallLogCopyModel())
+    return artifacts
+
+def run_experiment(seed, args, artifacts=None, timings=None, write_results=True):
     """
     Runs the experiment for a single seed.
+    Models available in artifacts are loaded instead of initialized, timings collects the duration of each stage.
     """
     logger.debug(f"Running experiment with seed: {seed}")
     args.seed = seed  # Update the seed for this run
     models = []
+    preloaded = set()
     try:
         #models.append(TruthContinousSmallLogLearnModel(seed=args.seed))
         #models.append(TruthContinousSmallTruncNormalLearnModel(seed=args.seed))
@@ -81,8 +100,13 @@ def run_experiment(seed, args):
         #models.append(TruthSmallModel(seed=args.seed, lognormal_shape_modifier=False))
         #models.append(TruthSmallModel(seed=args.seed, lognormal_shape_modifier=False))
         #models.append(TruthContinousModel(seed=args.seed, lognormal_shape_modifier=False))
-        models.append(TruthContinousSmallLogCopyModel(seed=args.seed))
-        models.append(TruthContinousSmallLogCopyModel(seed=args.seed))
+        if artifacts is not None and 'truth' in artifacts:
+            models.append(artifacts.load('truth', seed=args.seed))
+            models.append(artifacts.load('truth', seed=args.seed))
+            preloaded.update(id(model) for model in models)
+        else:
+            models.append(TruthContinousSmallLogCopyModel(seed=args.seed))
+            models.append(TruthContinousSmallLogCopyModel(seed=args.seed))
 
         #models.append(TruthContinousModel(seed=args.seed, lognormal_shape_modifier=False))
         #models.append(TruthModel(seed=args.seed))
@@ -116,9 +140,15 @@ def run_experiment(seed, args):
         
     schedules = {}
     planed_schedules = {}
+    # Gleiche Zufallszahlen je Operation für alle Modelle dieses Seeds
+    random_streams = RandomStreams(args.seed) if args.crn else None
 
     for model in models:
-        model.initialize()
+        with stage_timer(timings, 'initialize'):
+            if id(model) in preloaded:
+                model.seed_random(args.seed)
+            else:
+                model.initialize()
         model_name = type(model).__name__
 
         # Step 1: Generate data
@@ -136,8 +166,13 @@ def run_experiment(seed, args):
                         
                         
         # Generate static data
-        operations, machines = production.generate_data_static(num_instances = numb_instances #, seed=1) 
-                                                               , seed=args.seed)
+        # Die Tabelle trägt die Operationen von der Generierung bis zum Export, GT und Simulator planen auf den
+        # verknüpften Operation-Objekten in Tabellenreihenfolge
+        with stage_timer(timings, 'generate'):
+            operation_table, machines = production.generate_data_static(num_instances = numb_instances #, seed=1) 
+                                                                   , seed=args.seed, as_table=True)
+            operations = operation_table.to_operations()
+            row_index = {id(operation): i for i, operation in enumerate(operations)}
         
         # Generate dynamic data
         # Uncomment the following line to generate dynamic data instead of static data
@@ -164,11 +199,13 @@ def run_experiment(seed, args):
             if isinstance(model, TruthModel):
                 plan = GifflerThompson(rule_name=args.priority_rule, inference=basic_model.inference, do_calculus=False)
             if isinstance(model, CausalDoModel):
-                plan = GifflerThompson(rule_name=args.priority_rule, inference=model.inference, do_calculus=True)
+                plan = GifflerThompson(rule_name=args.priority_rule, inference=model.inference, do_calculus=True, random_streams=random_streams)
             else:
-                plan = GifflerThompson(rule_name=args.priority_rule, inference=model.inference, do_calculus=False)              
-        schedule = plan.create_schedule(operations, machines)
-        planed_schedules[model_name] = pd.DataFrame([op.to_dict() for op in schedule])
+                plan = GifflerThompson(rule_name=args.priority_rule, inference=model.inference, do_calculus=False, random_streams=random_streams)
+        with stage_timer(timings, 'plan'):
+            schedule = plan.create_schedule(operations, machines)
+        operation_table.update_from(operations)
+        planed_schedules[model_name] = operation_table.to_frame(rows=[row_index[id(operation)] for operation in schedule])
 
         schedule_results = None
 
@@ -184,25 +221,42 @@ def run_experiment(seed, args):
         #else:
         # Use the approach model to run the simulation
         model_feedback_path = os.path.join(os.path.dirname(observed_data_path), "data_observe_"+ model_name + f"_{args.seed}" + ".csv")
-        result = run_simulation(machines, operations, model, args.planned_mode, model_feedback_path)
-        schedule_results = pd.DataFrame([op.to_dict_sim() for op in result])
+        with stage_timer(timings, 'simulate'):
+            monitor = ColumnarMonitor() if args.monitor else None
+            result = run_simulation(machines, operations, model, args.planned_mode, model_feedback_path, monitor=monitor,
+                                    random_streams=random_streams)
+            if monitor is not None:
+                os.makedirs(args.monitor, exist_ok=True)
+                monitor.export(os.path.join(args.monitor, f"monitor_{model_name}_{args.seed}.npz"))
+            operation_table.update_from(operations)
+            schedule_results = operation_table.to_frame(sim=True, rows=[row_index[id(operation)] for operation in result])
+
+        if args.replications > 0:
+            with stage_timer(timings, 'monte_carlo'):
+                method = 'vectorized' if args.planned_mode else 'simulate'
+                monte_carlo_summary, _ = monte_carlo(schedule, machines, model, args.replications, seed=args.seed or 0,
+                                                     method=method, planned_mode=args.planned_mode, workers=args.workers,
+                                                     crn=args.crn)
+                monte_carlo_summary.to_csv(f"{args.result_data}/monte_carlo_{model_name}_{args.seed}.csv", index=False)
+                logger.debug(f"{model_name} | Monte Carlo\n{monte_carlo_summary.to_string()}")
             
 
         schedules[model_name] = schedule_results
 
         # Step 4: Save schedule data
         # TODO: Save the schedule data to a CSV file and find a good folder structure
-        production_schedule_path = f"{args.result_data}/schedule_{model_name}_{args.seed}.csv"
-        output_path = production.save_data(schedule_results, production_schedule_path)
+        with stage_timer(timings, 'evaluate'):
+            production_schedule_path = f"{args.result_data}/schedule_{model_name}_{args.seed}.csv"
+            output_path = production.save_data(schedule_results, production_schedule_path)
 
-        # Step 5: Calculate metrics
-        schuedule_duration = calculate_schedule(schedule_results)['schedule_makespan']
-        logger.debug(f"{model_name} | Schedule {schuedule_duration}")
-        #makespan_diff = compare_makespan(planed_schedules[TruthModel.__name__], schedules[model_name])
-        #logger.debug(f"{model_name} | Makespan (Approach) {makespan} | Makespan-Diff (vs Truth) {makespan_diff['makespan']}")
+            # Step 5: Calculate metrics
+            schuedule_duration = calculate_schedule(schedule_results)['schedule_makespan']
+            logger.debug(f"{model_name} | Schedule {schuedule_duration}")
+            #makespan_diff = compare_makespan(planed_schedules[TruthModel.__name__], schedules[model_name])
+            #logger.debug(f"{model_name} | Makespan (Approach) {makespan} | Makespan-Diff (vs Truth) {makespan_diff['makespan']}")
 
-        # Step 6: Create GanttCharts
-        viz_output_path = GanttSchedule.create(schedule_results, args.plots, model_name)
+            # Step 6: Create GanttCharts
+            viz_output_path = GanttSchedule.create(schedule_results, args.plots, model_name)
 
     # Perform evaluation
     if not args.planned_mode:
@@ -218,8 +272,9 @@ def run_experiment(seed, args):
         # Save results for this seed to the CSV file
         results_df = pd.DataFrame(results_run)
         logger.debug(f"results_df: {results_df}")
-        results_df.to_csv(args.experiment_result_data, mode='a', header=not file_exists, index=False)
-        logger.debug(f"Results for seed {args.seed} saved to {args.experiment_result_data}")
+        if write_results:
+            results_df.to_csv(args.experiment_result_data, mode='a', header=not file_exists, index=False)
+            logger.debug(f"Results for seed {args.seed} saved to {args.experiment_result_data}")
         return results_df
     
     if args.planned_mode:
@@ -233,11 +288,18 @@ def run_experiment(seed, args):
         file_exists = os.path.exists(args.experiment_result_data)  # Check if the file already exists
         planned_df = pd.DataFrame(planned_run)
         logger.debug(f"planned_df: {planned_df}")
-        planned_df.to_csv(args.experiment_result_data, mode='a', header=not file_exists, index=False)
-        logger.debug(f"Planned results for seed {args.seed} saved to {args.experiment_result_data}")
+        if write_results:
+            planned_df.to_csv(args.experiment_result_data, mode='a', header=not file_exists, index=False)
+            logger.debug(f"Planned results for seed {args.seed} saved to {args.experiment_result_data}")
         # Save the planned results to the CSV file
         return planned_df
 
+def configure_cache(args):
+    if args.no_cache:
+        # Auch für Worker-Prozesse, die die Module neu importieren
+        os.environ["PLANCAUSAL_CACHE"] = "0"
+        get_cache().enabled = False
+
 def create_folder_structure(args):
     # Generate a new file name with the current datetime in short format
     # Generate a timestamp for the experiment folder
@@ -262,6 +324,7 @@ def create_folder_structure(args):
 
 def main():
     args = parse_arguments()
+    configure_cache(args)
 
     # Create folder structure for the experiment
     args = create_folder_structure(args)
@@ -303,6 +366,7 @@ def main():
 
 def main_parallel():
     args = parse_arguments()
+    configure_cache(args)
     #TODO Build folders for parallel runs
     #timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     #args.experiment_result_data = args.experiment_result_data.replace(".csv", f"_{timestamp}.csv")
@@ -314,13 +378,10 @@ def main_parallel():
     if args.seed_iterator > 1:
         seed_end = args.seed + args.seed_iterator
         seed_range = range(args.seed, seed_end)
-        with concurrent.futures.ProcessPoolExecutor() as executor:
-            # Starte die Experimente parallel
-            futures = [executor.submit(run_experiment, seed, args) for seed in seed_range]
-            for future in concurrent.futures.as_completed(futures):
-                run_results = future.result()
-                if run_results is not None:
-                    results = pd.concat([results, run_results], ignore_index=True)
+        # Seed-unabhängige Modelle einmal aufbauen, die Worker laden sie nur
+        artifacts = build_artifacts(args)
+        # Die Ergebnisse schreibt nur der Hauptprozess
+        results, _ = run_experiments(run_experiment, seed_range, args, artifacts=artifacts, workers=args.workers, result_path=args.experiment_result_data)
         describe_table = results.groupby("Model").describe()
         results = describe_table.xs('mean', level=1, axis=1)
     else:
@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+from pgmpy.models import DiscreteBayesianNetwork
+from pgmpy.factors.discrete import TabularCPD
+from pgmpy.inference import VariableElimination
+from models.ancestral_sampler import AncestralSampler
+
+
+class TestAncestralSampler(unittest.TestCase):
+
+    def setUp(self):
+        # Struktur des TruthContinousModel
+        self.model = DiscreteBayesianNetwork([
+            ('last_tool_change', 'machine_state'),
+            ('machine_state', 'relative_processing_time_deviation'),
+            ('machine_state', 'cleaning'),
+            ('cleaning', 'relative_processing_time_deviation')
+        ])
+        self.model.add_cpds(
+            TabularCPD('last_tool_change', 2, [[0.5], [0.5]]),
+            TabularCPD('machine_state', 2, [[0.9, 0.4], [0.1, 0.6]], evidence=['last_tool_change'], evidence_card=[2]),
+            TabularCPD('cleaning', 2, [[0.95, 0.15], [0.05, 0.85]], evidence=['machine_state'], evidence_card=[2]),
+            TabularCPD('relative_processing_time_deviation', 3,
+                       [[0.08, 0.10, 0.02, 0.04], [0.60, 0.85, 0.31, 0.40], [0.32, 0.05, 0.67, 0.56]],
+                       evidence=['machine_state', 'cleaning'], evidence_card=[2, 2])
+        )
+        self.sampler = AncestralSampler(self.model)
+
+    def test_joint_distribution(self):
+        size = 200000
+        rng = np.random.default_rng(3)
+        evidence = {'last_tool_change': rng.random(size) < 0.3}
+        samples = self.sampler.sample_indices(size, evidence=evidence, random=rng.random)
+        self.assertEqual(self.sampler.order[0], 'last_tool_change')
+        np.testing.assert_array_equal(samples['last_tool_change'], evidence['last_tool_change'])
+
+        variables = ['machine_state', 'cleaning', 'relative_processing_time_deviation']
+        selected = samples['last_tool_change'] == 1
+        counts = np.zeros((2, 2, 3))
+        np.add.at(counts, tuple(samples[variable][selected] for variable in variables), 1)
+        joint = VariableElimination(self.model).query(variables, evidence={'last_tool_change': 1}, show_progress=False)
+        np.testing.assert_allclose(counts / counts.sum(), joint.values, atol=0.01)
+
+    def test_evidence_and_do(self):
+        samples = self.sampler.sample(1000, do={'cleaning': 1}, random=np.random.default_rng(0).random)
+        self.assertTrue(np.all(samples['cleaning'] == 1))
+        self.assertEqual(set(samples['relative_processing_time_deviation']) - {0, 1, 2}, set())
+        # Evidenz auf cleaning ohne Evidenz auf machine_state ist keine Konditionierung
+        with self.assertRaises(ValueError):
+            self.sampler.sample(10, evidence={'cleaning': 1})
+        with self.assertRaises(KeyError):
+            self.sampler.sample(10, evidence={'last_tool_change': 5})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import time
+import unittest
+import numpy as np
+import pandas as pd
+from pgmpy.estimators import HillClimbSearch
+from models.implementations.utils.BicCGScore import BicCGScore
+
+
+def reference_discrete(data, variable, parents):
+    N = len(data)
+    counts = data.groupby(parents + [variable]).size() if parents else data.groupby(variable).size()
+    if parents:
+        parent_counts = counts.groupby(level=list(range(len(parents)))).transform('sum')
+    else:
+        parent_counts = N
+    log_likelihood = np.sum(counts * np.log(counts / parent_counts))
+    configurations = len(data.groupby(parents)) if parents else 1
+    return log_likelihood - configurations * (data[variable].nunique() - 1) / 2 * np.log(N)
+
+
+def reference_continuous(data, variable, discrete_parents, continuous_parents):
+    N = len(data)
+    k = (len(continuous_parents) or 1) + 1
+    groups = [group for _, group in data.groupby(discrete_parents)] if discrete_parents else [data]
+    score = 0
+    for group in groups:
+        if discrete_parents and len(group) < 2:
+            continue
+        X = np.column_stack([np.ones(len(group))] + [group[p].to_numpy() for p in continuous_parents])
+        y = group[variable].to_numpy()
+        residuals = y - X @ np.linalg.lstsq(X, y, rcond=None)[0]
+        score += -0.5 * len(group) * (np.log(2 * np.pi) + np.log(np.mean(residuals ** 2)) + 1)
+        if discrete_parents:
+            score -= k / 2 * np.log(N)
+    return score
+
+
+class TestBicCGScore(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        N = 2000
+        self.data = pd.DataFrame({'a': rng.integers(0, 3, N), 'b': rng.integers(0, 2, N), 'c': rng.integers(0, 4, N)})
+        self.data['x'] = rng.normal(size=N) + self.data['a']
+        self.data['y'] = 2 * self.data['x'] + self.data['b'] + rng.normal(size=N)
+        self.score = BicCGScore(self.data, discrete_vars=['a', 'b', 'c'])
+
+    def test_matches_reference(self):
+        for variable, parents in [('a', []), ('a', ['b']), ('c', ['a', 'b'])]:
+            self.assertAlmostEqual(self.score.local_score(variable, parents),
+                                   reference_discrete(self.data, variable, parents), places=6)
+        for variable, discrete_parents, continuous_parents in [('x', [], []), ('x', ['a'], []), ('y', [], ['x']),
+                                                               ('y', ['a', 'b'], ['x'])]:
+            self.assertAlmostEqual(self.score.local_score(variable, discrete_parents + continuous_parents),
+                                   reference_continuous(self.data, variable, discrete_parents, continuous_parents),
+                                   places=6)
+
+    def test_cache(self):
+        score = self.score.local_score('y', ['a', 'x'])
+        self.assertEqual(self.score.local_score('y', ['x', 'a']), score)
+        self.assertEqual(len(self.score.cache), 1)
+
+        small = BicCGScore(self.data, discrete_vars=['a', 'b', 'c'], cache_size=2)
+        for parents in (['a'], ['b'], ['c'], ['a']):
+            small.local_score('x', parents)
+        self.assertEqual(list(small.cache), [('x', frozenset(['c'])), ('x', frozenset(['a']))])
+
+    def test_hill_climbing(self):
+        rng = np.random.default_rng(1)
+        N = 100000
+        last_tool_change = rng.integers(0, 2, N)
+        data = pd.DataFrame({
+            'last_tool_change': last_tool_change,
+            'relative_processing_time_deviation': rng.normal(1 + 0.3 * last_tool_change, 0.1),
+            'noise': rng.normal(size=N)
+        })
+        start = time.perf_counter()
+        model = HillClimbSearch(data).estimate(scoring_method=BicCGScore(data, discrete_vars=['last_tool_change']),
+                                               show_progress=False)
+        self.assertLess(time.perf_counter() - start, 30)
+        edges = {frozenset(edge) for edge in model.edges()}
+        self.assertIn(frozenset(('last_tool_change', 'relative_processing_time_deviation')), edges)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+from models.implementations.basic import BasicModel
+from modules.data_processing import ProductionGenerator
+from modules.plan.GifflerThompson import GifflerThompson
+from modules.simulation import run_simulation
+from modules.simulator.Simulator import Simulator
+from modules.simulator.Monitoring.ColumnarMonitor import ColumnarMonitor
+from working_directory import WorkingDirectoryTestCase
+
+
+class TestColumnarMonitor(WorkingDirectoryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.model = BasicModel()
+        self.model.initialize()
+
+    def simulate(self, monitor):
+        operations, machines = ProductionGenerator().generate_data_static(num_instances=20, seed=4)
+        GifflerThompson('dynamic', self.model.inference).create_schedule(operations, machines)
+        result = run_simulation(machines, operations, self.model, True, monitor=monitor)
+        return [(op.sim_start, op.sim_end) for op in result]
+
+    def test_records_match_basic_monitor(self):
+        full = ColumnarMonitor(capacity=16, ring=False)
+        ring = ColumnarMonitor(capacity=16)
+        sampled = ColumnarMonitor(sample_rate=0.25)
+        expected = self.simulate(None)
+        for monitor in (full, ring, sampled):
+            self.assertEqual(self.simulate(monitor), expected)
+
+        records = full.records()
+        self.assertEqual(len(full), full.calls)
+        self.assertGreater(len(full), 16)
+        self.assertTrue(np.all(np.diff(records['time']) >= 0))
+        # the ring buffer keeps the newest records in order
+        for name, column in ring.records().items():
+            np.testing.assert_array_equal(column, records[name][-16:])
+        np.testing.assert_array_equal(sampled.records()['time'], records['time'][3::4])
+
+        frame = full.to_frame()
+        self.assertTrue(set(frame['machine_id']) <= set(full.machine_ids))
+
+        path = full.export("monitor.npz")
+        with np.load(path) as data:
+            np.testing.assert_array_equal(data['queue'], records['queue'])
+        with self.assertRaises(ValueError):
+            full.export("monitor.txt")
+
+    def test_disabled_installs_no_wrappers(self):
+        operations, machines = ProductionGenerator().generate_data_static(num_instances=2, seed=1)
+        sim = Simulator(machines, operations, [None, None], self.model, None, planned_mode=False)
+        machine = next(iter(sim.pools.values()))
+        self.assertNotIn('request', vars(machine))
+        self.assertNotIn('release', vars(machine))
+
+
+if __name__ == '__main__':
+    unittest.main()
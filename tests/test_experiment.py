@@ -0,0 +1,83 @@
+import os
+import unittest
+import numpy as np
+import pandas as pd
+from types import SimpleNamespace
+from models.implementations.log_normal_distribution import LogNormalDistributionModel
+from modules.experiment import ModelArtifacts, run_experiments, stage_timer
+from modules.factory.Operation import Operation
+from working_directory import WorkingDirectoryTestCase
+
+OPERATIONS = [Operation(f'j{i}', 0, 0, 'T0', 20, None, 'A') for i in range(20)]
+
+
+def durations(model):
+    return [model.inference(operation, 'T0', False)[0] for operation in OPERATIONS]
+
+
+def run_seed(seed, args, artifacts=None, timings=None, write_results=True):
+    """Experiment of one seed: the durations of the loaded model, the process that ran it and write_results."""
+    with stage_timer(timings, 'plan'):
+        model = artifacts.load('model', seed=seed)
+        values = durations(model)
+    return pd.DataFrame({'seed': seed, 'duration': values, 'pid': os.getpid(), 'write_results': write_results,
+                         'runs': args.runs})
+
+
+class TestExperiment(WorkingDirectoryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        rng = np.random.default_rng(0)
+        pd.DataFrame({'product_type': 'A', 'operation_id': 0, 'duration': rng.lognormal(3, 0.2, 200)}).to_csv('durations.csv', index=False)
+        self.artifacts = ModelArtifacts()
+        self.artifacts.add('model', LogNormalDistributionModel(csv_file='durations.csv', seed=5))
+
+    def test_load(self):
+        self.assertIn('model', self.artifacts)
+        self.assertGreater(self.artifacts.timings['model'], 0)
+        model = self.artifacts.load('model', seed=7)
+        self.assertEqual(model.seed, 7)
+        first = durations(model)
+        # Jede Kopie startet mit zurückgesetztem Variate-Pool, wie ein neu initialisiertes Modell
+        copy = self.artifacts.load('model', seed=7)
+        self.assertIsNot(copy, model)
+        self.assertEqual(durations(copy), first)
+        initialized = LogNormalDistributionModel(csv_file='durations.csv', seed=7)
+        initialized.initialize()
+        self.assertEqual(durations(initialized), first)
+        self.assertNotEqual(durations(self.artifacts.load('model', seed=8)), first)
+
+    def test_two_workers(self):
+        seeds = [1, 2, 3, 4]
+        results, timings = run_experiments(run_seed, seeds, SimpleNamespace(runs=1), artifacts=self.artifacts,
+                                           workers=2, result_path='results.csv')
+        self.assertEqual(sorted(results['seed'].unique()), seeds)
+        self.assertEqual(len(results), len(seeds) * len(OPERATIONS))
+        self.assertFalse(results['write_results'].any())
+        self.assertNotIn(os.getpid(), set(results['pid']))
+        for seed in seeds:
+            self.assertEqual(results.loc[results['seed'] == seed, 'duration'].tolist(),
+                             durations(self.artifacts.load('model', seed=seed)))
+
+        # Die Ergebnisse schreibt nur dieser Prozess: eine Kopfzeile, alle Zeilen vollständig
+        written = pd.read_csv('results.csv')
+        self.assertEqual(len(written), len(results))
+        pd.testing.assert_frame_equal(written.sort_values(['seed', 'duration']).reset_index(drop=True),
+                                      results.sort_values(['seed', 'duration']).reset_index(drop=True), check_dtype=False)
+
+        written_timings = pd.read_csv('results_timings.csv')
+        self.assertEqual(sorted(written_timings['seed']), seeds)
+        self.assertEqual(set(written_timings.columns), {'seed', 'total', 'plan'})
+        self.assertTrue((written_timings['total'] >= written_timings['plan']).all())
+        self.assertEqual(len(timings), len(seeds))
+
+        # Weitere Läufe hängen an, ohne neue Kopfzeile
+        run_experiments(run_seed, [5], SimpleNamespace(runs=2), artifacts=self.artifacts, workers=2, result_path='results.csv')
+        written = pd.read_csv('results.csv')
+        self.assertEqual(len(written), (len(seeds) + 1) * len(OPERATIONS))
+        self.assertEqual(written['runs'].tolist().count(2), len(OPERATIONS))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from modules.data_processing import ProductionGenerator
+from modules.plan.GifflerThompson import GifflerThompson
+from test_ready_queue import tool_change_inference
+from working_directory import WorkingDirectoryTestCase
+
+
+class ScanGifflerThompson(GifflerThompson):
+    """Counts the planned operations by a scan over the schedule, as before the index of the start times."""
+    def count_planned_after(self, machine_group_id, time):
+        return len([op for op in self.schedule if machine_group_id == op.req_machine_group_id and time < op.plan_start])
+
+
+class TestPlannedStarts(WorkingDirectoryTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+    def qlength(self, planner_class, rule_name):
+        operations, machines = ProductionGenerator().generate_data_static(num_instances=150, seed=5)
+        planner = planner_class(rule_name, tool_change_inference, observed_data_path='plan.csv')
+        planner.create_schedule(operations, machines)
+        return planner.qlength
+
+    def test_count_planned_after(self):
+        for rule_name in ('dynamic', 'fcfs'):
+            with self.subTest(rule_name=rule_name):
+                qlength = self.qlength(GifflerThompson, rule_name)
+                self.assertEqual(len(qlength), 150)
+                self.assertEqual(qlength, self.qlength(ScanGifflerThompson, rule_name))
+        # FCFS plant Operationen auch vor bereits geplanten ein
+        self.assertTrue(any(qleng for _, _, qleng in qlength))
+
+
+if __name__ == '__main__':
+    unittest.main()
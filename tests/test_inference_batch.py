@@ -0,0 +1,106 @@
+import unittest
+import numpy as np
+import pandas as pd
+from models.abstract.model import Model
+from models.cache import LearningCache, set_cache
+from models.implementations.basic import BasicModel
+from models.implementations.causal import CausalModel
+from models.implementations.causal_small import CausalSmallModel
+from models.implementations.causal_do import CausalDoModel
+from models.implementations.causal_continious import CausalContinousModel
+from models.implementations.causal_continious_small import CausalContinousSmallModel
+from models.implementations.causal_continious_small_log_copy import CausalContinousSmallLogCopyModel
+from models.implementations.causal_continious_small_log_learn import CausalContinousSmallLogLearnModel
+from models.implementations.causal_continious_small_trunc_learn import CausalContinousSmallTruncNormalLearnModel
+from models.implementations.truth_continous_small_log_copy import TruthContinousSmallLogCopyModel
+from modules.factory.Operation import Operation
+from modules.random_streams import RandomStreams
+from test_pgmpy_posterior_cache import FourNodeModel
+from working_directory import WorkingDirectoryTestCase
+
+
+class TestInferenceBatch(WorkingDirectoryTestCase):
+    """
+    inference_batch() with one generator per operation gives the same durations and variables as inference()
+    per operation with the same generators.
+    """
+
+    def setUp(self):
+        super().setUp()
+        set_cache(LearningCache(enabled=False))
+        self.truth = FourNodeModel()
+        self.truth.initialize()
+        self.small_truth = TruthContinousSmallLogCopyModel(seed=1)
+        self.small_truth.initialize()
+
+        # Beobachtete Daten aus dem Wahrheitsmodell, die Abweichung als Zustand 0, 1, 2 und stetig
+        np.random.seed(0)
+        data = pd.DataFrame({variable: states.astype(int) for variable, states in self.truth.forward_sample(2000).items()})
+        data['last_tool_change'] = data['last_tool_change'].astype(bool)
+        data.to_csv('discrete.csv')
+        data['relative_processing_time_deviation'] = np.array([0.9, 1.0, 1.2])[data['relative_processing_time_deviation']] + np.random.normal(0, 0.05, len(data))
+        data.to_csv('continuous.csv')
+        rng = np.random.default_rng(0)
+        pd.DataFrame({'last_tool_change': rng.random(1000) < 0.4,
+                      'relative_processing_time_deviation': rng.lognormal(0, 0.1, 1000)}).to_csv('small.csv')
+
+        self.operations = [Operation(f'j{i}', i % 3, 0, f'T{i % 2}', 10 + i, None, 'p') for i in range(40)]
+        self.tools = ['T0' if i % 3 else operation.tool for i, operation in enumerate(self.operations)]
+
+    def tearDown(self):
+        set_cache(None)
+
+    def assert_batch_matches_inference(self, model, do_calculus=False):
+        streams = RandomStreams(3)
+        rows = [model.inference(operation, tool, do_calculus, random_state=random_state)
+                for operation, tool, random_state in zip(self.operations, self.tools, streams.generators(self.operations))]
+        durations, variables = model.inference_batch(self.operations, self.tools, do_calculus, streams.generators(self.operations))
+        np.testing.assert_array_equal(durations, [duration for duration, _ in rows])
+        expected = Model.to_columns([row for _, row in rows])
+        self.assertEqual(set(variables), set(expected))
+        for name in expected:
+            np.testing.assert_array_equal(variables[name], expected[name])
+
+    def test_discrete_models(self):
+        for model_class in (CausalModel, CausalSmallModel, CausalDoModel):
+            model = model_class(csv_file='discrete.csv', truth_model=self.truth)
+            model.initialize()
+            for do_calculus in (False, True):
+                with self.subTest(model=model_class.__name__, do_calculus=do_calculus):
+                    self.assert_batch_matches_inference(model, do_calculus)
+
+    def test_continuous_models(self):
+        model = CausalContinousModel(csv_file='continuous.csv', truth_model=self.truth)
+        model.initialize()
+        self.assert_batch_matches_inference(model)
+        self.assert_batch_matches_inference(self.small_truth)
+        for model_class in (CausalContinousSmallLogCopyModel, CausalContinousSmallLogLearnModel, CausalContinousSmallTruncNormalLearnModel):
+            with self.subTest(model=model_class.__name__):
+                model = model_class(csv_file='small.csv', truth_model=self.small_truth)
+                model.initialize()
+                self.assert_batch_matches_inference(model)
+        model = CausalContinousSmallModel(seed=0, csv_file='small.csv', truth_model=self.small_truth)
+        model.initialize()
+        self.assert_batch_matches_inference(model)
+
+    def test_missing_distribution(self):
+        model = CausalContinousSmallLogLearnModel(csv_file='small.csv', truth_model=self.small_truth)
+        model.initialize()
+        # Ohne gelernte Verteilung werden die Zustände des Netzes gezogen, im Batch wie je Operation
+        model.distributions = {}
+        self.assert_batch_matches_inference(model)
+        # Ohne Zustand im Netz bleibt die geplante Dauer
+        model.sample = lambda evidence: {}
+        duration, variables = model.inference(self.operations[0], self.tools[0], False)
+        self.assertEqual(duration, self.operations[0].duration)
+        self.assertEqual(variables['relative_processing_time_deviation'], 1.0)
+
+    def test_basic_model(self):
+        model = BasicModel()
+        model.initialize()
+        self.assert_batch_matches_inference(model)
+        self.assertEqual(model.inference_batch(self.operations, self.tools, False)[1], {})
+
+
+if __name__ == '__main__':
+    unittest.main()
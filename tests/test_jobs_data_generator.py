@@ -0,0 +1,51 @@
+import random
+import unittest
+import numpy as np
+from modules.data_processing import ProductionGenerator
+from modules.factory.Operation import Operation
+from modules.factory.OperationTable import OperationTable
+from modules.generators.jobs_data_generator import JobsDataGenerator
+
+TEMPLATE = [
+    ['p1', 1, 'a1', 1, 20, 2],
+    ['p1', 2, 'a3', 1, 10, -1],
+    ['p2', 1, 'a2', 1, 20, 3],
+    ['p2', 2, 'a3', 2, 10, 3],
+    ['p2', 3, 'a1', 2, 5, -1],
+]
+RELATION = {'p1': 0.3, 'p2': 0.7}
+
+
+class TestJobsDataGenerator(unittest.TestCase):
+
+    def test_same_jobs_as_one_draw_per_instance(self):
+        random.seed(5)
+        expected = []
+        for i in range(3, 3 + 200):
+            product_type = random.choices(list(RELATION), weights=list(RELATION.values()))[0]
+            expected += [[f'job{i}', *row[1:], product_type] for row in TEMPLATE if row[0] == product_type]
+        random.seed(5)
+        self.assertEqual(JobsDataGenerator(TEMPLATE).generate_jobs_data(200, RELATION), expected)
+
+    def test_table_matches_operations(self):
+        random.seed(5)
+        operations = [Operation(*row) for row in JobsDataGenerator(TEMPLATE).generate_jobs_data(200, RELATION)]
+        random.seed(5)
+        table = JobsDataGenerator(TEMPLATE).generate_jobs_table(200, RELATION)
+        expected = OperationTable.from_operations(operations)
+        self.assertEqual(table.categories, expected.categories)
+        for column in expected.data.dtype.names:
+            np.testing.assert_array_equal(table.data[column], expected.data[column])
+        np.testing.assert_array_equal(table.pred_offsets, expected.pred_offsets)
+        np.testing.assert_array_equal(table.pred_indices, expected.pred_indices)
+
+    def test_static_data_as_table(self):
+        operations, machines = ProductionGenerator().generate_data_static(num_instances=50, seed=2)
+        table, table_machines = ProductionGenerator().generate_data_static(num_instances=50, seed=2, as_table=True)
+        self.assertEqual(table_machines, machines)
+        self.assertEqual([(view.job_id, view.operation_id, view.product_type) for view in table],
+                         [(operation.job_id, operation.operation_id, operation.product_type) for operation in operations])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+import networkx as nx
+from types import SimpleNamespace
+from models.cache import LearningCache, cached_learning, set_cache
+
+
+class LearningModel:
+    """
+    Minimal stand-in with the attributes the causal models use for the cache key.
+    """
+    def __init__(self, data):
+        self.data = data
+        self.structure_learning_lib = 'pgmpy'
+        self.structure_learning_method = 'HillClimbSearch'
+        self.estimator = 'BDeu'
+        self.kwargs = {}
+        self.edges = []
+        self.calls = 0
+        self.logger = LearningCache().logger
+
+    @cached_learning(attributes=('edges',))
+    def learn_causal_model(self):
+        self.calls += 1
+        self.edges = [('last_tool_change', 'relative_processing_time_deviation')]
+        return 'model'
+
+
+class TestLearningCache(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache = LearningCache(directory=self.folder.name, max_size_mb=1)
+        set_cache(self.cache)
+        self.data = pd.DataFrame({'last_tool_change': [0, 1, 1], 'relative_processing_time_deviation': [0.9, 1.2, 1.0]})
+
+    def tearDown(self):
+        set_cache(None)
+        self.folder.cleanup()
+
+    def test_repeat_learning_uses_cache(self):
+        first = LearningModel(self.data)
+        self.assertEqual(first.learn_causal_model(), 'model')
+        second = LearningModel(self.data.copy())
+        self.assertEqual(second.learn_causal_model(), 'model')
+        self.assertEqual(second.calls, 0)
+        self.assertEqual(second.edges, first.edges)
+
+    def test_changed_data_or_settings_miss(self):
+        LearningModel(self.data).learn_causal_model()
+        changed = LearningModel(self.data.assign(last_tool_change=[1, 1, 1]))
+        changed.learn_causal_model()
+        self.assertEqual(changed.calls, 1)
+        other_method = LearningModel(self.data)
+        other_method.structure_learning_method = 'ExhaustiveSearch'
+        other_method.learn_causal_model()
+        self.assertEqual(other_method.calls, 1)
+
+    def test_changed_code_or_libraries_miss(self):
+        LearningModel(self.data).learn_causal_model()
+
+        class ChangedModel(LearningModel):
+            @cached_learning(attributes=('edges',))
+            def learn_causal_model(self):
+                self.calls += 1
+                self.edges = []
+                return 'changed model'
+        # Gleicher Klassen- und Methodenname, aber anderer Code
+        ChangedModel.__name__ = 'LearningModel'
+        changed = ChangedModel(self.data)
+        self.assertEqual(changed.learn_causal_model(), 'changed model')
+        self.assertEqual(changed.calls, 1)
+
+        with mock.patch('models.cache.library_versions', return_value=(('pgmpy', '0.0'), ('gcastle', None))):
+            upgraded = LearningModel(self.data)
+            upgraded.learn_causal_model()
+        self.assertEqual(upgraded.calls, 1)
+        cached = LearningModel(self.data)
+        cached.learn_causal_model()
+        self.assertEqual(cached.calls, 0)
+
+    def test_truth_model_of_portfolio(self):
+        def portfolio_model(truth_edges):
+            model = LearningModel(self.data)
+            model.structure_learning_lib = 'portfolio'
+            model.truth_model = SimpleNamespace(model=nx.DiGraph(truth_edges))
+            model.learn_causal_model()
+            return model
+
+        portfolio_model([('last_tool_change', 'relative_processing_time_deviation')])
+        self.assertEqual(portfolio_model([('last_tool_change', 'relative_processing_time_deviation')]).calls, 0)
+        # Das Portfolio wählt nach dem SHD zur Wahrheit, eine andere Wahrheit darf den Eintrag nicht nutzen
+        self.assertEqual(portfolio_model([('relative_processing_time_deviation', 'last_tool_change')]).calls, 1)
+
+    def test_disabled_cache(self):
+        self.cache.enabled = False
+        LearningModel(self.data).learn_causal_model()
+        model = LearningModel(self.data)
+        model.learn_causal_model()
+        self.assertEqual(model.calls, 1)
+        self.assertEqual(os.listdir(self.folder.name), [])
+
+    def test_eviction_keeps_size_limit(self):
+        self.cache.max_size = 3000
+        for i in range(10):
+            self.cache.put(self.cache.key(i), b'x' * 1000)
+        size = sum(os.path.getsize(os.path.join(self.folder.name, name)) for name in os.listdir(self.folder.name))
+        self.assertLessEqual(size, 3000)
+        self.assertTrue(self.cache.get(self.cache.key(9))[0])
+        self.assertFalse(self.cache.get(self.cache.key(0))[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
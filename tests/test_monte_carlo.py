@@ -0,0 +1,86 @@
+import pickle
+import random
+import unittest
+import numpy as np
+import pandas as pd
+from models.implementations.basic import BasicModel
+from models.implementations.log_normal_distribution import LogNormalDistributionModel
+from models.implementations.truth_continous_small_log_copy import TruthContinousSmallLogCopyModel
+from modules.data_processing import ProductionGenerator
+from modules.factory.OperationTable import OperationTable
+from modules.metrics import calculate_schedule
+from modules.monte_carlo import monte_carlo
+from modules.plan.GifflerThompson import GifflerThompson
+from modules.simulation import run_simulation
+from working_directory import WorkingDirectoryTestCase
+
+
+class TestMonteCarlo(WorkingDirectoryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        operations, self.machines = ProductionGenerator().generate_data_static(num_instances=40, seed=2)
+        self.model = BasicModel()
+        self.model.initialize()
+        self.schedule = GifflerThompson('dynamic', self.model.inference).create_schedule(operations, self.machines)
+
+    def test_deterministic_model_matches_simulation(self):
+        result = run_simulation(self.machines, OperationTable.from_operations(self.schedule).to_operations(), self.model, True)
+        makespan = calculate_schedule(OperationTable.from_operations(result).to_frame(sim=True))['schedule_makespan']
+        for method in ('vectorized', 'simulate'):
+            summary, samples = monte_carlo(self.schedule, self.machines, self.model, 3, method=method, workers=1)
+            self.assertEqual(samples['makespan'].tolist(), [makespan] * 3)
+            self.assertEqual(summary.set_index('metric').loc['makespan', 'q0.5'], makespan)
+
+    def test_vectorized_replications(self):
+        model = TruthContinousSmallLogCopyModel(seed=1)
+        model.initialize()
+        random.seed(9)
+        np.random.seed(9)
+        state = np.random.get_state()[1].copy()
+        summary, samples = monte_carlo(self.schedule, self.machines, model, 200, seed=4)
+        # Die globalen Zufallsgeneratoren und der Seed des Modells bleiben unverändert
+        np.testing.assert_array_equal(np.random.get_state()[1], state)
+        self.assertEqual(model.seed, 1)
+        pd.testing.assert_frame_equal(monte_carlo(self.schedule, self.machines, model, 200, seed=4)[1], samples)
+        self.assertEqual(len(samples), 200)
+        self.assertGreater(samples['makespan'].std(), 0)
+        summary = summary.set_index('metric')
+        for metric in ('makespan', 'throughput'):
+            row = summary.loc[metric]
+            self.assertTrue(row['ci_low'] < row['mean'] < row['ci_high'])
+            self.assertTrue(row['q0.05'] <= row['q0.5'] <= row['q0.95'])
+        with self.assertRaises(ValueError):
+            monte_carlo(self.schedule, self.machines, model, 10, planned_mode=False)
+
+    def test_model_and_random_state_unchanged(self):
+        rng = np.random.default_rng(0)
+        pd.DataFrame([{'product_type': f'p{p}', 'operation_id': operation_id, 'duration': duration}
+                      for p in range(1, 5) for operation_id in (1, 2) for duration in rng.lognormal(3 - operation_id / 2, 0.2, 50)]
+                     ).to_csv('durations.csv', index=False)
+        model = LogNormalDistributionModel(csv_file='durations.csv', seed=3)
+        model.initialize()
+        tools = [None] * len(self.schedule)
+        model.inference_batch(self.schedule, tools, False)
+        copy = pickle.loads(pickle.dumps(model))
+        random.seed(9)
+        np.random.seed(9)
+        python_state, numpy_state = random.getstate(), np.random.get_state()[1].copy()
+
+        samples = {method: monte_carlo(self.schedule, self.machines, model, 20, seed=4, method=method, workers=1)[1]
+                   for method in ('vectorized', 'simulate')}
+        self.assertEqual(random.getstate(), python_state)
+        np.testing.assert_array_equal(np.random.get_state()[1], numpy_state)
+        self.assertEqual(model.seed, 3)
+        # Der Variate-Pool zieht danach dieselben Werte wie eine vorher gemachte Kopie
+        np.testing.assert_array_equal(model.inference_batch(self.schedule, tools, False)[0],
+                                      copy.inference_batch(self.schedule, tools, False)[0])
+        # Gemeinsame Zufallszahlen: die Replikationen hängen nicht vom Zustand des Modells ab
+        pd.testing.assert_frame_equal(monte_carlo(self.schedule, self.machines, copy, 20, seed=4)[1], samples['vectorized'])
+        pd.testing.assert_frame_equal(monte_carlo(self.schedule, self.machines, copy, 20, seed=4, method='simulate', workers=1, crn=True)[1],
+                                      monte_carlo(self.schedule, self.machines, model, 20, seed=4, method='simulate', workers=1, crn=True)[1])
+        self.assertGreater(samples['vectorized']['makespan'].std(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
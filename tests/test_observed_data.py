@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from modules.observed_data import ObservedDataSink
+from modules.plan.GifflerThompson import GifflerThompson
+from models.implementations.basic import BasicModel
+
+
+class TestObservedDataSink(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.records = [{'last_tool_change': i % 3 == 0, 'relative_processing_time_deviation': i / 7} for i in range(25)]
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write(self, name, records, chunk_size=4):
+        sink = ObservedDataSink(os.path.join(self.folder.name, name), chunk_size=chunk_size)
+        for record in records:
+            sink.append(record)
+            self.assertLessEqual(len(sink.buffer), chunk_size)
+        return sink.close()
+
+    def test_csv_matches_dataframe_to_csv(self):
+        expected = os.path.join(self.folder.name, "expected.csv")
+        for records in (self.records, [None] * 5, []):
+            pd.DataFrame(records).to_csv(expected)
+            with open(self.write("observed.csv", records)) as file, open(expected) as expected_file:
+                self.assertEqual(file.read(), expected_file.read())
+
+    def test_arrow_formats(self):
+        expected = pd.DataFrame(self.records)
+        pd.testing.assert_frame_equal(pd.read_parquet(self.write("observed.parquet", self.records)), expected)
+        pd.testing.assert_frame_equal(pd.read_feather(self.write("observed.arrow", self.records)), expected)
+        with self.assertRaises(ValueError):
+            self.write("observed.parquet", self.records + [{'last_tool_change': 'x', 'relative_processing_time_deviation': 'y'}] * 4)
+        with self.assertRaises(ValueError):
+            ObservedDataSink("observed.txt")
+
+    def test_on_flush(self):
+        chunks = []
+        sink = ObservedDataSink(chunk_size=10, on_flush=chunks.append)
+        for record in self.records:
+            sink.append(record)
+        sink.close()
+        self.assertEqual([len(chunk) for chunk in chunks], [10, 10, 5])
+        pd.testing.assert_frame_equal(pd.concat(chunks), pd.DataFrame(self.records))
+
+    def test_gifflerthompson_default_path_per_process(self):
+        plan = GifflerThompson('dynamic', BasicModel().inference)
+        self.assertTrue(plan.observed_data_path.endswith(f"BasicModel.inference_{os.getpid()}.csv"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import os
+import unittest
+import numpy as np
+import pandas as pd
+from pgmpy.models import DiscreteBayesianNetwork
+from pgmpy.estimators import BayesianEstimator
+from models.cache import LearningCache, set_cache
+from models.implementations.causal_small import CausalSmallModel
+from sklearn.mixture import GaussianMixture
+from models.sufficient_statistics import CPDCounts, GroupMoments, fit_distributions, grouped_moments
+from working_directory import WorkingDirectoryTestCase
+
+
+def observed_data(rng, N, p_machine_state):
+    last_tool_change = rng.random(N) < 0.5
+    machine_state = np.where(last_tool_change, rng.random(N) < p_machine_state[0], rng.random(N) < p_machine_state[1])
+    return pd.DataFrame({'last_tool_change': last_tool_change, 'machine_state': machine_state,
+                         'relative_processing_time_deviation': rng.normal(1 + 0.3 * machine_state, 0.1)})
+
+
+class TestSufficientStatistics(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.data = observed_data(rng, 3000, (0.7, 0.2))
+        self.batches = [self.data.iloc[:2000], self.data.iloc[2000:2600], self.data.iloc[2600:]]
+
+    def test_cpd_counts_match_refit(self):
+        edges = [('last_tool_change', 'machine_state')]
+        for prior_type in ('BDeu', 'K2'):
+            model = DiscreteBayesianNetwork(edges)
+            model.fit(self.batches[0], estimator=BayesianEstimator, prior_type=prior_type)
+            counts = CPDCounts(model, ['last_tool_change', 'machine_state'], prior_type=prior_type)
+            for batch in self.batches:
+                counts.update(batch)
+            expected = DiscreteBayesianNetwork(edges)
+            expected.fit(self.data, estimator=BayesianEstimator, prior_type=prior_type)
+            for cpd in counts.cpds():
+                self.assertEqual(cpd, expected.get_cpds(cpd.variable))
+            self.assertAlmostEqual(counts.counted_log_likelihood(), counts.log_likelihood(self.data))
+        with self.assertRaises(ValueError):
+            CPDCounts(model, ['last_tool_change'], prior_type='dirichlet')
+
+    def test_group_moments_match_full_data(self):
+        moments = GroupMoments('relative_processing_time_deviation', ['machine_state'])
+        for batch in self.batches:
+            moments.update(batch)
+        for machine_state, group in self.data.groupby('machine_state'):
+            values = group['relative_processing_time_deviation']
+            result = moments.get((machine_state,))
+            self.assertEqual(result['count'], len(values))
+            self.assertAlmostEqual(result['mean'], values.mean())
+            self.assertAlmostEqual(result['variance'], values.var(ddof=0))
+            self.assertEqual((result['min'], result['max']), (values.min(), values.max()))
+
+    def test_fit_distributions(self):
+        target, parents = 'relative_processing_time_deviation', ['last_tool_change', 'machine_state']
+        gaussian = fit_distributions(self.data, target, parents)
+        truncnorm = fit_distributions(self.data, target, parents, 'truncnorm')
+        lognormal = fit_distributions(self.data, target, parents, 'lognormal')
+        self.assertEqual(len(gaussian), 4)
+        for configuration, group in self.data.groupby(parents):
+            values = group[target]
+            gmm = GaussianMixture(n_components=1, random_state=42).fit(group[[target]])
+            self.assertAlmostEqual(gaussian[configuration]['mean'], gmm.means_[0, 0])
+            self.assertAlmostEqual(gaussian[configuration]['variance'], gmm.covariances_[0, 0, 0])
+            self.assertAlmostEqual(truncnorm[configuration]['a'], (values.min() - values.mean()) / values.std(ddof=0))
+            self.assertAlmostEqual(lognormal[configuration]['sigma'], np.log(values).std(ddof=0))
+
+        moments = grouped_moments(self.data, [target, 'machine_state'], [])
+        self.assertEqual(moments['machine_state'][()]['mean'], self.data['machine_state'].mean())
+        mixture = fit_distributions(self.data, target, [], n_components=2)
+        self.assertEqual(len(mixture[()]['weights']), 2)
+        with self.assertRaises(ValueError):
+            fit_distributions(self.data, target, [], 'truncnorm', n_components=2)
+
+
+class TestOnlineLearning(WorkingDirectoryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        set_cache(LearningCache(directory=os.path.join(self.folder.name, "cache")))
+        self.rng = np.random.default_rng(1)
+        data = observed_data(self.rng, 3000, (0.7, 0.2))
+        data['relative_processing_time_deviation'] = np.where(data['machine_state'], 1.2, 1.0)
+        data.to_csv('observed.csv')
+        self.model = CausalSmallModel('observed.csv')
+        self.model.initialize()
+
+    def tearDown(self):
+        set_cache(None)
+
+    def test_update_without_drift(self):
+        edges = set(self.model.edges)
+        observations = observed_data(self.rng, 500, (0.7, 0.2))
+        observations['relative_processing_time_deviation'] = np.where(observations['machine_state'], 1.2, 1.0)
+        self.assertFalse(self.model.update(observations))
+        self.assertEqual(set(self.model.edges), edges)
+        self.assertEqual(len(self.model.data), 3500)
+        # Der Vergleichswert folgt den aktualisierten CPDs
+        self.assertAlmostEqual(self.model.baseline_log_likelihood, self.model.cpd_counts.log_likelihood(self.model.data))
+
+        expected = DiscreteBayesianNetwork(self.model.edges)
+        expected.fit(self.model.data, estimator=BayesianEstimator, prior_type='BDeu')
+        for cpd in expected.get_cpds():
+            self.assertEqual(self.model.model.get_cpds(cpd.variable), cpd)
+        # Die kompilierten Posterioren folgen den neuen CPDs
+        posterior = self.model.sample(evidence={'last_tool_change': True})
+        queried = self.model.query_posteriors(evidence={'last_tool_change': True})
+        np.testing.assert_allclose(posterior['machine_state'].values, queried['machine_state'].values)
+
+    def test_update_with_drift(self):
+        # Die Abweichung hängt nicht mehr vom Maschinenzustand ab
+        observations = observed_data(self.rng, 6000, (0.7, 0.2))
+        observations['relative_processing_time_deviation'] = np.where(observations['last_tool_change'], 1.0, 1.2)
+        self.assertTrue(self.model.update(observations))
+        self.assertIn(('last_tool_change', 'relative_processing_time_deviation'),
+                      {tuple(sorted(edge)) for edge in self.model.edges})
+        self.assertAlmostEqual(self.model.baseline_log_likelihood, self.model.cpd_counts.log_likelihood(self.model.data))
+
+    def test_data_window(self):
+        self.model.data_window = 3200
+        observations = observed_data(self.rng, 500, (0.7, 0.2))
+        observations['relative_processing_time_deviation'] = np.where(observations['machine_state'], 1.2, 1.0)
+        self.assertFalse(self.model.update(observations))
+        # Die Zählungen enthalten alle Beobachtungen, self.data nur die letzten
+        self.assertEqual(len(self.model.data), 3200)
+        pd.testing.assert_frame_equal(self.model.data.tail(500).reset_index(drop=True),
+                                      observations.astype(self.model.data.dtypes.to_dict()).reset_index(drop=True))
+        self.assertEqual(self.model.cpd_counts.counts['last_tool_change'].sum(), 3500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+import pandas as pd
+from modules.factory.Operation import Operation
+from modules.factory.OperationTable import OperationTable
+
+
+class TestOperationTable(unittest.TestCase):
+
+    def setUp(self):
+        self.operations = [
+            Operation('j1', 1, 'a1', 1, 20, 3, 'p1'),
+            Operation('j1', 2, 'a2', 2, 20, 3, 'p1'),
+            Operation('j1', 3, 'a3', 1, 10, -1, 'p1'),
+            Operation('j2', 1, 'a1', 2, 15, -1, 'p2'),
+        ]
+        self.operations[0].plan_machine_id = 'a1_0'
+        self.operations[0].plan_start = 0
+        self.operations[0].plan_end = 20.0
+        self.table = OperationTable.from_operations(self.operations)
+
+    def test_links(self):
+        self.assertEqual(self.table.data['successor_index'].tolist(), [2, 2, -1, -1])
+        self.assertEqual(self.table.predecessor_indices(2).tolist(), [0, 1])
+        self.assertEqual(len(self.table.predecessor_indices(0)), 0)
+
+    def test_frame_matches_operation_dicts(self):
+        expected = pd.DataFrame([operation.to_dict() for operation in self.operations])
+        pd.testing.assert_frame_equal(self.table.to_frame(), expected, check_dtype=False)
+        expected = pd.DataFrame([operation.to_dict_sim() for operation in self.operations])
+        # Missing simulation times are NaN in the table
+        expected[['start_time', 'duration', 'end_time']] = expected[['start_time', 'duration', 'end_time']].astype(float)
+        pd.testing.assert_frame_equal(self.table.to_frame(sim=True), expected, check_dtype=False)
+
+    def test_view_reads_and_writes_table(self):
+        view = self.table[1]
+        self.assertEqual((view.job_id, view.operation_id, view.req_machine_group_id, view.tool), ('j1', 2, 'a2', 2))
+        self.assertIsNone(view.plan_start)
+        self.assertEqual(view.successor_operation, self.table[2])
+        view.plan_machine_id = 'a2_1'
+        view.plan_start = 5
+        self.assertEqual(self.table.data['plan_start'][1], 5.0)
+        self.assertEqual(self.table.column('plan_machine')[1], 'a2_1')
+        self.assertTrue(np.isnan(self.table.data['plan_start'][2]))
+
+    def test_to_operations(self):
+        operations = self.table.to_operations()
+        self.assertIs(operations[0].successor_operation, operations[2])
+        self.assertEqual([operation.operation_id for operation in operations[2].predecessor_operations], [1, 2])
+        self.assertEqual(operations[0].plan_machine_id, 'a1_0')
+
+    def test_update_and_frame_in_row_order(self):
+        # Planen auf den Objekten der Tabelle und in Planungsreihenfolge exportieren, ohne neue Tabelle
+        operations = self.table.to_operations()
+        for start, operation in zip([30, 0, 10], operations[1:]):
+            operation.plan_machine_id = str(operation.req_machine_group_id) + '_0'
+            operation.plan_start, operation.plan_end = start, start + operation.duration
+        self.table.update_from(operations)
+        order = [0, 2, 3, 1]
+        expected = pd.DataFrame([operations[i].to_dict() for i in order])
+        pd.testing.assert_frame_equal(self.table.to_frame(rows=order), expected, check_dtype=False)
+        pd.testing.assert_frame_equal(self.table.to_frame(rows=order),
+                                      OperationTable.from_operations([operations[i] for i in order]).to_frame())
+
+
+if __name__ == '__main__':
+    unittest.main()
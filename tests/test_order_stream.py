@@ -0,0 +1,52 @@
+import unittest
+from models.implementations.basic import BasicModel
+from modules.data_processing import ProductionGenerator
+from modules.generators.order_stream import release_windows
+from modules.plan.GifflerThompson import GifflerThompson
+from modules.simulation import run_simulation
+from working_directory import WorkingDirectoryTestCase
+
+
+class TestOrderStream(WorkingDirectoryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.model = BasicModel()
+        self.model.initialize()
+
+    def test_arrivals(self):
+        stream, _ = ProductionGenerator().generate_order_stream(arrival='takt', takt=30, horizon=300)
+        orders = list(stream)
+        self.assertEqual([order.release_time for order in orders], [30 * k for k in range(11)])
+        self.assertIs(orders[0].operations[0].successor_operation, orders[0].operations[1])
+
+        stream, _ = ProductionGenerator().generate_order_stream(rate=0.1, num_orders=2000, seed=4)
+        releases = [order.release_time for order in stream]
+        self.assertEqual(releases, [order.release_time for order in stream])
+        self.assertAlmostEqual(releases[-1] / len(releases), 10, delta=1)
+        self.assertEqual([len(batch) for batch in release_windows(stream, 1e9)], [2000])
+        with self.assertRaises(ValueError):
+            ProductionGenerator().generate_order_stream(arrival='takt')
+
+    def test_rolling_horizon_plan_and_simulation(self):
+        stream, machines = ProductionGenerator().generate_order_stream(rate=1 / 25, num_orders=300, seed=2)
+        plan = GifflerThompson('dynamic', self.model.inference, observed_data_path='plan.csv')
+        finished = []
+        run_simulation(machines, [], self.model, True, 'observed.csv', orders=plan.plan_orders(stream, machines, 100),
+                       on_job_finished=finished.append)
+        self.assertEqual(len(finished), 300)
+        for operations in finished:
+            self.assertGreaterEqual(operations[0].sim_start, operations[0].plan_start)
+            self.assertGreaterEqual(operations[1].plan_start, operations[0].plan_end)
+        # Keine Überlappung der Pläne auf einer Maschine über die Fenster hinweg
+        operations = sorted((operation for job in finished for operation in job), key=lambda operation: operation.plan_start)
+        ends = {}
+        for operation in operations:
+            self.assertGreaterEqual(operation.plan_start, ends.get(operation.plan_machine_id, 0))
+            ends[operation.plan_machine_id] = operation.plan_end
+        with open('plan.csv') as file:
+            self.assertEqual(len(file.readlines()), 601)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+import unittest
+import numpy as np
+from pgmpy.models import DiscreteBayesianNetwork
+from pgmpy.factors.discrete import TabularCPD
+from models.abstract.pgmpy import PGMPYModel
+
+
+class FourNodeModel(PGMPYModel):
+    """
+    Small test network with the structure of the TruthModel.
+    """
+    def __init__(self, seed=None):
+        super().__init__(seed=seed)
+        self.model = None
+
+    def initialize(self):
+        self.model = DiscreteBayesianNetwork([
+            ('last_tool_change', 'machine_state'),
+            ('machine_state', 'relative_processing_time_deviation'),
+            ('machine_state', 'cleaning'),
+            ('cleaning', 'relative_processing_time_deviation')
+        ])
+        self.model.add_cpds(
+            TabularCPD('last_tool_change', 2, [[0.5], [0.5]]),
+            TabularCPD('machine_state', 2, [[0.8, 0.3], [0.2, 0.7]], evidence=['last_tool_change'], evidence_card=[2]),
+            TabularCPD('cleaning', 2, [[0.7, 0.2], [0.3, 0.8]], evidence=['machine_state'], evidence_card=[2]),
+            TabularCPD('relative_processing_time_deviation', 3,
+                       [[0.7, 0.1, 0.1, 0.7], [0.2, 0.7, 0.7, 0.2], [0.1, 0.2, 0.2, 0.1]],
+                       evidence=['machine_state', 'cleaning'], evidence_card=[2, 2])
+        )
+        super().initialize()
+
+    def inference(self, operation, current_tool, do_calculus):
+        pass
+
+
+class TestCompiledPosteriors(unittest.TestCase):
+
+    def setUp(self):
+        self.model = FourNodeModel(seed=1)
+        self.model.initialize()
+
+    def assert_same_posteriors(self, evidence, do):
+        compiled = self.model.sample(evidence=evidence, do=do)
+        queried = self.model.query_posteriors(evidence=evidence, do=do)
+        self.assertEqual(set(compiled), set(queried))
+        for variable in queried:
+            np.testing.assert_allclose(compiled[variable].values, queried[variable].values)
+
+    def test_evidence_signature_is_compiled_in_initialize(self):
+        self.assertIn((('last_tool_change',), ()), self.model.compiled_posteriors)
+
+    def test_compiled_posteriors_match_query_engine(self):
+        for last_tool_change in (True, False):
+            self.assert_same_posteriors({'last_tool_change': last_tool_change}, {})
+
+    def test_do_signature_is_compiled_on_first_use(self):
+        for cleaning in (0, 1):
+            self.assert_same_posteriors({'last_tool_change': True}, {'cleaning': cleaning})
+        self.assertIn((('last_tool_change',), ('cleaning',)), self.model.compiled_posteriors)
+
+    def test_vectorized_lookup(self):
+        compiled = self.model.compiled_posteriors[(('last_tool_change',), ())]
+        probabilities = compiled.probabilities('machine_state', {'last_tool_change': np.array([True, False, True])})
+        self.assertEqual(probabilities.shape, (3, 2))
+        np.testing.assert_allclose(probabilities[0], probabilities[2])
+        np.testing.assert_allclose(probabilities.sum(axis=1), 1.0)
+
+    def test_lookup_returns_copies(self):
+        result = self.model.sample(evidence={'last_tool_change': True})
+        result['machine_state'].values[:] = 0
+        del result['cleaning']
+        self.assert_same_posteriors({'last_tool_change': True}, {})
+
+    def test_unknown_state_falls_back_to_query_engine(self):
+        with self.assertRaises(Exception):
+            self.model.sample(evidence={'last_tool_change': 5})
+
+
+class TestForwardSample(unittest.TestCase):
+
+    def test_indices_match_state_names(self):
+        model = FourNodeModel(seed=1)
+        model.initialize()
+        evidence = {'last_tool_change': np.array([True, False] * 50)}
+        names = model.forward_sample(100, evidence, random_states=[np.random.default_rng(i) for i in range(100)])
+        indices = model.forward_sample_indices(100, evidence, random_states=[np.random.default_rng(i) for i in range(100)])
+        self.assertEqual(set(indices), set(names))
+        for variable, states in model.ancestral_sampler.state_names.items():
+            np.testing.assert_array_equal(np.asarray(states)[indices[variable]], names[variable])
+
+
+class TestQueryPlanner(unittest.TestCase):
+
+    def setUp(self):
+        self.model = FourNodeModel(seed=1)
+        self.model.initialize()
+
+    def test_planner_matches_causal_inference(self):
+        nodes = sorted(self.model.model.nodes())
+        for variables, evidence, do, adjustment_set in (
+                (nodes, {}, {}, None),
+                (['machine_state', 'cleaning', 'relative_processing_time_deviation'], {'last_tool_change': True}, {}, None),
+                (['machine_state', 'relative_processing_time_deviation'], {'last_tool_change': False}, {'cleaning': 1}, {'cleaning'}),
+                (['relative_processing_time_deviation'], {}, {'cleaning': 1}, None),
+                (['relative_processing_time_deviation', 'last_tool_change'], {}, {'cleaning': 0}, None)):
+            result = self.model.query_planner.query(variables, evidence, do, adjustment_set)
+            self.assertEqual(list(result), variables)
+            for variable in variables:
+                expected = self.model.causal_inference.query([variable], evidence=evidence, do=do or None,
+                                                             adjustment_set=adjustment_set, show_progress=False)
+                self.assertEqual(result[variable].state_names[variable], expected.state_names[variable])
+                np.testing.assert_allclose(result[variable].values, expected.values)
+
+    def test_plans_are_cached_per_signature(self):
+        planner = self.model.query_planner
+        planner.query(['machine_state', 'cleaning'], {'last_tool_change': True})
+        plans = planner.plans[(('machine_state', 'cleaning'), ('last_tool_change',), (), None)]
+        planner.query(['machine_state', 'cleaning'], {'last_tool_change': False})
+        self.assertIs(planner.plans[(('machine_state', 'cleaning'), ('last_tool_change',), (), None)], plans)
+        self.assertEqual(len(plans), 1)
+        with self.assertRaises(KeyError):
+            planner.query(['machine_state'], {'last_tool_change': 5})
+
+
+class TestInterventionPolicy(unittest.TestCase):
+
+    spec = (('last_tool_change',), ('cleaning',), 'relative_processing_time_deviation', ((0, 0.9), (1, 1.0), (2, 1.2)),
+            ('relative_processing_time_deviation',))
+
+    def setUp(self):
+        self.model = FourNodeModel(seed=1)
+        self.model.compiled_policies = [self.spec]
+        self.model.initialize()
+
+    def expected_values(self, last_tool_change):
+        values = []
+        for cleaning in (0, 1):
+            factor = self.model.causal_inference.query(variables=['relative_processing_time_deviation'], do={'cleaning': cleaning},
+                                                      evidence={'last_tool_change': last_tool_change}, show_progress=False)
+            values.append(factor.values @ np.array([0.9, 1.0, 1.2]))
+        return values
+
+    def test_policy_matches_query_engine(self):
+        self.assertIn(self.spec, self.model.intervention_policies)
+        for last_tool_change in (True, False):
+            values = self.expected_values(last_tool_change)
+            do, factors = self.model.decide_intervention({'last_tool_change': last_tool_change}, *self.spec[1:])
+            self.assertEqual(do, {'cleaning': int(np.argmin(values))})
+            self.assertAlmostEqual(factors['relative_processing_time_deviation'].values @ np.array([0.9, 1.0, 1.2]), min(values))
+        decisions, tables = self.model.intervention_policy(*self.spec).decide_batch({'last_tool_change': np.array([True, False, True])})
+        self.assertEqual(decisions[0], decisions[2])
+        np.testing.assert_allclose(tables['relative_processing_time_deviation'].sum(axis=1), 1.0)
+
+    def test_policy_is_rebuilt_when_cpds_change(self):
+        # Eine bei Bedarf kompilierte Policy entfällt beim Neukompilieren
+        self.model.intervention_policy(*self.spec[:4])
+        self.assertEqual(len(self.model.intervention_policies), 2)
+        do, _ = self.model.decide_intervention({'last_tool_change': True}, *self.spec[1:])
+        self.assertEqual(do, {'cleaning': 1})
+        # Reinigung verlängert jetzt die Bearbeitung
+        self.model.replace_cpds(TabularCPD('relative_processing_time_deviation', 3,
+                                           [[0.7, 0.1, 0.7, 0.1], [0.2, 0.2, 0.2, 0.2], [0.1, 0.7, 0.1, 0.7]],
+                                           evidence=['machine_state', 'cleaning'], evidence_card=[2, 2]))
+        # Nur die Policies aus compiled_policies werden sofort neu kompiliert
+        self.assertEqual(list(self.model.intervention_policies), [self.spec])
+        do, _ = self.model.decide_intervention({'last_tool_change': True}, *self.spec[1:])
+        self.assertEqual(do, {'cleaning': 0})
+        self.assertLess(self.expected_values(True)[0], self.expected_values(True)[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from models.abstract.model import Model
+from models.implementations.basic import BasicModel
+from models.implementations.truth_continous_small_log_copy import TruthContinousSmallLogCopyModel
+from modules.data_processing import ProductionGenerator
+from modules.plan.GifflerThompson import GifflerThompson
+from modules.random_streams import RandomStreams
+from modules.simulation import run_simulation
+from working_directory import WorkingDirectoryTestCase
+
+
+class TestRandomStreams(WorkingDirectoryTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+    def simulate(self, model_seed, planned_mode, engine='simpy', random_streams=None):
+        operations, machines = ProductionGenerator().generate_data_static(num_instances=40, seed=3)
+        plan_model = BasicModel()
+        plan_model.initialize()
+        GifflerThompson('dynamic', plan_model.inference).create_schedule(operations, machines)
+        model = TruthContinousSmallLogCopyModel(seed=model_seed)
+        model.initialize()
+        result = run_simulation(machines, operations, model, planned_mode, engine=engine, random_streams=random_streams)
+        return {(operation.job_id, operation.operation_id): operation.sim_duration for operation in result}
+
+    def test_generator_keys(self):
+        streams = RandomStreams(7)
+        self.assertEqual(streams.generator('job3', 1).random(3).tolist(), RandomStreams(7).generator('job3', 1).random(3).tolist())
+        self.assertNotEqual(streams.generator('job3', 1).random(), streams.generator('job3', 2).random())
+        self.assertNotEqual(streams.generator('job3', 1).random(), streams.generator('job3', 1, stream='planning').random())
+        self.assertNotEqual(streams.generator('job3', 1).random(), RandomStreams(8).generator('job3', 1).random())
+
+    def test_common_random_numbers(self):
+        # Ohne gemeinsame Zufallszahlen hängen die Dauern vom Seed des Modells ab
+        self.assertNotEqual(self.simulate(1, True), self.simulate(2, True))
+        durations = self.simulate(1, True, random_streams=RandomStreams(5))
+        self.assertEqual(self.simulate(2, True, random_streams=RandomStreams(5)), durations)
+        self.assertEqual(self.simulate(2, True, 'replay', random_streams=RandomStreams(5)), durations)
+        self.assertNotEqual(self.simulate(1, True, random_streams=RandomStreams(6)), durations)
+
+    def plan(self, model_seed, per_operation=False):
+        operations, machines = ProductionGenerator().generate_data_static(num_instances=40, seed=3)
+        model = TruthContinousSmallLogCopyModel(seed=model_seed)
+        model.initialize()
+        streams = RandomStreams(5)
+        inference_batch = None
+        if per_operation:
+            inference_batch = lambda operations, tools, do_calculus: Model.inference_batch(model, operations, tools, do_calculus, streams.generators(operations, 'priority'))
+        GifflerThompson('dynamic', model.inference, inference_batch=inference_batch, random_streams=streams).create_schedule(operations, machines)
+        return {(operation.job_id, operation.operation_id): (operation.plan_start, operation.plan_duration) for operation in operations}
+
+    def test_planning(self):
+        # Die Batch-Inferenz mit einem Generator je Operation plant wie die Inferenz je Operation
+        schedule = self.plan(1)
+        self.assertEqual(self.plan(2), schedule)
+        self.assertEqual(self.plan(2, per_operation=True), schedule)
+
+
+if __name__ == '__main__':
+    unittest.main()
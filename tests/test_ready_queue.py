@@ -0,0 +1,54 @@
+import unittest
+from modules.data_processing import ProductionGenerator
+from modules.plan.GifflerThompson import GifflerThompson
+from modules.plan.ReadyQueue import ReadyQueue
+from working_directory import WorkingDirectoryTestCase
+
+
+def tool_change_inference(operation, current_tool, do_calculus=False):
+    """Deterministic duration, 50% longer if the machine has to change its tool."""
+    tool_change = current_tool is not None and current_tool != operation.tool
+    return float(operation.duration * (1.5 if tool_change else 1.0)), {'last_tool_change': tool_change}
+
+
+class TestReadyQueue(WorkingDirectoryTestCase):
+    """
+    The incremental ready queue plans the same schedule as the full rebuild of the priorities per iteration.
+    """
+
+    def setUp(self):
+        super().setUp()
+
+    def plan(self, rule_name, incremental):
+        # Die Vorlage nutzt je Maschinengruppe zwei Tools, es gibt also Werkzeugwechsel
+        operations, machines = ProductionGenerator().generate_data_static(num_instances=60, seed=3)
+        planner = GifflerThompson(rule_name, tool_change_inference, incremental=incremental, observed_data_path='plan.csv')
+        schedule = planner.create_schedule(operations, machines)
+        return ([(operation.job_id, operation.operation_id, operation.plan_machine_id, operation.plan_start,
+                  operation.plan_end, operation.plan_duration != operation.duration) for operation in schedule], planner.qlength)
+
+    def test_same_schedule(self):
+        for rule_name in ('dynamic', 'fcfs'):
+            with self.subTest(rule_name=rule_name):
+                schedule, qlength = self.plan(rule_name, True)
+                baseline_schedule, baseline_qlength = self.plan(rule_name, False)
+                self.assertEqual(len(schedule), 120)
+                self.assertEqual(schedule, baseline_schedule)
+                self.assertEqual(qlength, baseline_qlength)
+                # Der Plan enthält Werkzeugwechsel (längere Dauer)
+                self.assertTrue(any(tool_change for *_, tool_change in schedule))
+
+    def test_arrivals_trimmed(self):
+        operations, machines = ProductionGenerator().generate_data_static(num_instances=20, seed=3)
+        queue = ReadyQueue('fcfs', None)
+        available_times = {machine: [[0, None]] for machine, _, _ in machines}
+        queue.push(operations, available_times)
+        while len(queue):
+            queue.pop()
+            self.assertTrue(all(2 * queue.waiting[group] > len(arrivals) or not arrivals
+                                for group, arrivals in queue.arrivals.items()))
+        self.assertEqual(sum(len(arrivals) for arrivals in queue.arrivals.values()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+from models.abstract.model import Model
+from models.implementations.basic import BasicModel
+from models.implementations.truth_continous_small_log_copy import TruthContinousSmallLogCopyModel
+from modules.data_processing import ProductionGenerator
+from modules.plan.GifflerThompson import GifflerThompson
+from modules.simulation import run_simulation
+from working_directory import WorkingDirectoryTestCase
+
+
+class ToolChangeModel(Model):
+    """
+    Deterministic model whose durations differ from the plan, so operations queue on the machines.
+    """
+    def initialize(self):
+        super().initialize()
+
+    def inference(self, operation, current_tool, do_calculus):
+        factor = 1.5 if operation.tool != current_tool else 0.8
+        return np.float64(round(operation.duration * factor)), {'last_tool_change': operation.tool != current_tool}
+
+
+class TestReplaySimulation(WorkingDirectoryTestCase):
+    # GT und Logger schreiben relativ zum Arbeitsverzeichnis (siehe WorkingDirectoryTestCase)
+
+    def simulate(self, engine, model, rule_name='dynamic'):
+        operations, machines = ProductionGenerator().generate_data_static(num_instances=60, seed=3)
+        plan_model = BasicModel()
+        plan_model.initialize()
+        GifflerThompson(rule_name, plan_model.inference).create_schedule(operations, machines)
+        model.initialize()
+        observed_data_path = f"observed_{engine}.csv"
+        result = run_simulation(machines, operations, model, True, observed_data_path, engine=engine)
+        return [(op.job_id, op.operation_id, op.machine.id, op.sim_start, op.sim_end) for op in result], observed_data_path
+
+    def test_replay_matches_simpy(self):
+        # The seeded truth model also checks that the model is called in the same order
+        for model in (BasicModel(), ToolChangeModel(), TruthContinousSmallLogCopyModel(seed=5)):
+            for rule_name in ('dynamic', 'fcfs'):
+                simpy_result, simpy_path = self.simulate('simpy', model, rule_name)
+                replay_result, replay_path = self.simulate('replay', model, rule_name)
+                self.assertEqual(replay_result, simpy_result)
+                with open(simpy_path) as simpy_file, open(replay_path) as replay_file:
+                    self.assertEqual(replay_file.read(), simpy_file.read())
+
+    def test_replay_requires_planned_mode(self):
+        operations, machines = ProductionGenerator().generate_data_static(num_instances=2, seed=1)
+        with self.assertRaises(ValueError):
+            run_simulation(machines, operations, BasicModel(), False, engine='replay')
+
+
+if __name__ == '__main__':
+    unittest.main()
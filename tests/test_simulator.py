@@ -0,0 +1,82 @@
+import sys
+import unittest
+from models.implementations.basic import BasicModel
+from modules.factory.Operation import Operation
+from modules.simulation import run_simulation
+from modules.simulator.Simulator import Simulator, topological_order
+from modules.simulator.Monitoring.BasicMonitor import monitorResource
+from modules.data_processing import ProductionGenerator
+from functools import partial
+from working_directory import WorkingDirectoryTestCase
+
+
+def link(operations):
+    """
+    Sets successor/predecessor references like GifflerThompson.create_schedule.
+    """
+    operation_dict = {(operation.job_id, operation.operation_id): operation for operation in operations}
+    for operation in operations:
+        if operation.successor != -1:
+            operation.successor_operation = operation_dict[(operation.job_id, operation.successor)]
+            operation.successor_operation.predecessor_operations.append(operation)
+    return operations
+
+
+class TestSimulatorBuild(WorkingDirectoryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.model = BasicModel()
+        self.model.initialize()
+
+    def test_long_routing(self):
+        steps = sys.getrecursionlimit() * 3
+        operations = link([Operation('job1', i, 'a1', 1, 1, i + 1 if i < steps else -1, 'p1') for i in range(1, steps + 1)])
+        for operation in operations:
+            operation.plan_machine_id = 'a1_0'
+        for engine in ('simpy', 'replay'):
+            result = run_simulation([['a1', 1, [1]]], operations, self.model, True, engine=engine)
+            self.assertEqual(result[-1].sim_end, steps)
+
+    def test_assembly_structure(self):
+        # job1: 1 -> 3, 2 -> 3, 3 -> 4 (3 waits for two predecessors)
+        operations = link([
+            Operation('job1', 1, 'a1', 1, 5, 3, 'p1'),
+            Operation('job1', 2, 'a2', 1, 8, 3, 'p1'),
+            Operation('job1', 3, 'a1', 1, 2, 4, 'p1'),
+            Operation('job1', 4, 'a2', 1, 1, -1, 'p1'),
+        ])
+        for operation in operations:
+            operation.plan_machine_id = operation.req_machine_group_id + '_0'
+        order = topological_order(operations)
+        self.assertEqual([operation.operation_id for operation in order], [1, 2, 3, 4])
+        result = run_simulation([['a1', 1, [1]], ['a2', 1, [1]]], operations, self.model, True)
+        self.assertEqual([(operation.sim_start, operation.sim_end) for operation in result], [(0, 5), (0, 8), (8, 10), (10, 11)])
+
+    def test_cycle_raises(self):
+        operations = link([Operation('job1', 1, 'a1', 1, 5, 2, 'p1'), Operation('job1', 2, 'a1', 1, 5, 1, 'p1')])
+        with self.assertRaises(ValueError):
+            topological_order(operations)
+
+    def test_dispatch_matches_shortest_queue(self):
+        operations, _ = ProductionGenerator().generate_data_static(num_instances=100, seed=2)
+        link(operations)
+        machines = [['a1', 4, [1, 2]], ['a2', 3, [1, 2]], ['a3', 5, [1, 2]]]
+        checks = []
+
+        class CheckedSimulator(Simulator):
+            def get_next_available_machine(self, machine_group_id):
+                machine = super().get_next_available_machine(machine_group_id)
+                checks.append(machine is min(self.machine_groups[machine_group_id], key=lambda m: len(m.queue)))
+                return machine
+
+        sim = CheckedSimulator(machines, operations, [None, partial(monitorResource, [])], self.model, None, planned_mode=False)
+        sim.env.run()
+        self.assertEqual(len(checks), len(operations))
+        self.assertTrue(all(checks))
+        self.assertIs(sim.get_machine('a3_4'), sim.pools['a3_4'])
+        self.assertIsNone(Simulator.get_next_available_machine(sim, 'a9'))
+
+
+if __name__ == '__main__':
+    unittest.main()
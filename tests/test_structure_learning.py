@@ -0,0 +1,123 @@
+import os
+import unittest
+import numpy as np
+import pandas as pd
+import networkx as nx
+from pgmpy.models import DiscreteBayesianNetwork
+from pgmpy.estimators import ExhaustiveSearch
+from types import SimpleNamespace
+from models.cache import LearningCache, set_cache
+from models.implementations.causal_small import CausalSmallModel
+from models.implementations.utils.BicCGScore import BicCGScore
+from models.structure_learning import StructureLearningPortfolio, encode_data, learn_edges, structure_score
+from working_directory import WorkingDirectoryTestCase
+
+
+class TestStructureLearningPortfolio(WorkingDirectoryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        rng = np.random.default_rng(0)
+        N = 5000
+        last_tool_change = rng.random(N) < 0.5
+        machine_state = np.where(last_tool_change, rng.random(N) < 0.7, rng.random(N) < 0.2)
+        self.data = pd.DataFrame({
+            'last_tool_change': last_tool_change,
+            'machine_state': machine_state,
+            'relative_processing_time_deviation': rng.normal(1 + 0.3 * machine_state, 0.1)
+        })
+        self.truth = nx.DiGraph([('last_tool_change', 'machine_state'),
+                                 ('machine_state', 'relative_processing_time_deviation')])
+        self.algorithms = [('pgmpy', 'HillClimbSearch'), ('gcastle', 'PC')]
+
+    def test_early_stop(self):
+        # Der erste Algorithmus trifft die Wahrheit, der Rest wird abgebrochen
+        results = list(StructureLearningPortfolio(self.algorithms, workers=1).run(self.data, self.truth))
+        self.assertEqual([result['algorithm'] for result in results], ['pgmpy:HillClimbSearch', 'gcastle:PC'])
+        self.assertEqual(results[0]['SHD'], 0)
+        self.assertEqual(results[1]['error'], 'cancelled')
+
+    def test_pool(self):
+        best, report = StructureLearningPortfolio(self.algorithms, target_shd=-1, workers=2).learn(self.data, self.truth)
+        self.assertEqual(best['algorithm'], 'pgmpy:HillClimbSearch')
+        self.assertEqual(set(best['edges']), set(self.truth.edges()))
+        self.assertEqual(set(report['algorithm']), {'pgmpy:HillClimbSearch', 'gcastle:PC'})
+        self.assertTrue(report['error'].isna().all())
+        self.assertTrue((report['runtime'] > 0).all())
+
+        # Ohne Wahrheit entscheidet der Score
+        best, _ = StructureLearningPortfolio(self.algorithms, workers=2).learn(self.data)
+        self.assertEqual(best['algorithm'], 'pgmpy:HillClimbSearch')
+
+        best, report = StructureLearningPortfolio(self.algorithms, time_budget=0, workers=2).learn(self.data, self.truth)
+        self.assertIsNone(best)
+        self.assertTrue((report['error'] == 'cancelled').all())
+
+        with self.assertRaises(ValueError):
+            StructureLearningPortfolio([])
+
+    def test_search_options(self):
+        # pgmpy bekommt nur die Optionen seiner Suche: max_indegree=0 lässt keine Kanten zu, alpha wird ignoriert
+        data = encode_data(self.data)
+        discrete_vars = ['last_tool_change', 'machine_state']
+        self.assertEqual(learn_edges(data, 'pgmpy', 'HillClimbSearch', discrete_vars, max_indegree=0, alpha=0.05), [])
+        self.assertEqual(set(learn_edges(data, 'pgmpy', 'HillClimbSearch', discrete_vars, alpha=0.05)),
+                         set(learn_edges(data, 'pgmpy', 'HillClimbSearch', discrete_vars)))
+
+    def test_exhaustive_search_default_score(self):
+        # Wie pgmpy ohne scoring_method mit K2
+        data = encode_data(self.data[['last_tool_change', 'machine_state']])
+        expected = ExhaustiveSearch(data, scoring_method='k2').estimate().edges()
+        self.assertEqual(set(learn_edges(data, 'pgmpy', 'ExhaustiveSearch', list(data.columns))), set(expected))
+
+    def test_shared_score(self):
+        data = encode_data(self.data)
+        discrete_vars = ['last_tool_change', 'machine_state']
+        score = BicCGScore(data, discrete_vars=discrete_vars)
+        edges = learn_edges(data, 'pgmpy', 'GES', discrete_vars, cg_score=score)
+        self.assertEqual(set(edges), set(self.truth.edges()))
+        memoized = len(score.cache)
+        self.assertGreater(memoized, 0)
+        # Das Bewerten nutzt die gemerkten lokalen Scores der Suche
+        self.assertEqual(structure_score(data, edges, discrete_vars, score), structure_score(data, edges, discrete_vars))
+        self.assertEqual(len(score.cache), memoized)
+
+
+class TestCausalLearningModel(WorkingDirectoryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        set_cache(LearningCache(directory=os.path.join(self.folder.name, "cache")))
+        rng = np.random.default_rng(1)
+        N = 5000
+        last_tool_change = rng.random(N) < 0.5
+        machine_state = np.where(last_tool_change, rng.random(N) < 0.7, rng.random(N) < 0.2)
+        deviation = np.where(machine_state, rng.choice([0.9, 1.0, 1.2], N, p=[0.1, 0.3, 0.6]),
+                             rng.choice([0.9, 1.0, 1.2], N, p=[0.6, 0.3, 0.1]))
+        data = pd.DataFrame({'last_tool_change': last_tool_change, 'machine_state': machine_state,
+                             'relative_processing_time_deviation': deviation})
+        data.to_csv('observed.csv')
+        # Alle Variablen sind diskret, auch die Abweichung mit float-Werten
+        self.edges = learn_edges(encode_data(data), 'pgmpy', 'HillClimbSearch', list(data.columns), scoring_method='bic-d')
+
+    def tearDown(self):
+        set_cache(None)
+
+    def test_learned_model(self):
+        self.assertEqual(len(self.edges), 2)
+        model = CausalSmallModel('observed.csv', truth_model=SimpleNamespace(model=nx.DiGraph(self.edges)))
+        model.initialize()
+        # Gelerntes Modell statt Rückfall auf das Wahrheitsmodell
+        self.assertIsInstance(model.model, DiscreteBayesianNetwork)
+        self.assertEqual(set(model.edges), set(self.edges))
+        self.assertEqual(model.encoded_data['last_tool_change'].dtype.kind, 'i')
+        self.assertEqual(set(model.model.get_cpds('last_tool_change').state_names['last_tool_change']), {False, True})
+
+        portfolio = CausalSmallModel('observed.csv', structure_learning_lib='portfolio',
+                                     structure_learning_method=[('pgmpy', 'HillClimbSearch')], workers=1)
+        portfolio.initialize()
+        self.assertEqual(set(portfolio.edges), set(self.edges))
+        self.assertEqual(list(portfolio.structure_learning_report['algorithm']), ['pgmpy:HillClimbSearch'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import pickle
+import unittest
+import numpy as np
+import pandas as pd
+from models.implementations.histo_distribution import HistoDistributionModel
+from models.implementations.log_normal_distribution import LogNormalDistributionModel
+from models.variate_pool import VariatePool
+from modules.factory.Operation import Operation
+from working_directory import WorkingDirectoryTestCase
+
+
+def normal(params, size, random_state):
+    return random_state.normal(params[0], params[1], size)
+
+
+class TestVariatePool(WorkingDirectoryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        rng = np.random.default_rng(0)
+        pd.DataFrame({
+            'product_type': ['A'] * 100 + ['B'] * 100,
+            'operation_id': [0] * 100 + [1] * 100,
+            'duration': np.concatenate([rng.lognormal(3, 0.2, 100), rng.lognormal(4, 0.1, 100)])
+        }).to_csv('durations.csv', index=False)
+        self.operations = [Operation(f'j{i}', operation_id, 0, 'T0', 20, None, product_type)
+                           for i, (product_type, operation_id) in enumerate([('A', 0), ('B', 1)] * 50)]
+
+    def test_blocks_and_keys(self):
+        pool = VariatePool(normal, block_size=16, seed=3)
+        values = [pool.draw('a', (0, 1)) for _ in range(40)]
+        self.assertEqual(len(set(values)), 40)
+
+        pool.reset(3)
+        # Die Werte eines Schlüssels hängen nicht von den Ziehungen anderer Schlüssel ab
+        pool.draw_many('b', (5, 1), 30)
+        np.testing.assert_array_equal(pool.draw_many('a', (0, 1), 40), values)
+        self.assertFalse(np.array_equal(VariatePool(normal, 16, seed=4).draw_many('a', (0, 1), 40), values))
+        with self.assertRaises(ValueError):
+            VariatePool(normal, block_size=0)
+
+    def test_distribution_models(self):
+        for model_class in (LogNormalDistributionModel, HistoDistributionModel):
+            model = model_class(csv_file='durations.csv', seed=5)
+            model.initialize()
+            durations = [model.inference(operation, 'T0', False)[0] for operation in self.operations]
+            copy = pickle.loads(pickle.dumps(model))
+            copy.seed_random(5)
+            batch, _ = copy.inference_batch(self.operations, ['T0'] * len(self.operations), False)
+            np.testing.assert_array_equal(batch, durations)
+            self.assertGreater(np.mean(durations[1::2]), np.mean(durations[::2]))
+
+            # Mit random_state kommen die Werte aus dem Generator und nicht aus dem Pool
+            first = model.inference(self.operations[0], 'T0', False, random_state=np.random.default_rng(1))[0]
+            self.assertEqual(model.inference(self.operations[0], 'T0', False, random_state=np.random.default_rng(1))[0], first)
+            random_states = [np.random.default_rng(i) for i in range(len(self.operations))]
+            batch, _ = model.inference_batch(self.operations, ['T0'] * len(self.operations), False, [np.random.default_rng(i) for i in range(len(self.operations))])
+            np.testing.assert_array_equal(batch, [model.inference(operation, 'T0', False, random_state=random_state)[0]
+                                                  for operation, random_state in zip(self.operations, random_states)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,18 @@
+import os
+import tempfile
+import unittest
+
+
+class WorkingDirectoryTestCase(unittest.TestCase):
+    """
+    Runs every test in a fresh temporary working directory with the folders the modules write to
+    (data and output/logs), the previous working directory is restored after the test.
+    """
+    def setUp(self):
+        cwd = os.getcwd()
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        os.chdir(self.folder.name)
+        self.addCleanup(os.chdir, cwd)
+        os.makedirs("data")
+        os.makedirs(os.path.join("output", "logs"))